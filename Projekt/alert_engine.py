@@ -0,0 +1,179 @@
+import threading
+from bisect import bisect_left, bisect_right
+from cache import TTLCache
+
+
+# Indeks niewysłanych alertów: dla każdego symbolu posortowana lista progów,
+# dzięki czemu wszystkie przekroczone alerty to prefiks listy (range scan)
+class AlertIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets = {}
+        self._ids = {}
+        self._alerts = {}
+
+    def upsert(self, alert_id, data):
+        with self._lock:
+            self._remove(alert_id)
+            symbol = data.get("symbol")
+            target = data.get("target")
+            if data.get("sent") or not symbol or target is None:
+                return
+            target = float(target)
+            targets = self._targets.setdefault(symbol, [])
+            ids = self._ids.setdefault(symbol, [])
+            position = bisect_right(targets, target)
+            targets.insert(position, target)
+            ids.insert(position, alert_id)
+            self._alerts[alert_id] = (symbol, target, data)
+
+    def remove(self, alert_id):
+        with self._lock:
+            self._remove(alert_id)
+
+    def _remove(self, alert_id):
+        entry = self._alerts.pop(alert_id, None)
+        if entry is None:
+            return
+        symbol, target, _ = entry
+        targets, ids = self._targets[symbol], self._ids[symbol]
+        position = bisect_left(targets, target)
+        while ids[position] != alert_id:
+            position += 1
+        del targets[position]
+        del ids[position]
+        if not targets:
+            del self._targets[symbol]
+            del self._ids[symbol]
+
+    def clear(self):
+        with self._lock:
+            self._targets.clear()
+            self._ids.clear()
+            self._alerts.clear()
+
+    def symbols(self):
+        with self._lock:
+            return list(self._targets)
+
+    # Alerty z progiem ostro niższym od ceny (warunek: cena > próg)
+    def crossed(self, symbol, price):
+        with self._lock:
+            targets = self._targets.get(symbol)
+            if not targets:
+                return []
+            position = bisect_left(targets, price)
+            return [(alert_id, self._alerts[alert_id][2]) for alert_id in self._ids[symbol][:position]]
+
+    def __len__(self):
+        return len(self._alerts)
+
+
+# Utrzymuje indeks w zgodzie z Firestore: pełne wczytanie, potem nasłuch zmian;
+# gdy nasłuch jest niedostępny, indeks jest przeładowywany w każdym cyklu
+class AlertEngine:
+    def __init__(self):
+        self.index = AlertIndex()
+        self._watch = None
+
+    def _query(self, db):
+        return db.collection("alerts").where("sent", "==", False)
+
+    def load(self, db):
+        alerts = [(alert.id, alert.to_dict()) for alert in self._query(db).stream()]
+        self.index.clear()
+        for alert_id, data in alerts:
+            self.index.upsert(alert_id, data)
+
+    def sync(self, db):
+        if self._watch is not None:
+            return
+        self.load(db)
+        try:
+            self._watch = self._query(db).on_snapshot(self._on_snapshot)
+        except Exception as e:
+            print("⚠️ Nasłuch alertów niedostępny, indeks będzie przeładowywany:", e)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        for change in changes:
+            if change.type.name == "REMOVED":
+                self.index.remove(change.document.id)
+            else:
+                self.index.upsert(change.document.id, change.document.to_dict())
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def symbols(self):
+        return self.index.symbols()
+
+    def crossed(self, symbol, price):
+        return self.index.crossed(symbol, price)
+
+    def mark_sent(self, alert_id):
+        self.index.remove(alert_id)
+
+    def __len__(self):
+        return len(self.index)
+
+
+# Limit operacji w jednym WriteBatch Firestore
+FIRESTORE_BATCH_LIMIT = 500
+
+
+# Zbiorcze operacje Firestore potrzebne przy wysyłce alertów: odczyt użytkowników
+# przez get_all z cache uid -> e-mail oraz oznaczanie alertów jako wysłanych w WriteBatch
+class AlertDelivery:
+    def __init__(self, email_ttl=600, email_cache_size=10000):
+        self.emails = TTLCache(maxsize=email_cache_size, ttl=email_ttl)
+        self.user_reads = 0
+        self.writes = 0
+        self.round_trips = 0
+        self.naive_round_trips = 0
+
+    def resolve_emails(self, db, uids):
+        emails = {}
+        missing = []
+        for uid in dict.fromkeys(uids):
+            email = self.emails.get(uid)
+            if email is None:
+                missing.append(uid)
+            else:
+                emails[uid] = email
+
+        for start in range(0, len(missing), FIRESTORE_BATCH_LIMIT):
+            refs = [db.collection("users").document(uid) for uid in missing[start:start + FIRESTORE_BATCH_LIMIT]]
+            self.round_trips += 1
+            for doc in db.get_all(refs):
+                self.user_reads += 1
+                email = doc.to_dict().get("email") if doc.exists else None
+                if email:
+                    self.emails.set(doc.id, email)
+                    emails[doc.id] = email
+        return emails
+
+    def mark_sent(self, db, alert_ids):
+        alert_ids = list(alert_ids)
+        for start in range(0, len(alert_ids), FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for alert_id in alert_ids[start:start + FIRESTORE_BATCH_LIMIT]:
+                batch.update(db.collection("alerts").document(alert_id), {"sent": True})
+            batch.commit()
+            self.round_trips += 1
+        self.writes += len(alert_ids)
+
+    # Bez batchowania każdy wysłany alert to osobny odczyt użytkownika i osobny zapis
+    def record_fired(self, count):
+        self.naive_round_trips += 2 * count
+
+    def stats(self):
+        return {
+            "user_reads": self.user_reads,
+            "writes": self.writes,
+            "round_trips": self.round_trips,
+            "naive_round_trips": self.naive_round_trips,
+            "round_trips_saved": self.naive_round_trips - self.round_trips,
+            "email_cache": self.emails.stats(),
+        }
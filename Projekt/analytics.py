@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+
+class AnalyticsBusy(Exception):
+    pass
+
+
+class AnalyticsTimeout(Exception):
+    pass
+
+
+# Ograniczona pula procesów dla obliczeń CPU (prognozy, wykresy, optymalizacja);
+# max_workers=0 wykonuje zadania w bieżącym wątku (tryb deweloperski i testy)
+class AnalyticsExecutor:
+    def __init__(self, max_workers=None, max_queue=None, timeout=30.0):
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.max_queue = 2 * self.max_workers if max_queue is None else max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(self.max_workers + self.max_queue, 1))
+        self._pool = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn zamiast fork: proces Flask/APScheduler ma już uruchomione wątki
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _reset_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, future):
+        self._slots.release()
+        if not future.cancelled():
+            self.completed += 1
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        if self.max_workers == 0:
+            return fn(*args, **kwargs)
+
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise AnalyticsBusy("Zbyt wiele zadań analitycznych w kolejce")
+
+        pool = self._get_pool()
+        try:
+            future = pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_pool(pool)
+            raise
+        except BaseException:
+            self._slots.release()
+            raise
+        self.submitted += 1
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FuturesTimeout:
+            self.timeouts += 1
+            # Zadanie czekające w kolejce jest anulowane; już działające kończy się w tle,
+            # a jego wynik jest odrzucany
+            if future.cancel():
+                self.cancelled += 1
+            raise AnalyticsTimeout("Przekroczono czas obliczeń analitycznych")
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "in_flight": self.submitted - self.completed - self.cancelled,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+        }
+
+    @classmethod
+    def from_env(cls):
+        workers = os.getenv("ANALYTICS_WORKERS")
+        queue = os.getenv("ANALYTICS_MAX_QUEUE")
+        return cls(
+            max_workers=int(workers) if workers is not None else None,
+            max_queue=int(queue) if queue is not None else None,
+            timeout=float(os.getenv("ANALYTICS_TIMEOUT", 30))
+        )
@@ -1,80 +1,94 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
-from portfolio import Portfolio
+from flask import Flask, Blueprint, Response, render_template, request, redirect, url_for, jsonify
+from portfolio import Portfolio, price_cache, coin_catalogue
+from cache import TTLCache
+from forecasting import FORECASTERS, DEFAULT_FORECASTER
+from charts import render_chart, chart_data, CHART_FORMATS
+from optimizer import optimize_prices, OBJECTIVES
+from risk import risk_report, value_forecast
+from analytics import AnalyticsExecutor, AnalyticsBusy, AnalyticsTimeout
+from auth_cache import TokenCache
+from asset_cache import AssetSnapshotCache
+from trades import parse_trades, apply_trades, TradeError
+import indicators
+from price_stream import PricePoller
+from firebase_client import db, verify_id_token
+import scheduler
 import os
-import io
 import base64
+import hashlib
 import json
+import math
+import secrets
+import time
 from dotenv import load_dotenv
-from matplotlib.figure import Figure
-import firebase_admin
-from firebase_admin import credentials, firestore, auth as firebase_auth
-import numpy as np
-from scipy.optimize import minimize
-from apscheduler.schedulers.background import BackgroundScheduler
-import smtplib
-from email.mime.text import MIMEText
-from email.utils import formataddr
-
-# Inicjalizacja Firebase Admin SDK
-cred = credentials.Certificate("firebase-adminsdk.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
 
 # Wczytanie API key i zmiennych środowiskowych
 load_dotenv()
 CRYPTOCOMPARE_API_KEY = os.getenv("CRYPTOCOMPARE_API_KEY")
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASS = os.getenv("EMAIL_PASS")
 
-if not EMAIL_USER or not EMAIL_PASS:
-    raise RuntimeError("Brakuje EMAIL_USER lub EMAIL_PASS w pliku .env")
-
-app = Flask(__name__)
-
-# Pobiera UID użytkownika z tokenu JWT
+web = Blueprint("web", __name__)
+
+# Migawki portfeli użytkowników w pamięci procesu; bez nasłuchu inne workery widzą
+# zapis najpóźniej po PORTFOLIO_CACHE_TTL sekundach
+asset_cache = AssetSnapshotCache(
+    maxsize=int(os.getenv("PORTFOLIO_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PORTFOLIO_CACHE_TTL", 5)),
+    listen=os.getenv("PORTFOLIO_CACHE_LISTEN", "0") == "1"
+)
+
+# Pula procesów dla obliczeń CPU wykonywanych poza wątkiem żądania
+analytics = AnalyticsExecutor.from_env()
+
+# Cache wyrenderowanych wykresów (PNG + ETag)
+chart_cache = TTLCache(
+    maxsize=int(os.getenv("CHART_CACHE_SIZE", 128)),
+    ttl=float(os.getenv("CHART_CACHE_TTL", 900))
+)
+CHART_MAX_AGE = int(os.getenv("CHART_MAX_AGE", 300))
+MAX_INDICATOR_SYMBOLS = 50
+RISK_MAX_PATHS = int(os.getenv("RISK_MAX_PATHS", 200000))
+
+# Cache zweryfikowanych tokenów Firebase (weryfikacja RSA tylko przy pierwszym użyciu tokenu)
+token_cache = TokenCache(
+    verify_id_token,
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", 10000)),
+    max_ttl=float(os.getenv("AUTH_CACHE_TTL", 300))
+)
+
+# Jeden wspólny poller cen dla wszystkich strumieni wyceny portfela
+price_poller = PricePoller(
+    lambda symbols: Portfolio.refresh_prices(symbols, CRYPTOCOMPARE_API_KEY),
+    interval=float(os.getenv("PRICE_STREAM_INTERVAL", 10))
+)
+PRICE_STREAM_KEEPALIVE = float(os.getenv("PRICE_STREAM_KEEPALIVE", 15))
+PRICE_STREAM_MAX_AGE = float(os.getenv("PRICE_STREAM_MAX_AGE", 300))
+
+# Jednorazowe, krótko żyjące bilety do strumienia SSE (EventSource nie wysyła
+# nagłówka Authorization, a token Firebase nie powinien trafiać do URL i logów)
+stream_tickets = TTLCache(
+    maxsize=int(os.getenv("PRICE_STREAM_TICKETS", 10000)),
+    ttl=float(os.getenv("PRICE_STREAM_TICKET_TTL", 30))
+)
+
+SCHEDULER_IN_PROCESS = os.getenv("SCHEDULER_IN_PROCESS", "0") == "1"
+
+# Pobiera UID użytkownika z tokenu JWT w nagłówku Authorization
 def get_user_id():
     auth_header = request.headers.get('Authorization')
+    id_token = None
     if auth_header and auth_header.startswith('Bearer '):
         id_token = auth_header.split('Bearer ')[1]
+    if id_token:
         try:
-            decoded_token = firebase_auth.verify_id_token(id_token)
+            decoded_token = token_cache.verify(id_token)
             return decoded_token['uid']
         except Exception as e:
             print("Błąd weryfikacji tokenu:", e)
     return None
 
-# Wysyłanie e-maila SMTP
-def send_email(to, subject, body):
-    msg = MIMEText(f"""
-Cześć,
-
-Twój alert cenowy został właśnie aktywowany.
-
-{body}
-
-Pozdrawiamy,
-Zespół Twojej aplikacji
-""".strip())
-
-    msg["Subject"] = subject
-    msg["From"] = formataddr(("Alerty Krypto", EMAIL_USER))
-    msg["To"] = to
-    msg["Reply-To"] = EMAIL_USER
-
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.send_message(msg)
-            print(f"✅ E-mail wysłany do {to}")
-    except smtplib.SMTPAuthenticationError as auth_err:
-        print("❌ Błąd autoryzacji SMTP:", auth_err)
-    except smtplib.SMTPException as smtp_err:
-        print("❌ Błąd SMTP:", smtp_err)
-    except Exception as e:
-        print(f"❌ Inny błąd wysyłki e-maila do {to}:", e)
-
 # Tworzenie alertu
 def create_alert(uid, message):
+    from firebase_admin import firestore
     db.collection("alerts").add({
         "uid": uid,
         "message": message,
@@ -82,176 +96,156 @@ def create_alert(uid, message):
         "sent": False
     })
 
-# Wysyłanie alertów oczekujących
-def process_pending_alerts():
-    print("🔄 Sprawdzanie oczekujących alertów...")
-
-    try:
-        alerts = db.collection("alerts").where("sent", "==", False).stream()
-    except Exception as e:
-        print("❌ Błąd podczas pobierania alertów z Firestore:", e)
-        return
-
-    for alert in alerts:
-        try:
-            data = alert.to_dict()
-            uid = data.get("uid")
-            symbol = data.get("symbol")
-            target = data.get("target")
-            message = data.get("message")
-
-            print(f"➡ Alert: {symbol} > {target} USD (UID: {uid})")
-
-            # Pobierz dane użytkownika
-            user_doc = db.collection("users").document(uid).get()
-            if not user_doc.exists:
-                print("⚠️ Użytkownik nie znaleziony:", uid)
-                continue
-
-            email = user_doc.to_dict().get("email")
-            if not email:
-                print("⚠️ Użytkownik nie ma przypisanego maila:", uid)
-                continue
-
-            # Pobierz aktualną cenę
-            current_price = Portfolio.get_current_price(symbol, CRYPTOCOMPARE_API_KEY)
-            print(f"💰 Cena {symbol}: {current_price} USD")
-
-            if current_price is None:
-                print(f"⚠️ Brak ceny dla {symbol}, pomijam.")
-                continue
-
-            # Warunek: cena aktualna > próg
-            if current_price > target:
-                print(f"📈 Cena przekroczyła próg: {current_price} > {target}")
-
-                send_email(email, "🔔 Alert cenowy", message)
-                db.collection("alerts").document(alert.id).update({"sent": True})
-                print("✅ Alert wysłany i zaktualizowany.")
-            else:
-                print(f"ℹ️ Cena poniżej progu: {current_price} <= {target}")
-
-        except Exception as e:
-            print("❌ Błąd przetwarzania alertu:", e)
-
-
-
-scheduler = BackgroundScheduler()
-scheduler.add_job(process_pending_alerts, "interval", minutes=1)
-scheduler.start()
-
-@app.route("/login")
+@web.route("/login")
 def login_page():
     return render_template("login.html")
 
-@app.route("/")
+@web.route("/")
 def dashboard():
     return render_template("dashboard.html")
 
-@app.route("/analysis")
+@web.route("/analysis")
 def analysis_view():
     return render_template("analysis.html")
 
-@app.route("/chart", methods=["GET", "POST"])
+@web.route("/chart", methods=["GET", "POST"])
 def chart_redirect():
     if request.method == "POST":
         symbol = request.form.get("crypto").upper()
-        return redirect(url_for("chart_view", symbol=symbol))
+        return redirect(url_for("web.chart_view", symbol=symbol))
     return render_template("chart_form.html")
 
-@app.route("/chart/<symbol>")
+@web.route("/chart/<symbol>")
 def chart_view(symbol):
-    dates, prices = Portfolio.get_historical_data(symbol, CRYPTOCOMPARE_API_KEY, limit=30)
-    if not prices:
-        return f"Nie udało się pobrać danych dla {symbol}"
-
-    fig = Figure()
-    ax = fig.subplots()
-    ax.plot(dates, prices, label="Cena", color="skyblue")
-
-    sma = Portfolio.calculate_moving_average(prices, window=7)
-    ax.plot(dates, sma, label="SMA 7", linestyle="--", color="darkred")
-
-    predicted, conf_int = Portfolio.forecast_prices(prices, days=7)
-    if predicted is not None:
-        future_dates = [dates[-1] + (i + 1) * (dates[1] - dates[0]) for i in range(len(predicted))]
-        ax.plot(future_dates, predicted, label="Prognoza", linestyle="--", color="gray")
-        ax.fill_between(future_dates, conf_int[:, 0], conf_int[:, 1], color="lightblue", alpha=0.4)
-
-    ax.set_title(f"Wykres cen dla {symbol}")
-    ax.set_xlabel("Data")
-    ax.set_ylabel("Cena USD")
-    ax.legend()
-    ax.grid(True)
-    fig.autofmt_xdate()
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    buf.close()
+    symbol = symbol.upper()
+    if not coin_catalogue.is_valid(symbol):
+        return jsonify({"error": f"Nieznany symbol: {symbol}"}), 404
+    window = min(max(request.args.get("window", 7, type=int), 1), 30)
+    days = min(max(request.args.get("days", 7, type=int), 1), 30)
+    model = request.args.get("model", DEFAULT_FORECASTER)
+    if model not in FORECASTERS:
+        return jsonify({"error": f"Nieznany model prognozy: {model}"}), 400
 
-    return jsonify({
-        "symbol": symbol,
-        "image_base64": image_base64
-    })
+    dates, prices = Portfolio.get_historical_data(symbol, CRYPTOCOMPARE_API_KEY, limit=30)
+    if len(prices) < 2:
+        return jsonify({"error": f"Brak wystarczających danych historycznych dla {symbol}"}), 404
+
+    fmt = _chart_format()
+    if fmt not in CHART_FORMATS and fmt not in ("data", "base64"):
+        return jsonify({"error": f"Nieznany format wykresu: {fmt}"}), 400
+
+    # Wykres zmienia się tylko wraz z nową świecą, więc kluczem jest wersja danych
+    render_fmt = "png" if fmt == "base64" else fmt
+    key = (symbol, dates[-1], window, days, model, render_fmt)
+    body, etag = chart_cache.get_or_load(
+        key, lambda: _render_chart_entry(symbol, dates, prices, window, days, model, render_fmt))
+
+    if fmt == "base64":
+        # Dotychczasowy format odpowiedzi (PNG w JSON), zachowany dla zgodności
+        response = jsonify({
+            "symbol": symbol,
+            "image_base64": base64.b64encode(body).decode("utf-8")
+        })
+        response.headers["Cache-Control"] = "no-cache"
+    else:
+        response = Response(body, mimetype="application/json" if fmt == "data" else CHART_FORMATS[fmt])
+        response.headers["Cache-Control"] = f"public, max-age={CHART_MAX_AGE}"
+    response.vary.add("Accept")
+    # base64 i surowy PNG mają tę samą treść obrazu, ale różne reprezentacje
+    response.set_etag(f"{etag}-{fmt}")
+    return response.make_conditional(request)
+
+# Format odpowiedzi: ?format=png|webp|svg|data|base64 albo nagłówek Accept;
+# bez preferencji obrazu zwracany jest dotychczasowy JSON z PNG w base64
+def _chart_format():
+    fmt = request.args.get("format")
+    if fmt:
+        return fmt.lower()
+    best = request.accept_mimetypes.best_match(
+        ["application/json", "image/webp", "image/png", "image/svg+xml"], default="application/json")
+    return next((name for name, mimetype in CHART_FORMATS.items() if mimetype == best), "base64")
+
+def _render_chart_entry(symbol, dates, prices, window, days, model, fmt):
+    if fmt == "data":
+        body = json.dumps(analytics.run(chart_data, symbol, dates, prices, window, days, model)).encode("utf-8")
+    else:
+        body = analytics.run(render_chart, symbol, dates, prices, window, days, model, fmt)
+    return body, hashlib.sha1(body).hexdigest()
 
 # API endpoints
 
-@app.route("/api/add", methods=["POST"])
+# Wykonuje operacje kupna/sprzedaży transakcyjnie i aktualizuje migawkę portfela
+def execute_trades(uid, trades):
+    buy_symbols = [symbol for symbol, side, _ in trades if side == "buy"]
+    unknown = [symbol for symbol in buy_symbols if not coin_catalogue.is_valid(symbol)]
+    if unknown:
+        raise TradeError(f"Nieznany symbol: {', '.join(dict.fromkeys(unknown))}")
+    prices = Portfolio.get_current_prices(buy_symbols, CRYPTOCOMPARE_API_KEY) if buy_symbols else {}
+    missing = [symbol for symbol in buy_symbols if not prices.get(symbol)]
+    if missing:
+        raise TradeError(f"Brak aktualnej ceny dla: {', '.join(dict.fromkeys(missing))}")
+
+    results = apply_trades(db, uid, trades, prices)
+    for symbol, (_, state) in results.items():
+        if state is None:
+            asset_cache.remove(uid, symbol)
+        else:
+            asset_cache.put(uid, symbol, state)
+    return results
+
+@web.route("/api/add", methods=["POST"])
 def api_add_crypto():
     uid = get_user_id()
     if not uid:
         return "Unauthorized", 401
 
     data = request.json
-    symbol = data.get("crypto", "").upper()
-    amount = float(data.get("amount"))
-    price = Portfolio.get_current_price(symbol, CRYPTOCOMPARE_API_KEY)
-
-    doc_ref = db.collection("portfolios").document(uid).collection("assets").document(symbol)
-    existing = doc_ref.get()
-
-    if existing.exists:
-        prev = existing.to_dict()
-        total_amount = prev["amount"] + amount
-        avg_price = ((prev["amount"] * prev["price"]) + (amount * price)) / total_amount
-        doc_ref.set({"amount": total_amount, "price": avg_price})
-    else:
-        doc_ref.set({"amount": amount, "price": price})
+    try:
+        trades = parse_trades([{"symbol": data.get("crypto", ""), "side": "buy", "amount": data.get("amount")}])
+        execute_trades(uid, trades)
+    except TradeError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify({"status": "added"})
 
-@app.route("/api/delete/<symbol>", methods=["DELETE"])
+@web.route("/api/delete/<symbol>", methods=["DELETE"])
 def api_delete_crypto(symbol):
     uid = get_user_id()
     if not uid:
         return "Unauthorized", 401
 
+    data = request.get_json(silent=True)
+    amount = data.get("amount") if isinstance(data, dict) else None
     try:
-        data = json.loads(request.data)
-        amount_to_remove = float(data.get("amount", 0))
-    except Exception as e:
-        return f"Błąd danych wejściowych: {e}", 400
-
-    doc_ref = db.collection("portfolios").document(uid).collection("assets").document(symbol)
-    doc = doc_ref.get()
+        trades = parse_trades([{"symbol": symbol, "side": "sell", "amount": amount}])
+    except TradeError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if not doc.exists:
+    previous, _ = execute_trades(uid, trades)[trades[0][0]]
+    if previous is None:
         return "Not Found", 404
 
-    current_data = doc.to_dict()
-    current_amount = current_data.get("amount", 0)
+    return jsonify({"status": "updated"})
 
-    if amount_to_remove >= current_amount:
-        doc_ref.delete()
-    else:
-        new_amount = current_amount - amount_to_remove
-        doc_ref.update({"amount": new_amount})
+# Zbiorcze operacje: {"trades": [{"symbol": "BTC", "side": "buy", "amount": 0.5}, ...]}
+@web.route("/api/trades", methods=["POST"])
+def api_trades():
+    uid = get_user_id()
+    if not uid:
+        return jsonify({"error": "unauthorized"}), 401
 
-    return jsonify({"status": "updated"})
+    data = request.get_json(silent=True) or {}
+    try:
+        results = execute_trades(uid, parse_trades(data.get("trades")))
+    except TradeError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "status": "applied",
+        "assets": {symbol: state for symbol, (_, state) in results.items()}
+    })
 
-@app.route("/api/portfolio")
+@web.route("/api/portfolio")
 def api_portfolio():
     uid = get_user_id()
     if not uid:
@@ -260,86 +254,225 @@ def api_portfolio():
     assets = []
     total_value = 0
 
-    docs = db.collection("portfolios").document(uid).collection("assets").stream()
-    for doc in docs:
-        data = doc.to_dict()
-        value = data["amount"] * data["price"]
-        assets.append({
-            "crypto_name": doc.id,
+    docs = list(asset_cache.get(db, uid).items())
+
+    # ?refresh=1 wycenia portfel po aktualnych cenach (jedno zapytanie zbiorcze)
+    current_prices = None
+    if request.args.get("refresh"):
+        current_prices = Portfolio.get_current_prices([symbol for symbol, _ in docs], CRYPTOCOMPARE_API_KEY)
+
+    for symbol, data in docs:
+        price = current_prices[symbol] if current_prices is not None else data["price"]
+        value = data["amount"] * price
+        asset = {
+            "crypto_name": symbol,
             "amount": data["amount"],
             "price": data["price"],
             "value": value
-        })
+        }
+        if current_prices is not None:
+            asset["current_price"] = price
+        assets.append(asset)
         total_value += value
 
     return jsonify({"assets": assets, "total_value": total_value})
 
-@app.route("/api/forecast")
+def _stream_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def _valuation(symbol, data, price):
+    return {
+        "crypto_name": symbol,
+        "amount": data["amount"],
+        "price": data["price"],
+        "current_price": price,
+        "value": data["amount"] * price
+    }
+
+# Wydanie biletu do strumienia wyceny; bilet jest ważny PRICE_STREAM_TICKET_TTL
+# sekund i można go użyć tylko raz
+@web.route("/api/portfolio/stream-ticket", methods=["POST"])
+def api_portfolio_stream_ticket():
+    uid = get_user_id()
+    if not uid:
+        return jsonify({"error": "unauthorized"}), 401
+    ticket = secrets.token_urlsafe(32)
+    stream_tickets.set(ticket, uid)
+    return jsonify({"ticket": ticket, "expires_in": stream_tickets.ttl})
+
+def _redeem_stream_ticket(ticket):
+    uid = stream_tickets.get(ticket) if ticket else None
+    if uid is not None and stream_tickets.delete(ticket):
+        return uid
+    return None
+
+# Strumień SSE: najpierw pełna wycena portfela, potem tylko zmienione pozycje i suma.
+# Połączenie trwa najwyżej PRICE_STREAM_MAX_AGE sekund (każde zajmuje wątek workera),
+# po czym serwer wysyła zdarzenie reconnect, a klient łączy się z nowym biletem
+@web.route("/api/portfolio/stream")
+def api_portfolio_stream():
+    uid = _redeem_stream_ticket(request.args.get("ticket"))
+    if not uid:
+        return jsonify({"error": "unauthorized"}), 401
+
+    holdings = asset_cache.get(db, uid)
+
+    def stream():
+        deadline = time.monotonic() + PRICE_STREAM_MAX_AGE
+        subscription = price_poller.subscribe(holdings)
+        try:
+            prices = price_poller.latest(holdings)
+            missing = [symbol for symbol in holdings if symbol not in prices]
+            if missing:
+                prices.update(Portfolio.get_current_prices(missing, CRYPTOCOMPARE_API_KEY))
+            current = holdings
+            values = {symbol: _valuation(symbol, data, prices.get(symbol) or data["price"])
+                      for symbol, data in current.items()}
+            yield _stream_event("snapshot", {
+                "assets": list(values.values()),
+                "total_value": sum(asset["value"] for asset in values.values())
+            })
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield _stream_event("reconnect", {"max_age": PRICE_STREAM_MAX_AGE})
+                    return
+                update = subscription.wait(min(PRICE_STREAM_KEEPALIVE, remaining))
+                prices.update(update)
+                latest = asset_cache.get(db, uid)
+                if latest.keys() != current.keys():
+                    price_poller.resubscribe(subscription, latest)
+                current = latest
+
+                changed = []
+                for symbol, data in current.items():
+                    asset = _valuation(symbol, data, prices.get(symbol) or data["price"])
+                    if values.get(symbol) != asset:
+                        values[symbol] = asset
+                        changed.append(asset)
+                removed = [symbol for symbol in values if symbol not in current]
+                for symbol in removed:
+                    del values[symbol]
+
+                if changed or removed:
+                    yield _stream_event("delta", {
+                        "assets": changed,
+                        "removed": removed,
+                        "total_value": sum(asset["value"] for asset in values.values())
+                    })
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            price_poller.unsubscribe(subscription)
+
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+# Macierz cen (symbole × dni) i ilości pozycji portfela na potrzeby symulacji;
+# przy brakach zwraca zamiast tego odpowiedź z błędem
+def _holdings_history(holdings):
+    if not holdings:
+        return None, (jsonify({"error": "Portfel jest pusty."}), 400)
+    symbols = list(holdings)
+    histories = Portfolio.get_historical_data_many(symbols, CRYPTOCOMPARE_API_KEY, limit=100)
+    missing = [s for s in symbols if len(histories[s][1]) < 3]
+    if missing:
+        return None, (jsonify({"error": f"Brak wystarczających danych historycznych dla {', '.join(missing)}."}), 422)
+    prices = Portfolio.align_prices([histories[s][1] for s in symbols])
+    return (symbols, prices, [holdings[s]["amount"] for s in symbols]), None
+
+# Prognoza wartości portfela na 1/7/30 dni: mediana i przedział 5%–95% z tej samej
+# symulacji Monte Carlo co /api/risk
+@web.route("/api/forecast")
 def api_forecast():
     uid = get_user_id()
     if not uid:
         return jsonify({"error": "unauthorized"}), 401
 
-    docs = db.collection("portfolios").document(uid).collection("assets").stream()
-    total_value = sum(doc.to_dict()["amount"] * doc.to_dict()["price"] for doc in docs)
+    history, error = _holdings_history(asset_cache.get(db, uid))
+    if error:
+        return error
+    symbols, prices, amounts = history
 
-    forecast = [{"days": d, "value": total_value * (1 + 0.01 * d)} for d in [1, 7, 30]]
-    return jsonify({"forecast": forecast})
+    forecast = analytics.run(value_forecast, prices, amounts, seed=request.args.get("seed", type=int))
+    return jsonify({"forecast": forecast, "symbols": symbols})
 
-@app.route("/api/optimize", methods=["POST"])
+@web.route("/api/optimize", methods=["POST"])
 def api_optimize():
     uid = get_user_id()
     if not uid:
         return jsonify({"error": "unauthorized"}), 401
 
-    docs = db.collection("portfolios").document(uid).collection("assets").stream()
-    assets = {doc.id: (doc.to_dict()["price"], doc.to_dict()["amount"]) for doc in docs}
-
-    if not assets:
+    # Stopy (target_return, risk_free_rate) są dzienne, jak zwroty w optimizer.returns_statistics
+    options = request.get_json(silent=True) or {}
+    if not isinstance(options, dict):
+        return jsonify({"error": "Parametry optymalizacji muszą być obiektem JSON"}), 400
+    objective = options.get("objective", "max_sharpe")
+    try:
+        target_return = options.get("target_return")
+        target_return = None if target_return is None else float(target_return)
+        risk_free_rate = float(options.get("risk_free_rate") or 0.0)
+        frontier_points = max(0, min(int(options.get("frontier") or 0), 200))
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "Nieprawidłowe parametry optymalizacji"}), 400
+    if not math.isfinite(risk_free_rate) or (target_return is not None and not math.isfinite(target_return)):
+        return jsonify({"error": "Nieprawidłowe parametry optymalizacji"}), 400
+    if objective not in OBJECTIVES:
+        return jsonify({"error": f"Nieznany cel optymalizacji: {objective}"}), 400
+    if objective == "target_return" and target_return is None:
+        return jsonify({"error": "Brak docelowej stopy zwrotu (target_return)"}), 400
+
+    portfolio = Portfolio()
+    for symbol, data in asset_cache.get(db, uid).items():
+        portfolio.add_asset(symbol, data["amount"], data["price"])
+
+    if not len(portfolio):
         return jsonify({"suggestions": ["Portfel jest pusty."]})
 
     try:
-        symbols = list(assets.keys())
-        prices = np.array([Portfolio.get_historical_data(s, CRYPTOCOMPARE_API_KEY, limit=100)[1] for s in symbols])
-        returns = np.diff(prices, axis=1) / prices[:, :-1]
-        mean_returns = np.mean(returns, axis=1)
-
-        def neg_return(weights): return -np.dot(weights, mean_returns)
-        result = minimize(neg_return, np.ones(len(symbols)) / len(symbols), bounds=[(0, 1)]*len(symbols), constraints={"type": "eq", "fun": lambda w: np.sum(w) - 1})
-        if not result.success:
-            raise Exception("Niepowodzenie optymalizacji")
-
-        suggestions = []
-        total_val = sum(p * a for p, a in assets.values())
-        for i, s in enumerate(symbols):
-            current_val = assets[s][0] * assets[s][1]
-            current_w = current_val / total_val
-            target_w = result.x[i]
-            delta = target_w - current_w
-            if abs(delta) > 0.02:
-                action = "Zwiększ" if delta > 0 else "Zmniejsz"
-                suggestions.append(f"{action} udział {s} do {target_w*100:.2f}% (obecnie {current_w*100:.2f}%)")
-
-        if not suggestions:
-            suggestions.append("Portfel jest już zoptymalizowany.")
-
-        return jsonify({"suggestions": suggestions})
+        symbols = [asset["crypto_name"] for asset in portfolio.assets]
+        histories = Portfolio.get_historical_data_many(symbols, CRYPTOCOMPARE_API_KEY, limit=100)
+        missing = [s for s in symbols if len(histories[s][1]) < 2]
+        if missing:
+            return jsonify({"suggestions": [f"Brak wystarczających danych historycznych dla {', '.join(missing)}."]})
+        prices = Portfolio.align_prices([histories[s][1] for s in symbols])
+
+        result = analytics.run(optimize_prices, prices, objective, target_return, frontier_points, risk_free_rate)
+        response = {
+            "suggestions": portfolio.generate_markowitz_suggestions(result["weights"]),
+            "weights": dict(zip(symbols, result["weights"])),
+            "expected_return": result["expected_return"],
+            "volatility": result["volatility"]
+        }
+        if frontier_points:
+            response["frontier"] = [
+                {**point, "weights": dict(zip(symbols, point["weights"]))} for point in result["frontier"]
+            ]
+        return jsonify(response)
 
+    except (AnalyticsBusy, AnalyticsTimeout):
+        raise
     except Exception as e:
         return jsonify({"suggestions": [f"Błąd: {str(e)}"]})
 
-@app.route("/api/alerts", methods=["GET", "POST"])
+@web.route("/api/alerts", methods=["GET", "POST"])
 def api_alerts():
     uid = get_user_id()
     if not uid:
         return jsonify({"error": "unauthorized"}), 401
 
+    from firebase_admin import firestore
     if request.method == "POST":
         data = request.get_json()
-        symbol = data.get("symbol")
+        symbol = (data.get("symbol") or "").strip().upper()
         target = data.get("threshold")
         if not symbol or target is None:
             return jsonify({"error": "Brakuje danych"}), 400
+        if not coin_catalogue.is_valid(symbol):
+            return jsonify({"error": f"Nieznany symbol: {symbol}"}), 400
 
         db.collection("alerts").add({
             "uid": uid,
@@ -361,7 +494,97 @@ def api_alerts():
             ]
         })
 
-@app.route("/api/alerts/<alert_id>", methods=["DELETE"])
+# Ryzyko portfela: /api/risk?paths=100000&confidence=0.95&seed=1 - VaR/CVaR
+# (historyczny, parametryczny, Monte Carlo) i percentyle wartości dla 1/7/30 dni
+@web.route("/api/risk")
+def api_risk():
+    uid = get_user_id()
+    if not uid:
+        return jsonify({"error": "unauthorized"}), 401
+
+    paths = min(max(request.args.get("paths", 100000, type=int), 1000), RISK_MAX_PATHS)
+    confidence = min(max(request.args.get("confidence", 0.95, type=float), 0.5), 0.999)
+    seed = request.args.get("seed", type=int)
+
+    history, error = _holdings_history(asset_cache.get(db, uid))
+    if error:
+        return error
+    symbols, prices, amounts = history
+
+    report = analytics.run(risk_report, prices, amounts, confidence=confidence, paths=paths, seed=seed)
+    return jsonify({**report, "symbols": symbols})
+
+# Wskaźniki dla wielu symboli naraz: /api/indicators?symbols=BTC,ETH&window=7&days=90;
+# serie są wyrównane do wspólnego końca i liczone jako jedna macierz symbole × czas
+@web.route("/api/indicators")
+def api_indicators():
+    symbols = [s.strip().upper() for s in request.args.get("symbols", "").split(",") if s.strip()]
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols or len(symbols) > MAX_INDICATOR_SYMBOLS:
+        return jsonify({"error": f"Podaj od 1 do {MAX_INDICATOR_SYMBOLS} symboli"}), 400
+    # Nieznane symbole nie trafiają do CryptoCompare ani do lokalnej bazy historii
+    unknown = [symbol for symbol in symbols if not coin_catalogue.is_valid(symbol)]
+    if unknown:
+        return jsonify({"error": f"Nieznane symbole: {', '.join(unknown)}", "unknown": unknown}), 400
+    window = min(max(request.args.get("window", 7, type=int), 2), 200)
+    days = min(max(request.args.get("days", 90, type=int), window), 2000)
+    rsi_period = min(max(request.args.get("rsi", 14, type=int), 2), 100)
+
+    history = Portfolio.get_historical_data_many(symbols, CRYPTOCOMPARE_API_KEY, limit=days)
+    available = [symbol for symbol in symbols if history[symbol][1]]
+    if not available:
+        return jsonify({"error": "Brak danych historycznych", "missing": symbols}), 404
+
+    prices = Portfolio.align_prices([history[symbol][1] for symbol in available])
+    dates = history[min(available, key=lambda symbol: len(history[symbol][1]))][0][-prices.shape[1]:]
+    computed = indicators.compute(prices, window=window, rsi_period=rsi_period, periods=365)
+
+    return jsonify({
+        "dates": [d.isoformat() if hasattr(d, "isoformat") else d for d in dates],
+        "window": window,
+        "indicators": {
+            symbol: {"price": prices[row].tolist(),
+                     **{name: indicators.to_list(series[row]) for name, series in computed.items()}}
+            for row, symbol in enumerate(available)
+        },
+        "missing": [symbol for symbol in symbols if symbol not in available]
+    })
+
+# Autouzupełnianie symboli: /api/coins?q=bit&limit=20
+@web.route("/api/coins")
+def api_coins():
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+    return jsonify({"coins": coin_catalogue.search(request.args.get("q", ""), limit)})
+
+@web.route("/api/stats")
+def api_stats():
+    uid = get_user_id()
+    if not uid:
+        return jsonify({"error": "unauthorized"}), 401
+
+    return jsonify({
+        "price_cache": price_cache.stats(),
+        "coin_catalogue": coin_catalogue.stats(),
+        "chart_cache": chart_cache.stats(),
+        "analytics": analytics.stats(),
+        "alerts": {"pending": len(scheduler.alert_engine), **scheduler.alert_delivery.stats()},
+        "mailer": scheduler.mailer.stats(),
+        "scheduler": scheduler.scheduler_stats(),
+        "auth": token_cache.stats(),
+        "portfolio_cache": asset_cache.stats(),
+        "price_stream": price_poller.stats()
+    })
+
+@web.route("/api/logout", methods=["POST"])
+def api_logout():
+    uid = get_user_id()
+    if not uid:
+        return jsonify({"error": "unauthorized"}), 401
+
+    token_cache.revoke_user(uid)
+    return jsonify({"status": "logged_out"})
+
+@web.route("/api/alerts/<alert_id>", methods=["DELETE"])
 def delete_alert(alert_id):
     uid = get_user_id()
     if not uid:
@@ -380,18 +603,44 @@ def delete_alert(alert_id):
     return jsonify({"status": "deleted"})
 
 
+@web.app_errorhandler(AnalyticsBusy)
+def analytics_busy(e):
+    return jsonify({"error": str(e)}), 503
+
+@web.app_errorhandler(AnalyticsTimeout)
+def analytics_timeout(e):
+    return jsonify({"error": str(e)}), 504
+
+
 # Widoki HTML
-@app.route("/forecast")
+@web.route("/forecast")
 def forecast_view():
     return render_template("forecast.html")
 
-@app.route("/optimize")
+@web.route("/optimize")
 def optimize_view():
     return render_template("optimize.html")
 
-@app.route("/alerts")
+@web.route("/alerts")
 def alerts_view():
     return render_template("alerts.html")
 
+# Fabryka aplikacji; ciężkie zależności (Firebase, statsmodels, scipy, matplotlib)
+# są ładowane dopiero przy pierwszym użyciu, a scheduler alertów działa osobno
+# (python scheduler.py), chyba że SCHEDULER_IN_PROCESS=1 i aplikacja powstaje
+# przez wywołanie fabryki (gunicorn "app:create_app()") albo python app.py
+def create_app(start_scheduler=SCHEDULER_IN_PROCESS):
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(web)
+    if start_scheduler:
+        scheduler.start_scheduler(blocking=False)
+    return flask_app
+
+# Sam import modułu nie uruchamia schedulera: procesy puli analitycznej (spawn)
+# importują app.py ponownie jako __mp_main__
+app = create_app(start_scheduler=False)
+
 if __name__ == "__main__":
+    if SCHEDULER_IN_PROCESS:
+        scheduler.start_scheduler(blocking=False)
     app.run(debug=True)
@@ -0,0 +1,93 @@
+import math
+import threading
+from cache import TTLCache
+
+
+# Migawki portfeli użytkowników (uid -> {symbol: {"amount", "price"}}) trzymane w pamięci
+# procesu; zapisy z API aktualizują je write-through, opcjonalnie odświeża je nasłuch Firestore.
+# Migawki z nasłuchem nie wygasają, a nasłuch kończy się razem z usunięciem migawki z cache.
+# Bez nasłuchu zapis w innym procesie widać dopiero po wygaśnięciu migawki, stąd krótki ttl
+class AssetSnapshotCache:
+    def __init__(self, maxsize=10000, ttl=5.0, listen=False, max_listeners=1000):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, on_evict=lambda uid, snapshot: self._unwatch(uid))
+        self._lock = threading.Lock()
+        self.listen = listen
+        self.max_listeners = max_listeners
+        self._watches = {}
+
+    @staticmethod
+    def _collection(db, uid):
+        return db.collection("portfolios").document(uid).collection("assets")
+
+    def _load(self, db, uid):
+        snapshot = {doc.id: doc.to_dict() for doc in self._collection(db, uid).stream()}
+        if self.listen:
+            self._watch(db, uid)
+        return snapshot
+
+    def _watch(self, db, uid):
+        with self._lock:
+            if uid in self._watches or len(self._watches) >= self.max_listeners:
+                return
+            self._watches[uid] = None
+        try:
+            watch = self._collection(db, uid).on_snapshot(
+                lambda docs, changes, read_time: self._on_snapshot(uid, docs))
+        except Exception as e:
+            print("⚠️ Nasłuch portfela niedostępny:", e)
+            with self._lock:
+                self._watches.pop(uid, None)
+            return
+        with self._lock:
+            self._watches[uid] = watch
+
+    # Spóźnione powiadomienie po zakończeniu nasłuchu nie może przywrócić migawki bez wygasania
+    def _on_snapshot(self, uid, docs):
+        if uid in self._watches:
+            self._cache.set(uid, {doc.id: doc.to_dict() for doc in docs}, ttl=math.inf)
+
+    def _unwatch(self, uid):
+        with self._lock:
+            watch = self._watches.pop(uid, None)
+        if watch is not None:
+            watch.unsubscribe()
+
+    def get(self, db, uid):
+        ttl = math.inf if uid in self._watches else None
+        snapshot = self._cache.get_or_load(uid, lambda: self._load(db, uid), ttl=ttl)
+        with self._lock:
+            return {symbol: dict(data) for symbol, data in snapshot.items()}
+
+    # Aktualizacje write-through zmieniają migawkę obecną w cache; gdy jej nie ma
+    # (np. trwa właśnie jej wczytywanie), uid jest unieważniany, żeby wczytana
+    # przed zapisem migawka nie trafiła do cache
+    def put(self, uid, symbol, data):
+        snapshot = self._cache.peek(uid)
+        if snapshot is None:
+            self._cache.delete(uid)
+            return
+        with self._lock:
+            snapshot[symbol] = dict(data)
+
+    def remove(self, uid, symbol):
+        snapshot = self._cache.peek(uid)
+        if snapshot is None:
+            self._cache.delete(uid)
+            return
+        with self._lock:
+            snapshot.pop(symbol, None)
+
+    def invalidate(self, uid):
+        self._cache.delete(uid)
+        self._unwatch(uid)
+
+    def clear(self):
+        self._cache.clear()
+        with self._lock:
+            watches, self._watches = self._watches, {}
+        for watch in watches.values():
+            if watch is not None:
+                watch.unsubscribe()
+
+    def stats(self):
+        return {**self._cache.stats(), "listeners": len(self._watches)}
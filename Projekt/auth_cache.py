@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+from cache import TTLCache
+
+
+# Cache zweryfikowanych tokenów ID: skrót tokenu -> zdekodowane claims.
+# Wpis żyje najwyżej do `exp` tokenu i nie dłużej niż max_ttl, co ogranicza
+# okno, w którym unieważniony token może zostać jeszcze zaakceptowany
+class TokenCache:
+    def __init__(self, verify, maxsize=10000, max_ttl=300.0, clock=time.time):
+        self._verify = verify
+        self._clock = clock
+        self.max_ttl = max_ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=max_ttl)
+        self._keys_by_uid = {}
+        self._lock = threading.Lock()
+        self.verifications = 0
+        self.verification_time = 0.0
+        self.rejected = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def verify(self, token):
+        key = self._key(token)
+        claims = self._cache.get(key)
+        if claims is not None:
+            if claims.get("exp") is None or claims["exp"] > self._clock():
+                return claims
+            self._cache.delete(key)
+
+        start = time.perf_counter()
+        try:
+            claims = self._verify(token)
+        except Exception:
+            self.rejected += 1
+            raise
+        finally:
+            self.verifications += 1
+            self.verification_time += time.perf_counter() - start
+
+        ttl = self.max_ttl
+        if claims.get("exp") is not None:
+            ttl = min(ttl, claims["exp"] - self._clock())
+        if ttl > 0:
+            self._cache.set(key, claims, ttl=ttl)
+            uid = claims.get("uid")
+            if uid is not None:
+                with self._lock:
+                    keys = {k for k in self._keys_by_uid.get(uid, ()) if k in self._cache}
+                    keys.add(key)
+                    self._keys_by_uid[uid] = keys
+        return claims
+
+    # Usuwa z cache wszystkie tokeny użytkownika (np. po wylogowaniu lub unieważnieniu)
+    def revoke_user(self, uid):
+        with self._lock:
+            keys = self._keys_by_uid.pop(uid, set())
+        for key in keys:
+            self._cache.delete(key)
+        return len(keys)
+
+    def clear(self):
+        self._cache.clear()
+        with self._lock:
+            self._keys_by_uid.clear()
+
+    def stats(self):
+        cache_stats = self._cache.stats()
+        return {
+            **cache_stats,
+            "verifications": self.verifications,
+            "rejected": self.rejected,
+            "avg_verification_ms": 1000 * self.verification_time / self.verifications if self.verifications else 0.0,
+        }
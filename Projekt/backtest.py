@@ -0,0 +1,164 @@
+import argparse
+import itertools
+import multiprocessing
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import indicators
+from optimizer import optimize_prices, REBALANCE_THRESHOLD
+
+STRATEGIES = ("none", "periodic", "threshold")
+# Długość okna (w dniach), w którym szukane jest kolejne przekroczenie progu
+SCAN_WINDOW = 64
+
+
+# Symulacja strategii rebalansowania na macierzy cen (symbole × dni). Między
+# rebalansowaniami liczba jednostek jest stała, więc cały odcinek wyceniany jest
+# jednym iloczynem macierzowym; pętla przechodzi tylko po kolejnych rebalansowaniach,
+# a przekroczenia progu szuka w oknach po SCAN_WINDOW dni (koszt O(n·T) niezależnie
+# od liczby rebalansowań)
+def backtest(prices, weights, strategy="threshold", threshold=REBALANCE_THRESHOLD, period=30, fee=0.001,
+             initial=1.0):
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Nieznana strategia: {strategy}")
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    days = prices.shape[1]
+
+    equity = np.empty(days)
+    holdings = initial * weights / prices[:, 0]
+    rebalance_days = []
+    turnover = 0.0
+    fees = 0.0
+    t = 0
+    while True:
+        following = None
+        if strategy == "periodic":
+            following = t + period if t + period < days else None
+        elif strategy == "threshold":
+            following = _first_crossing(prices, holdings, weights, threshold, t + 1)
+
+        end = days if following is None else following
+        equity[t:end] = holdings @ prices[:, t:end]
+        if following is None:
+            break
+
+        value = holdings @ prices[:, following]
+        traded = np.abs(value * weights - holdings * prices[:, following]).sum()
+        cost = fee * traded
+        turnover += traded / 2 / value
+        fees += cost
+        holdings = (value - cost) * weights / prices[:, following]
+        rebalance_days.append(following)
+        t = following
+
+    daily = equity[1:] / equity[:-1] - 1
+    return {
+        "strategy": strategy,
+        "threshold": threshold if strategy == "threshold" else None,
+        "period": period if strategy == "periodic" else None,
+        "fee": fee,
+        "equity": equity,
+        "total_return": float(equity[-1] / initial - 1),
+        "volatility": float(daily.std(ddof=1) * math.sqrt(365)) if daily.size > 1 else 0.0,
+        "max_drawdown": float(indicators.drawdown(equity).min()),
+        "turnover": float(turnover),
+        "rebalances": len(rebalance_days),
+        "rebalance_days": rebalance_days,
+        "fees": float(fees),
+    }
+
+
+# Pierwszy dzień od `start`, w którym odchylenie którejkolwiek wagi przekracza próg
+def _first_crossing(prices, holdings, weights, threshold, start):
+    days = prices.shape[1]
+    while start < days:
+        stop = min(start + SCAN_WINDOW, days)
+        values = holdings[:, None] * prices[:, start:stop]
+        drift = np.abs(values / values.sum(axis=0) - weights[:, None]).max(axis=0)
+        crossed = np.flatnonzero(drift > threshold)
+        if crossed.size:
+            return start + int(crossed[0])
+        start = stop
+    return None
+
+
+# Siatka parametrów: param_grid(strategy=["threshold"], threshold=[0.01, 0.02]) -> lista słowników
+def param_grid(**axes):
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+_worker_data = None
+
+
+def _init_worker(prices, weights):
+    global _worker_data
+    _worker_data = (prices, weights)
+
+
+def _run_params(params):
+    prices, weights = _worker_data
+    result = backtest(prices, weights, **params)
+    del result["equity"]
+    return result
+
+
+# Przegląd siatki parametrów w puli procesów; dane cenowe trafiają do każdego
+# procesu raz (initializer), a nie z każdym zadaniem. max_workers=0 liczy w bieżącym procesie
+def sweep(prices, weights, grid, max_workers=None):
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    weights = np.asarray(weights, dtype=float)
+    if max_workers == 0:
+        _init_worker(prices, weights)
+        return [_run_params(params) for params in grid]
+    with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(prices, weights)) as pool:
+        return list(pool.map(_run_params, grid, chunksize=max(1, len(grid) // (4 * (max_workers or 4)))))
+
+
+# Wagi Markowitza wyznaczone na pierwszych `lookback` dniach, testowane na pozostałych
+def markowitz_split(prices, lookback, objective="max_sharpe"):
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    weights = np.asarray(optimize_prices(prices[:, :lookback], objective)["weights"])
+    return weights, prices[:, lookback - 1:]
+
+
+def main():
+    from portfolio import Portfolio, CRYPTOCOMPARE_API_KEY
+
+    parser = argparse.ArgumentParser(description="Backtest strategii rebalansowania portfela Markowitza")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--lookback", type=int, default=None, help="dni do wyznaczenia wag (domyślnie 1/3 historii)")
+    parser.add_argument("--thresholds", type=float, nargs="*", default=[0.01, REBALANCE_THRESHOLD, 0.05, 0.1])
+    parser.add_argument("--periods", type=int, nargs="*", default=[7, 30, 90])
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    symbols = [symbol.upper() for symbol in args.symbols]
+    histories = Portfolio.get_historical_data_many(symbols, CRYPTOCOMPARE_API_KEY, limit=args.days)
+    missing = [symbol for symbol in symbols if len(histories[symbol][1]) < 10]
+    if missing:
+        raise SystemExit(f"Brak danych historycznych dla: {', '.join(missing)}")
+    prices = Portfolio.align_prices([histories[symbol][1] for symbol in symbols])
+    weights, test_prices = markowitz_split(prices, args.lookback or prices.shape[1] // 3)
+
+    grid = ([{"strategy": "none", "fee": args.fee}]
+            + param_grid(strategy=["periodic"], period=args.periods, fee=[args.fee])
+            + param_grid(strategy=["threshold"], threshold=args.thresholds, fee=[args.fee]))
+    results = sweep(test_prices, weights, grid, args.workers)
+
+    print("Wagi:", ", ".join(f"{symbol} {weight:.1%}" for symbol, weight in zip(symbols, weights)))
+    print(f"{'strategia':<12}{'parametr':>10}{'zwrot':>10}{'zmienność':>11}{'max DD':>9}{'obrót':>8}{'rebal.':>8}")
+    for result in results:
+        parameter = result["threshold"] if result["threshold"] is not None else result["period"]
+        print(f"{result['strategy']:<12}{'' if parameter is None else parameter:>10}{result['total_return']:>10.2%}"
+              f"{result['volatility']:>11.2%}{result['max_drawdown']:>9.2%}{result['turnover']:>8.2f}"
+              f"{result['rebalances']:>8}")
+
+
+if __name__ == "__main__":
+    main()
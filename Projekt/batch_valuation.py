@@ -0,0 +1,147 @@
+import argparse
+import datetime
+import os
+import time
+from array import array
+import numpy as np
+from dotenv import load_dotenv
+from portfolio import Portfolio
+
+load_dotenv()
+CRYPTOCOMPARE_API_KEY = os.getenv("CRYPTOCOMPARE_API_KEY")
+VALUATION_PAGE_SIZE = int(os.getenv("VALUATION_PAGE_SIZE", 1000))
+VALUATIONS_COLLECTION = "portfolio_valuations"
+MAX_WRITE_ATTEMPTS = 5
+
+
+# Aktywa wszystkich użytkowników w kolumnach liczbowych (indeks użytkownika,
+# indeks symbolu, ilość, zapisana cena): ok. 24 B na pozycję zamiast dokumentów
+class AssetColumns:
+    def __init__(self):
+        self.uids = []
+        self.symbols = {}
+        self.user = array("l")
+        self.symbol = array("l")
+        self.amount = array("d")
+        self.stored_price = array("d")
+
+    # Dokumenty przychodzą posortowane po ścieżce, więc aktywa jednego użytkownika
+    # są ciągłe; nowy użytkownik to po prostu zmiana uid (także na granicy stron)
+    def add(self, uid, symbol, amount, stored_price):
+        if not self.uids or self.uids[-1] != uid:
+            self.uids.append(uid)
+        self.user.append(len(self.uids) - 1)
+        self.symbol.append(self.symbols.setdefault(symbol, len(self.symbols)))
+        self.amount.append(amount)
+        self.stored_price.append(stored_price)
+
+    def __len__(self):
+        return len(self.amount)
+
+
+# Strumieniuje wszystkie dokumenty portfolios/{uid}/assets/{symbol} zapytaniem
+# collection group, stronami po page_size dokumentów (start_after ostatniego)
+def scan_assets(db, page_size=VALUATION_PAGE_SIZE):
+    columns = AssetColumns()
+    query = db.collection_group("assets").order_by("__name__").select(["amount", "price"]).limit(page_size)
+    last = None
+    pages = 0
+    while True:
+        page = query.start_after(last) if last is not None else query
+        docs = list(page.stream())
+        for doc in docs:
+            portfolio = doc.reference.parent.parent
+            if portfolio is None or portfolio.parent.id != "portfolios":
+                continue
+            data = doc.to_dict() or {}
+            columns.add(portfolio.id, doc.id, float(data.get("amount") or 0), float(data.get("price") or 0))
+        pages += 1
+        if len(docs) < page_size:
+            return columns, pages
+        last = docs[-1]
+
+
+# Wartości portfeli: ceny bieżące z jednego zapytania zbiorczego, a dla symboli
+# bez notowania ostatnia zapisana cena; sumy per użytkownik przez bincount
+def value_portfolios(columns, prices):
+    symbols = list(columns.symbols)
+    current = np.array([prices.get(symbol) or 0.0 for symbol in symbols], dtype=float)
+    user, amount = np.asarray(columns.user), np.asarray(columns.amount)
+
+    asset_prices = current[np.asarray(columns.symbol)]
+    stale = asset_prices <= 0
+    asset_prices = np.where(stale, np.asarray(columns.stored_price), asset_prices)
+    n = len(columns.uids)
+    totals = np.bincount(user, weights=amount * asset_prices, minlength=n)
+    counts = np.bincount(user, minlength=n)
+    stale_counts = np.bincount(user, weights=stale, minlength=n).astype(int)
+    return totals, counts, stale_counts
+
+
+def write_valuations(db, uids, totals, counts, stale_counts, valued_at):
+    failed = []
+
+    # BulkWriter wywołuje callback jako (BulkWriteFailure, BulkWriter); True = ponów zapis
+    def on_error(failure, _writer):
+        if failure.attempts < MAX_WRITE_ATTEMPTS:
+            return True
+        failed.append(failure.operation.reference.id)
+        return False
+
+    writer = db.bulk_writer()
+    writer.on_write_error(on_error)
+    collection = db.collection(VALUATIONS_COLLECTION)
+    for uid, total, count, stale in zip(uids, totals.tolist(), counts.tolist(), stale_counts.tolist()):
+        writer.set(collection.document(uid), {
+            "total_value": total,
+            "assets": count,
+            "stale_assets": stale,
+            "valued_at": valued_at,
+        })
+    writer.close()
+    return failed
+
+
+# Nocna wycena wszystkich portfeli; dry_run liczy bez zapisu
+def run_batch_valuation(db, api_key=CRYPTOCOMPARE_API_KEY, page_size=VALUATION_PAGE_SIZE, dry_run=False):
+    started = time.perf_counter()
+    columns, pages = scan_assets(db, page_size)
+    prices = Portfolio.get_current_prices(list(columns.symbols), api_key)
+    valued_at = datetime.datetime.now(datetime.timezone.utc)
+    totals, counts, stale_counts = value_portfolios(columns, prices)
+
+    failed = []
+    if not dry_run and columns.uids:
+        failed = write_valuations(db, columns.uids, totals, counts, stale_counts, valued_at)
+    return {
+        "users": len(columns.uids),
+        "assets": len(columns),
+        "symbols": len(columns.symbols),
+        "unpriced_symbols": sorted(symbol for symbol in columns.symbols if not prices.get(symbol)),
+        "pages": pages,
+        "total_value": float(totals.sum()),
+        "failed_writes": failed,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    from firebase_client import db
+
+    parser = argparse.ArgumentParser(description="Wycena portfeli wszystkich użytkowników")
+    parser.add_argument("--page-size", type=int, default=VALUATION_PAGE_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="bez zapisu do Firestore")
+    args = parser.parse_args()
+
+    stats = run_batch_valuation(db, page_size=args.page_size, dry_run=args.dry_run)
+    print(f"✅ Wyceniono portfeli: {stats['users']} (aktywa: {stats['assets']}, symbole: {stats['symbols']}, "
+          f"strony: {stats['pages']}) w {stats['seconds']:.1f} s; łącznie {stats['total_value']:.2f} USD")
+    if stats["unpriced_symbols"]:
+        print("⚠️ Brak bieżącej ceny (użyto zapisanej):", ", ".join(stats["unpriced_symbols"]))
+    if stats["failed_writes"]:
+        print(f"❌ Nie zapisano wyceny dla {len(stats['failed_writes'])} użytkowników")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
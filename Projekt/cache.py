@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False
+
+
+# Wspólny cache LRU z TTL; równoległe chybienia dla tego samego klucza
+# są łączone w jedno pobranie (request coalescing). on_evict(key, value) jest
+# wywoływane (poza blokadą) dla wpisów usuniętych przez LRU lub wygasłych;
+# ttl=math.inf oznacza wpis bez wygasania
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.monotonic, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._on_evict = on_evict
+        self._evicted = []
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            if self._on_evict is not None:
+                self._evicted.append((key, value))
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def _store(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted = self._data.popitem(last=False)
+            self.evictions += 1
+            if self._on_evict is not None:
+                self._evicted.append((evicted[0], evicted[1][0]))
+
+    def _notify_evicted(self):
+        if not self._evicted:
+            return
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        for key, value in evicted:
+            self._on_evict(key, value)
+
+    # Zapis lub usunięcie w trakcie pobierania unieważnia jego wynik, żeby starsze
+    # dane nie nadpisały nowszych
+    def _invalidate_inflight(self, key):
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight.stale = True
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._notify_evicted()
+        return value if found else default
+
+    # Odczyt bez wpływu na liczniki trafień
+    def peek(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+        self._notify_evicted()
+        return value if found else default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._invalidate_inflight(key)
+            self._store(key, value, ttl)
+        self._notify_evicted()
+
+    def delete(self, key):
+        with self._lock:
+            self._invalidate_inflight(key)
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            for key in self._inflight:
+                self._invalidate_inflight(key)
+            self._data.clear()
+
+    def get_or_load(self, key, loader, ttl=None):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+            else:
+                self.coalesced += 1
+
+        self._notify_evicted()
+        if not leader:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            inflight.value = loader()
+        except BaseException as e:
+            inflight.error = e
+            raise
+        else:
+            with self._lock:
+                if not inflight.stale:
+                    self._store(key, inflight.value, ttl)
+            return inflight.value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.event.set()
+            self._notify_evicted()
+
+    # Zbiorcze get_or_load: loader(keys) -> {klucz: wartość} dostaje tylko klucze, których
+    # nie ma w cache ani nie ładuje już inny wątek (na te się czeka). Klucz pominięty
+    # w wyniku loadera nie trafia do cache, a czekający na niego dostają KeyError;
+    # zwraca wartości znalezionych kluczy
+    def get_or_load_many(self, keys, loader, ttl=None):
+        results = {}
+        leading = {}
+        waiting = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                    results[key] = value
+                    continue
+                self.misses += 1
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    inflight = _InFlight()
+                    self._inflight[key] = inflight
+                    leading[key] = inflight
+                else:
+                    self.coalesced += 1
+                    waiting[key] = inflight
+
+        self._notify_evicted()
+        if leading:
+            try:
+                loaded = loader(list(leading))
+            except BaseException as e:
+                for inflight in leading.values():
+                    inflight.error = e
+                raise
+            else:
+                with self._lock:
+                    for key, inflight in leading.items():
+                        if key not in loaded:
+                            inflight.error = KeyError(key)
+                            continue
+                        inflight.value = results[key] = loaded[key]
+                        if not inflight.stale:
+                            self._store(key, inflight.value, ttl)
+            finally:
+                with self._lock:
+                    for key in leading:
+                        self._inflight.pop(key, None)
+                for inflight in leading.values():
+                    inflight.event.set()
+                self._notify_evicted()
+
+        for key, inflight in waiting.items():
+            inflight.event.wait()
+            if inflight.error is None:
+                results[key] = inflight.value
+        return results
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            found = self._lookup(key)[0]
+        self._notify_evicted()
+        return found
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "coalesced": self.coalesced,
+            }
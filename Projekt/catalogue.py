@@ -0,0 +1,152 @@
+import gzip
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+
+# Katalog monet CryptoCompare: lista zapisana na dysku (gzip JSON) i odświeżana
+# dopiero po max_age; w pamięci zbiór symboli (walidacja O(1)) oraz posortowane
+# indeksy symboli i nazw do wyszukiwania po prefiksie (autouzupełnianie)
+class CoinCatalogue:
+    def __init__(self, path, fetch, max_age=86400.0, retry_interval=300.0, clock=time.time):
+        self.path = path
+        self._fetch = fetch
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._symbols = None
+        self._names = {}
+        self._sorted = []
+        self._by_name = []
+        self._fetched_at = None
+        self._disk_checked = False
+        self._refreshing = False
+        self._retry_at = 0.0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _build(self, coins, fetched_at):
+        names = {}
+        for symbol, name in coins:
+            names[str(symbol).upper()] = name or ""
+        self._names = names
+        self._symbols = frozenset(names)
+        self._sorted = sorted(names)
+        self._by_name = sorted((name.lower(), symbol) for symbol, name in names.items() if name)
+        self._fetched_at = fetched_at
+
+    def _read_disk(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            self._build(data["coins"], data["fetched_at"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print("⚠️ Uszkodzony plik katalogu monet, zostanie pobrany ponownie:", e)
+
+    def _write_disk(self, coins, fetched_at):
+        tmp = f"{self.path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"fetched_at": fetched_at, "coins": coins}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    # Pobiera listę na nowo; przy błędzie zostaje poprzednia wersja
+    def refresh(self):
+        try:
+            coins = [[symbol, name] for symbol, name in self._fetch()]
+            if not coins:
+                raise ValueError("pusta lista monet")
+            fetched_at = self._clock()
+            with self._lock:
+                self._build(coins, fetched_at)
+                self.refreshes += 1
+            try:
+                self._write_disk(coins, fetched_at)
+            except OSError as e:
+                print("⚠️ Nie udało się zapisać katalogu monet:", e)
+            return True
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+                self._retry_at = self._clock() + self.retry_interval
+            print("⚠️ Nie udało się pobrać listy monet:", e)
+            return False
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    # Pierwsze użycie czeka na dane; nieaktualny katalog jest odświeżany w tle
+    def _ensure(self):
+        with self._lock:
+            if not self._disk_checked:
+                self._disk_checked = True
+                self._read_disk()
+            now = self._clock()
+            due = ((self._fetched_at is None or now - self._fetched_at >= self.max_age)
+                   and now >= self._retry_at and not self._refreshing)
+            if due:
+                self._refreshing = True
+            loaded = self._symbols is not None
+        if due:
+            if loaded:
+                threading.Thread(target=self.refresh, name="coin-catalogue", daemon=True).start()
+            else:
+                self.refresh()
+
+    def available(self):
+        self._ensure()
+        return self._symbols is not None
+
+    def __contains__(self, symbol):
+        self._ensure()
+        symbols = self._symbols
+        return symbols is not None and str(symbol).upper() in symbols
+
+    # Walidacja symbolu; gdy katalog jest niedostępny, symbol jest przepuszczany
+    def is_valid(self, symbol):
+        self._ensure()
+        symbols = self._symbols
+        return symbols is None or str(symbol).upper() in symbols
+
+    def symbols(self):
+        self._ensure()
+        return list(self._sorted)
+
+    def search(self, query, limit=20):
+        self._ensure()
+        query = query.strip()
+        if not query or self._symbols is None:
+            return []
+        with self._lock:
+            ordered, by_name, names = self._sorted, self._by_name, self._names
+
+        found = []
+        prefix = query.upper()
+        for symbol in ordered[bisect_left(ordered, prefix):]:
+            if len(found) >= limit or not symbol.startswith(prefix):
+                break
+            found.append(symbol)
+
+        prefix = query.lower()
+        seen = set(found)
+        for name, symbol in by_name[bisect_left(by_name, (prefix,)):]:
+            if len(found) >= limit or not name.startswith(prefix):
+                break
+            if symbol not in seen:
+                seen.add(symbol)
+                found.append(symbol)
+        return [{"symbol": symbol, "name": names[symbol]} for symbol in found]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "coins": len(self._symbols) if self._symbols is not None else 0,
+                "age": self._clock() - self._fetched_at if self._fetched_at is not None else None,
+                "max_age": self.max_age,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
@@ -0,0 +1,79 @@
+import io
+import math
+import indicators
+from portfolio import Portfolio
+
+# Formaty obrazów obsługiwane przez render_chart (svg = wykres wektorowy)
+CHART_FORMATS = {"png": "image/png", "webp": "image/webp", "svg": "image/svg+xml"}
+
+
+# Serie wykresu: cena, wskaźniki i prognoza z przedziałem ufności (bez matplotlib)
+def chart_series(symbol, dates, prices, window=7, days=7, model=None):
+    computed = indicators.compute(prices, window=window)
+    series = {"dates": list(dates), "prices": list(prices), "forecast": None}
+    for name in ("sma", "ema", "bollinger_upper", "bollinger_lower"):
+        series[name] = computed[name]
+
+    predicted, conf_int = Portfolio.forecast_prices(prices, days=days, symbol=symbol, model=model)
+    if predicted is not None:
+        step = dates[1] - dates[0] if len(dates) > 1 else 1
+        series["forecast"] = {
+            "dates": [dates[-1] + (i + 1) * step for i in range(len(predicted))],
+            "mean": list(predicted),
+            "lower": [row[0] for row in conf_int],
+            "upper": [row[1] for row in conf_int],
+        }
+    return series
+
+
+def _json_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+# Zwięzła wersja danych wykresu do narysowania po stronie klienta
+def chart_data(symbol, dates, prices, window=7, days=7, model=None):
+    series = chart_series(symbol, dates, prices, window, days, model)
+    forecast = series["forecast"]
+    return {
+        "symbol": symbol,
+        "window": window,
+        "model": model,
+        "dates": [_json_value(d) for d in series["dates"]],
+        "prices": [_json_value(p) for p in series["prices"]],
+        **{name: indicators.to_list(series[name]) for name in ("sma", "ema", "bollinger_upper", "bollinger_lower")},
+        "forecast": None if forecast is None else {
+            key: [_json_value(v) for v in values] for key, values in forecast.items()
+        },
+    }
+
+
+# Renderuje wykres ceny z SMA i prognozą do PNG, WebP lub SVG
+def render_chart(symbol, dates, prices, window=7, days=7, model=None, fmt="png"):
+    from matplotlib.figure import Figure
+    series = chart_series(symbol, dates, prices, window, days, model)
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.plot(dates, prices, label="Cena", color="skyblue")
+    ax.plot(dates, series["sma"], label=f"SMA {window}", linestyle="--", color="darkred")
+
+    forecast = series["forecast"]
+    if forecast is not None:
+        ax.plot(forecast["dates"], forecast["mean"], label="Prognoza", linestyle="--", color="gray")
+        ax.fill_between(forecast["dates"], forecast["lower"], forecast["upper"], color="lightblue", alpha=0.4)
+
+    ax.set_title(f"Wykres cen dla {symbol}")
+    ax.set_xlabel("Data")
+    ax.set_ylabel("Cena USD")
+    ax.legend()
+    ax.grid(True)
+    fig.autofmt_xdate()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt)
+    image = buf.getvalue()
+    buf.close()
+    return image
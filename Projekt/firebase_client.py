@@ -0,0 +1,41 @@
+import os
+import threading
+
+_lock = threading.RLock()
+_db = None
+
+
+# Inicjalizacja Firebase Admin SDK przy pierwszym użyciu, a nie przy imporcie aplikacji
+def init_firebase():
+    import firebase_admin
+    from firebase_admin import credentials
+    with _lock:
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(os.getenv("FIREBASE_CREDENTIALS", "firebase-adminsdk.json"))
+            firebase_admin.initialize_app(cred)
+
+
+def get_db():
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                init_firebase()
+                from firebase_admin import firestore
+                _db = firestore.client()
+    return _db
+
+
+def verify_id_token(id_token):
+    init_firebase()
+    from firebase_admin import auth
+    return auth.verify_id_token(id_token)
+
+
+# Zastępca klienta Firestore tworzący prawdziwego klienta przy pierwszym wywołaniu
+class LazyFirestore:
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+
+db = LazyFirestore()
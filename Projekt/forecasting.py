@@ -0,0 +1,108 @@
+import os
+import numpy as np
+from cache import TTLCache
+
+Z_95 = 1.959963984540054
+
+
+# Interfejs prognozy: zwraca (predicted_mean, conf_int) jako tablice NumPy,
+# conf_int ma kształt (days, 2) z dolną i górną granicą przedziału 95%
+class Forecaster:
+    name = None
+
+    def __init__(self, cache_size=512):
+        # Dopasowane parametry per symbol, używane jako punkt startowy kolejnego dopasowania
+        self.params = TTLCache(maxsize=cache_size, ttl=None)
+
+    def forecast(self, prices, days=7, symbol=None):
+        raise NotImplementedError
+
+
+# Model Holta (wygładzanie wykładnicze z trendem) dopasowywany siatką parametrów
+# liczoną wektorowo dla wszystkich par (alpha, beta) jednocześnie
+class HoltForecaster(Forecaster):
+    name = "holt"
+    ALPHAS = np.linspace(0.05, 1.0, 20)
+    BETAS = np.linspace(0.0, 0.5, 11)
+
+    def _grid(self, symbol):
+        warm = self.params.get(symbol) if symbol is not None else None
+        if warm is None:
+            alphas, betas = self.ALPHAS, self.BETAS
+        else:
+            alpha, beta = warm
+            alphas = np.clip(alpha + np.linspace(-0.1, 0.1, 5), 0.01, 1.0)
+            betas = np.clip(beta + np.linspace(-0.05, 0.05, 5), 0.0, 1.0)
+        a, b = np.meshgrid(alphas, betas, indexing="ij")
+        return a.ravel(), b.ravel()
+
+    @staticmethod
+    def _smooth(y, alpha, beta):
+        level = np.full(alpha.shape, y[0])
+        trend = np.full(alpha.shape, y[1] - y[0])
+        sse = np.zeros(alpha.shape)
+        for value in y[1:]:
+            predicted = level + trend
+            error = value - predicted
+            sse += error * error
+            new_level = predicted + alpha * error
+            trend = trend + alpha * beta * error
+            level = new_level
+        return level, trend, sse
+
+    def forecast(self, prices, days=7, symbol=None):
+        y = np.asarray(prices, dtype=float)
+        if y.size < 3:
+            raise ValueError("Za mało danych do prognozy")
+
+        alphas, betas = self._grid(symbol)
+        levels, trends, sse = self._smooth(y, alphas, betas)
+        best = int(np.argmin(sse))
+        alpha, beta = alphas[best], betas[best]
+        if symbol is not None:
+            self.params.set(symbol, (float(alpha), float(beta)))
+
+        steps = np.arange(1, days + 1)
+        predicted_mean = levels[best] + steps * trends[best]
+
+        sigma2 = sse[best] / max(y.size - 3, 1)
+        cumulative = np.concatenate(([0.0], np.cumsum((alpha * (1 + steps[:-1] * beta)) ** 2)))
+        half_width = Z_95 * np.sqrt(sigma2 * (1 + cumulative))
+        conf_int = np.column_stack((predicted_mean - half_width, predicted_mean + half_width))
+        return predicted_mean, conf_int
+
+
+# Pełny SARIMAX, dostępny na żądanie; parametry z poprzedniego dopasowania są punktem startowym
+class SarimaxForecaster(Forecaster):
+    name = "sarimax"
+
+    def forecast(self, prices, days=7, symbol=None):
+        # statsmodels jest ciężki, więc ładujemy go dopiero przy pierwszej prognozie SARIMAX
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+        model = SARIMAX(prices, order=(1, 1, 1), seasonal_order=(1, 1, 1, 7), enforce_stationarity=False,
+                        enforce_invertibility=False)
+        start_params = self.params.get(symbol) if symbol is not None else None
+        model_fit = model.fit(disp=False, start_params=start_params)
+        if symbol is not None:
+            self.params.set(symbol, model_fit.params)
+        forecast = model_fit.get_forecast(steps=days)
+        return forecast.predicted_mean, forecast.conf_int()
+
+
+FORECASTERS = {
+    HoltForecaster.name: HoltForecaster(),
+    SarimaxForecaster.name: SarimaxForecaster(),
+}
+
+DEFAULT_FORECASTER = os.getenv("FORECAST_MODEL", HoltForecaster.name)
+
+
+def register_forecaster(forecaster):
+    FORECASTERS[forecaster.name] = forecaster
+
+
+def get_forecaster(name=None):
+    name = name or DEFAULT_FORECASTER
+    if name not in FORECASTERS:
+        raise ValueError(f"Nieznany model prognozy: {name}")
+    return FORECASTERS[name]
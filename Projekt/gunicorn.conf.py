@@ -0,0 +1,10 @@
+import os
+
+# Strumienie SSE (/api/portfolio/stream) zajmują wątek na czas połączenia
+# (najwyżej PRICE_STREAM_MAX_AGE sekund), więc synchroniczne workery szybko by się
+# zablokowały; gthread obsługuje wiele połączeń w jednym procesie
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 4))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 32))
+timeout = 60
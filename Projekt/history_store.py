@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import time
+
+DAY = 86400
+
+
+# Lokalny magazyn świec dziennych (SQLite); z sieci dociągane są tylko brakujące świece
+class HistoryStore:
+    def __init__(self, path, refresh_interval=300, clock=time.time):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._conn = None
+        self._lock = threading.Lock()
+        self.local_reads = 0
+        self.network_fetches = 0
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    symbol TEXT NOT NULL,
+                    time INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL,
+                    volumefrom REAL, volumeto REAL,
+                    PRIMARY KEY (symbol, time)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol TEXT PRIMARY KEY,
+                    covered_from INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+            """)
+        return self._conn
+
+    # fetch(limit) zwraca świece w formacie histoday (najstarsza pierwsza)
+    def get_candles(self, symbol, limit, fetch):
+        now = self._clock()
+        today = int(now) // DAY * DAY
+        start = today - limit * DAY
+
+        with self._lock:
+            conn = self._connection()
+            meta = conn.execute(
+                "SELECT covered_from, fetched_at, (SELECT MAX(time) FROM candles WHERE symbol = ?) "
+                "FROM symbols WHERE symbol = ?", (symbol, symbol)).fetchone()
+
+        if meta is None or meta[0] > start:
+            need, covered_from = limit, start
+        else:
+            covered_from, fetched_at, last = meta
+            if last is None or last < today:
+                need = (today - (last if last is not None else start)) // DAY
+            elif now - fetched_at >= self.refresh_interval:
+                # Bieżąca świeca dzienna zmienia się w ciągu dnia
+                need = 1
+            else:
+                need = 0
+
+        if need > 0:
+            try:
+                candles = fetch(need)
+            except Exception:
+                if not self._has_range(symbol, start):
+                    raise
+            else:
+                self.network_fetches += 1
+                self._upsert(symbol, candles, covered_from, now)
+        else:
+            self.local_reads += 1
+
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT time, open, high, low, close, volumefrom, volumeto FROM candles "
+                "WHERE symbol = ? AND time >= ? ORDER BY time", (symbol, start)).fetchall()
+        keys = ('time', 'open', 'high', 'low', 'close', 'volumefrom', 'volumeto')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _has_range(self, symbol, start):
+        with self._lock:
+            return self._connection().execute(
+                "SELECT 1 FROM candles WHERE symbol = ? AND time >= ? LIMIT 1", (symbol, start)).fetchone() is not None
+
+    def _upsert(self, symbol, candles, covered_from, fetched_at):
+        rows = [(symbol, int(c['time']), c.get('open'), c.get('high'), c.get('low'), c.get('close'),
+                 c.get('volumefrom'), c.get('volumeto')) for c in candles]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.execute(
+                    "INSERT INTO symbols VALUES (?, ?, ?) ON CONFLICT(symbol) DO UPDATE SET "
+                    "covered_from = MIN(covered_from, excluded.covered_from), fetched_at = excluded.fetched_at",
+                    (symbol, covered_from, fetched_at))
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "local_reads": self.local_reads,
+            "network_fetches": self.network_fetches,
+        }
@@ -0,0 +1,200 @@
+import math
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+INDICATORS = ("sma", "ema", "volatility", "drawdown", "rsi", "bollinger_upper", "bollinger_lower")
+
+
+# Wszystkie wskaźniki działają na tablicy 1-D (czas) lub macierzy 2-D (symbole × czas);
+# wynik ma kształt wejścia, a pozycje bez pełnego okna mają wartość NaN
+def _as_matrix(values):
+    x = np.ascontiguousarray(values, dtype=np.float64)
+    return np.atleast_2d(x), x.ndim == 1
+
+
+def _restore(out, one_d):
+    return out[0] if one_d else out
+
+
+def _rolling(x, window):
+    return sliding_window_view(x, window, axis=1)
+
+
+def sma(values, window=7):
+    x, one_d = _as_matrix(values)
+    out = np.full(x.shape, np.nan)
+    if 0 < window <= x.shape[1]:
+        out[:, window - 1:] = _rolling(x, window).mean(axis=-1)
+    return _restore(out, one_d)
+
+
+def _ema_matrix(x, alpha):
+    from scipy.signal import lfilter
+    if x.shape[1] == 0:
+        return x.copy()
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], start od pierwszej obserwacji
+    return lfilter([alpha], [1.0, alpha - 1.0], x, axis=1, zi=(1.0 - alpha) * x[:, :1])[0]
+
+
+def ema(values, span=7):
+    x, one_d = _as_matrix(values)
+    return _restore(_ema_matrix(x, 2.0 / (span + 1)), one_d)
+
+
+# Zmienność: odchylenie standardowe prostych stóp zwrotu z `window` ostatnich świec;
+# periods (np. 365) skaluje wynik do zmienności rocznej
+def volatility(values, window=7, periods=None):
+    x, one_d = _as_matrix(values)
+    out = np.full(x.shape, np.nan)
+    if window > 1 and window < x.shape[1]:
+        returns = x[:, 1:] / x[:, :-1] - 1.0
+        out[:, window:] = _rolling(returns, window).std(axis=-1, ddof=1)
+        if periods:
+            out *= math.sqrt(periods)
+    return _restore(out, one_d)
+
+
+def drawdown(values):
+    x, one_d = _as_matrix(values)
+    return _restore(x / np.maximum.accumulate(x, axis=1) - 1.0, one_d)
+
+
+# RSI Wildera: średnie zysków i strat wygładzane z alpha = 1/period
+def rsi(values, period=14):
+    from scipy.signal import lfilter
+    x, one_d = _as_matrix(values)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] > period:
+        delta = np.diff(x, axis=1)
+        gains, losses = np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+        alpha = 1.0 / period
+        averages = []
+        for moves in (gains, losses):
+            seed = moves[:, :period].mean(axis=1, keepdims=True)
+            rest = moves[:, period:]
+            if rest.shape[1]:
+                smoothed = lfilter([alpha], [1.0, alpha - 1.0], rest, axis=1, zi=(1.0 - alpha) * seed)[0]
+                averages.append(np.concatenate([seed, smoothed], axis=1))
+            else:
+                averages.append(seed)
+        avg_gain, avg_loss = averages
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        out[:, period:] = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), value)
+    return _restore(out, one_d)
+
+
+# Komplet wskaźników w jednym przebiegu: okno przesuwne jest wspólne dla SMA i wstęg Bollingera
+def compute(values, window=7, span=None, rsi_period=14, band_k=2.0, vol_window=None, periods=None):
+    x, one_d = _as_matrix(values)
+    mid = np.full(x.shape, np.nan)
+    std = np.full(x.shape, np.nan)
+    if 0 < window <= x.shape[1]:
+        view = _rolling(x, window)
+        mid[:, window - 1:] = view.mean(axis=-1)
+        std[:, window - 1:] = view.std(axis=-1)
+    result = {
+        "sma": mid,
+        "ema": _ema_matrix(x, 2.0 / ((span or window) + 1)),
+        "volatility": volatility(x, vol_window or window, periods),
+        "drawdown": drawdown(x),
+        "rsi": rsi(x, rsi_period),
+        "bollinger_upper": mid + band_k * std,
+        "bollinger_lower": mid - band_k * std,
+    }
+    return {name: _restore(series, one_d) for name, series in result.items()}
+
+
+# Tablica -> lista do JSON (NaN jako null)
+def to_list(values):
+    values = np.asarray(values, dtype=float)
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+# Przyrostowe wskaźniki dla jednej serii: każda nowa świeca aktualizuje wszystkie w O(1)
+class IndicatorState:
+    def __init__(self, window=7, span=None, rsi_period=14, band_k=2.0, vol_window=None):
+        self.window = window
+        self.alpha = 2.0 / ((span or window) + 1)
+        self.rsi_period = rsi_period
+        self.band_k = band_k
+        self.vol_window = vol_window or window
+        self._prices = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._returns = deque()
+        self._r_mean = 0.0
+        self._r_m2 = 0.0
+        self._ema = None
+        self._peak = None
+        self._last = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    @classmethod
+    def from_history(cls, prices, **kwargs):
+        state = cls(**kwargs)
+        for price in prices:
+            state.update(price)
+        return state
+
+    # Okno przesuwne z aktualizacją średniej i sumy kwadratów odchyleń (Welford)
+    @staticmethod
+    def _slide(buffer, size, mean, m2, value):
+        buffer.append(value)
+        if len(buffer) > size:
+            old = buffer.popleft()
+            old_mean = mean
+            mean += (value - old) / size
+            m2 += (value - old) * (value - mean + old - old_mean)
+        else:
+            delta = value - mean
+            mean += delta / len(buffer)
+            m2 += delta * (value - mean)
+        return mean, max(m2, 0.0)
+
+    def update(self, price):
+        price = float(price)
+        self._mean, self._m2 = self._slide(self._prices, self.window, self._mean, self._m2, price)
+        self._ema = price if self._ema is None else self.alpha * price + (1 - self.alpha) * self._ema
+        self._peak = price if self._peak is None else max(self._peak, price)
+
+        if self._last is not None:
+            change = price - self._last
+            self._r_mean, self._r_m2 = self._slide(self._returns, self.vol_window, self._r_mean, self._r_m2,
+                                                   price / self._last - 1.0)
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self._count += 1
+            if self._count <= self.rsi_period:
+                self._gain += (gain - self._gain) / self._count
+                self._loss += (loss - self._loss) / self._count
+            else:
+                alpha = 1.0 / self.rsi_period
+                self._gain = alpha * gain + (1 - alpha) * self._gain
+                self._loss = alpha * loss + (1 - alpha) * self._loss
+        self._last = price
+        return self.values()
+
+    def values(self):
+        full = len(self._prices) == self.window
+        std = math.sqrt(self._m2 / self.window) if full else math.nan
+        if self._count < self.rsi_period:
+            rsi_value = math.nan
+        elif self._loss == 0:
+            rsi_value = 50.0 if self._gain == 0 else 100.0
+        else:
+            rsi_value = 100.0 - 100.0 / (1.0 + self._gain / self._loss)
+        returns_full = len(self._returns) == self.vol_window and self.vol_window > 1
+        return {
+            "sma": self._mean if full else math.nan,
+            "ema": self._ema if self._ema is not None else math.nan,
+            "volatility": math.sqrt(self._r_m2 / (self.vol_window - 1)) if returns_full else math.nan,
+            "drawdown": self._last / self._peak - 1.0 if self._peak else math.nan,
+            "rsi": rsi_value,
+            "bollinger_upper": self._mean + self.band_k * std if full else math.nan,
+            "bollinger_lower": self._mean - self.band_k * std if full else math.nan,
+        }
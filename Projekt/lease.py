@@ -0,0 +1,91 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+
+def default_holder():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# Dzierżawa lidera w dokumencie Firestore: posiadacz odnawia ją w każdym cyklu,
+# a po jej wygaśnięciu (awaria węzła) przejmuje ją inny proces
+class FirestoreLease:
+    def __init__(self, db, name, holder=None, ttl=150.0, clock=time.time, collection="scheduler_leases"):
+        self._db = db
+        self.name = name
+        self.holder = holder or default_holder()
+        self.ttl = ttl
+        self._clock = clock
+        self.collection = collection
+
+    def _ref(self):
+        return self._db.collection(self.collection).document(self.name)
+
+    def acquire(self):
+        from firebase_admin.firestore import transactional
+
+        def claim(transaction, ref):
+            snapshot = ref.get(transaction=transaction)
+            data = snapshot.to_dict() if snapshot.exists else None
+            now = self._clock()
+            if data and data.get("holder") != self.holder and data.get("expires_at", 0) > now:
+                return False
+            transaction.set(ref, {"holder": self.holder, "expires_at": now + self.ttl})
+            return True
+
+        return transactional(claim)(self._db.transaction(), self._ref())
+
+    def release(self):
+        from firebase_admin.firestore import transactional
+
+        def drop(transaction, ref):
+            snapshot = ref.get(transaction=transaction)
+            if snapshot.exists and snapshot.to_dict().get("holder") == self.holder:
+                transaction.delete(ref)
+
+        transactional(drop)(self._db.transaction(), self._ref())
+
+
+# Ta sama dzierżawa w pliku SQLite - dla wielu procesów na jednym hoście bez Firestore
+class SqliteLease:
+    def __init__(self, path, name, holder=None, ttl=150.0, clock=time.time):
+        self.path = path
+        self.name = name
+        self.holder = holder or default_holder()
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, "
+                     "expires_at REAL NOT NULL)")
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+                now = self._clock()
+                if row is not None and row[0] != self.holder and row[1] > now:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.execute("INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                             (self.name, self.holder, now + self.ttl))
+                conn.execute("COMMIT")
+                return True
+            finally:
+                conn.close()
+
+    def release(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+            finally:
+                conn.close()
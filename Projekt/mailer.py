@@ -0,0 +1,251 @@
+import atexit
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.utils import formataddr
+
+_STOP = object()
+
+
+def default_compose(to, items):
+    if len(items) == 1:
+        return items[0]
+    subject = f"{items[0][0]} ({len(items)})"
+    return subject, "\n\n".join(body for _, body in items)
+
+
+# Błędy przejściowe (odpowiedź 4xx, zerwane lub nieudane połączenie) warto ponowić;
+# odpowiedź 5xx i odrzuceni adresaci nie zmienią się przy kolejnej próbie.
+# SMTPException dziedziczy po OSError, więc kolejność sprawdzeń ma znaczenie
+def _is_transient(error):
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return not isinstance(error, smtplib.SMTPException)
+
+
+# Wspólny podsystem poczty wychodzącej: ograniczona kolejka, wątek roboczy
+# z jednym zalogowanym połączeniem SMTP, ponawianie z backoffem i zbiorcze
+# wiadomości (digest) dla odbiorcy, do którego trafia wiele alertów naraz
+class Mailer:
+    def __init__(self, host, port, username=None, password=None, security="ssl", sender_name=None,
+                 queue_size=1000, max_retries=3, backoff=1.0, digest_window=0.5, max_batch=500,
+                 idle_timeout=60.0, timeout=30.0, compose=default_compose):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.sender_name = sender_name
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.digest_window = digest_window
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.compose = compose
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._conn = None
+        self._last_used = 0.0
+        self._conn_lock = threading.Lock()
+        self._thread = None
+        self._atexit = False
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.connections = 0
+        self.digests = 0
+
+    # Wątek roboczy jest demonem, więc przy wyjściu z procesu kolejka jest dosyłana przez atexit
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="mailer", daemon=True)
+            self._thread.start()
+            if not self._atexit:
+                atexit.register(self.stop)
+                self._atexit = True
+        return self
+
+    # flush=True wysyła wszystko, co jest w kolejce; flush=False porzuca oczekujące wiadomości
+    def stop(self, timeout=None, flush=True):
+        if self._thread is not None:
+            if not flush:
+                self._discard_pending()
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        self._close()
+
+    def _discard_pending(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self.dropped += 1
+            self._notify(item[3], False)
+
+    @staticmethod
+    def _notify(on_result, delivered):
+        if on_result is not None:
+            try:
+                on_result(delivered)
+            except Exception as e:
+                print("❌ Błąd obsługi wyniku wysyłki e-maila:", e)
+
+    # on_result(delivered) jest wywoływane z wątku roboczego po próbie wysyłki
+    def enqueue(self, to, subject, body, on_result=None):
+        self.start()
+        try:
+            self._queue.put_nowait((to, subject, body, on_result))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"❌ Kolejka e-maili pełna, pominięto wiadomość do {to}")
+            return False
+
+    # Wysyłka synchroniczna przez to samo połączenie co wątek roboczy
+    def send_now(self, to, subject, body):
+        return self._deliver(to, subject, body)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.digest_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            grouped = {}
+            for to, subject, body, on_result in batch:
+                grouped.setdefault(to, []).append((subject, body, on_result))
+            for to, items in grouped.items():
+                if len(items) > 1:
+                    self.digests += 1
+                subject, body = self.compose(to, [(subject, body) for subject, body, _ in items])
+                delivered = self._deliver(to, subject, body)
+                for _, _, on_result in items:
+                    self._notify(on_result, delivered)
+            if stop:
+                return
+
+    def _message(self, to, subject, body):
+        msg = MIMEText(body)
+        msg["Subject"] = subject
+        msg["From"] = formataddr((self.sender_name, self.username)) if self.sender_name else self.username
+        msg["To"] = to
+        if self.username:
+            msg["Reply-To"] = self.username
+        return msg
+
+    def _connect(self):
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                conn.starttls()
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+        self.connections += 1
+        return conn
+
+    def _close(self):
+        with self._conn_lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.quit()
+            except Exception:
+                pass
+
+    def _deliver(self, to, subject, body):
+        msg = self._message(to, subject, body)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._conn_lock:
+                    # Serwery zamykają bezczynne połączenia, więc po dłuższej przerwie łączymy się od nowa
+                    if self._conn is not None and time.monotonic() - self._last_used > self.idle_timeout:
+                        try:
+                            self._conn.quit()
+                        except Exception:
+                            pass
+                        self._conn = None
+                    if self._conn is None:
+                        self._conn = self._connect()
+                    self._conn.send_message(msg)
+                    self._last_used = time.monotonic()
+                self.sent += 1
+                print(f"✅ E-mail wysłany do {to}")
+                return True
+            except smtplib.SMTPAuthenticationError as auth_err:
+                print("❌ Błąd autoryzacji SMTP:", auth_err)
+                self._close()
+                break
+            except (smtplib.SMTPException, OSError) as e:
+                if not _is_transient(e):
+                    # Po odrzuceniu wiadomości smtplib wysyła RSET, więc połączenie zostaje
+                    self._last_used = time.monotonic()
+                    print(f"❌ Serwer odrzucił e-mail do {to}, bez ponawiania:", e)
+                    break
+                print(f"❌ Błąd wysyłki e-maila do {to} (próba {attempt + 1}):", e)
+                self._close()
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    time.sleep(self.backoff * 2 ** attempt)
+        self.failed += 1
+        return False
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "connections": self.connections,
+            "digests": self.digests,
+        }
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        port = int(os.getenv("SMTP_PORT", 587))
+        return cls(
+            host=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+            port=port,
+            username=os.getenv("EMAIL_USER") or os.getenv("SMTP_USERNAME"),
+            password=os.getenv("EMAIL_PASS") or os.getenv("SMTP_PASSWORD"),
+            security=os.getenv("SMTP_SECURITY", "ssl" if port == 465 else "starttls"),
+            queue_size=int(os.getenv("EMAIL_QUEUE_SIZE", 1000)),
+            **kwargs
+        )
+
+
+_mailers = {}
+_mailer_lock = threading.Lock()
+
+
+# Jeden Mailer na konfigurację (np. nadawca i szablon alertów), niezależnie od kolejności importów
+def get_mailer(**kwargs):
+    key = tuple(sorted(kwargs.items()))
+    with _mailer_lock:
+        mailer = _mailers.get(key)
+        if mailer is None:
+            mailer = _mailers[key] = Mailer.from_env(**kwargs)
+        return mailer
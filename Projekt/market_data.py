@@ -0,0 +1,69 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = 'https://min-api.cryptocompare.com'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+# Wspólny klient CryptoCompare: pula połączeń keep-alive, timeouty i ponawianie z backoffem
+class MarketDataClient:
+    def __init__(self, base_url=DEFAULT_BASE_URL, connect_timeout=3.05, read_timeout=10.0,
+                 retries=3, backoff_factor=0.5, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+        self.session = self._build_session()
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get(self, path, params=None):
+        with self._lock:
+            self.requests_sent += 1
+        response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+    def stats(self):
+        return {
+            "base_url": self.base_url,
+            "requests_sent": self.requests_sent,
+            "timeout": list(self.timeout),
+            "retries": self.retries,
+            "pool_size": self.pool_size,
+        }
+
+    # Timeouty dotyczą pojedynczej próby, a ponowienia obejmują też timeouty odczytu, więc
+    # jedno wywołanie get() może trwać do (retries + 1) × (connect + read) plus backoff
+    # (domyślnie ok. 4 × 13 s + 3 s ≈ 55 s); krótsze limity ustawia się przez zmienne środowiskowe
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_url=os.getenv("CRYPTOCOMPARE_BASE_URL", DEFAULT_BASE_URL),
+            connect_timeout=float(os.getenv("CRYPTOCOMPARE_CONNECT_TIMEOUT", 3.05)),
+            read_timeout=float(os.getenv("CRYPTOCOMPARE_READ_TIMEOUT", 10)),
+            retries=int(os.getenv("CRYPTOCOMPARE_RETRIES", 3)),
+            pool_size=int(os.getenv("CRYPTOCOMPARE_POOL_SIZE", 10))
+        )
@@ -0,0 +1,45 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Kod wykonywany w świeżym interpreterze: czas importu modułu i RSS procesu
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+module = __import__(sys.argv[1])
+if sys.argv[2]:
+    getattr(module, sys.argv[2])()
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform != "darwin":
+    rss *= 1024
+print(json.dumps({"seconds": elapsed, "rss_mb": rss / 2 ** 20, "modules": len(sys.modules)}))
+"""
+
+
+# Mierzy zimny start aplikacji (czas importu i pamięć workera) w kolejnych świeżych procesach
+def measure(module="app", factory="", runs=5):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", PROBE, module, factory],
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "module": module,
+        "runs": runs,
+        "median_seconds": statistics.median(s["seconds"] for s in samples),
+        "max_seconds": max(s["seconds"] for s in samples),
+        "median_rss_mb": statistics.median(s["rss_mb"] for s in samples),
+        "modules": samples[-1]["modules"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pomiar czasu zimnego startu i pamięci aplikacji")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--factory", default="", help="np. create_app, aby zmierzyć także wywołanie fabryki")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(measure(args.module, args.factory, args.runs), indent=2))
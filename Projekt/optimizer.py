@@ -0,0 +1,107 @@
+import numpy as np
+
+OBJECTIVES = ("min_variance", "max_sharpe", "target_return")
+
+# Niewielka regularyzacja macierzy kowariancji (aktywa o identycznych zwrotach)
+COVARIANCE_RIDGE = 1e-12
+
+# Dopuszczalne odchylenie wagi od docelowej, po którym zalecane jest rebalansowanie
+REBALANCE_THRESHOLD = 0.02
+
+
+class OptimizationError(Exception):
+    pass
+
+
+# Dzienne stopy zwrotu, ich średnie i macierz kowariancji dla macierzy cen (aktywa x dni)
+def returns_statistics(prices):
+    prices = np.asarray(prices, dtype=float)
+    returns = np.diff(prices, axis=1) / prices[:, :-1]
+    mean_returns = returns.mean(axis=1)
+    covariance = np.atleast_2d(np.cov(returns))
+    covariance = covariance + COVARIANCE_RIDGE * np.eye(len(mean_returns))
+    return returns, mean_returns, covariance
+
+
+def _variance(weights, covariance):
+    sigma_w = covariance @ weights
+    return weights @ sigma_w, 2 * sigma_w
+
+
+def _neg_sharpe(weights, mean_returns, covariance, risk_free):
+    sigma_w = covariance @ weights
+    variance = weights @ sigma_w
+    volatility = np.sqrt(variance)
+    excess = weights @ mean_returns - risk_free
+    value = -excess / volatility
+    gradient = -(mean_returns * volatility - excess * sigma_w / volatility) / variance
+    return value, gradient
+
+
+def optimize(mean_returns, covariance, objective="max_sharpe", target_return=None, risk_free=0.0, x0=None):
+    # scipy ładowany przy pierwszej optymalizacji, nie przy starcie aplikacji
+    from scipy.optimize import minimize
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    n = len(mean_returns)
+    if objective not in OBJECTIVES:
+        raise OptimizationError(f"Nieznany cel optymalizacji: {objective}")
+
+    constraints = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1, 'jac': lambda w: np.ones(n)}]
+    if objective == "target_return":
+        if target_return is None:
+            raise OptimizationError("Brak docelowej stopy zwrotu")
+        constraints.append({'type': 'eq', 'fun': lambda w: w @ mean_returns - target_return,
+                            'jac': lambda w: mean_returns})
+
+    if objective == "max_sharpe":
+        fun = lambda w: _neg_sharpe(w, mean_returns, covariance, risk_free)
+    else:
+        fun = lambda w: _variance(w, covariance)
+
+    result = minimize(
+        fun,
+        np.full(n, 1 / n) if x0 is None else x0,
+        jac=True,
+        method='SLSQP',
+        bounds=[(0, 1)] * n,
+        constraints=constraints,
+        options={'ftol': 1e-10, 'maxiter': 200}
+    )
+    if not result.success:
+        raise OptimizationError(result.message)
+    weights = np.clip(result.x, 0, 1)
+    return weights / weights.sum()
+
+
+def portfolio_point(weights, mean_returns, covariance):
+    return {
+        "expected_return": float(weights @ mean_returns),
+        "volatility": float(np.sqrt(weights @ covariance @ weights)),
+        "weights": weights.tolist(),
+    }
+
+
+# Granica efektywna: kolejne rozwiązania startują z wag poprzedniego punktu
+def efficient_frontier(mean_returns, covariance, points=50):
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    weights = optimize(mean_returns, covariance, "min_variance")
+    targets = np.linspace(weights @ mean_returns, mean_returns.max(), points)
+
+    frontier = [portfolio_point(weights, mean_returns, covariance)]
+    for target in targets[1:]:
+        try:
+            weights = optimize(mean_returns, covariance, "target_return", target_return=target, x0=weights)
+        except OptimizationError:
+            continue
+        frontier.append(portfolio_point(weights, mean_returns, covariance))
+    return frontier
+
+
+# Pojedyncze zadanie dla puli analitycznej: od macierzy cen do wag (i opcjonalnie granicy efektywnej)
+def optimize_prices(prices, objective="max_sharpe", target_return=None, frontier_points=0, risk_free=0.0):
+    returns, mean_returns, covariance = returns_statistics(prices)
+    weights = optimize(mean_returns, covariance, objective, target_return, risk_free)
+    result = portfolio_point(weights, mean_returns, covariance)
+    if frontier_points:
+        result["frontier"] = efficient_frontier(mean_returns, covariance, frontier_points)
+    return result
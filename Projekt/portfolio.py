@@ -1,77 +1,187 @@
 import requests
-from statsmodels.tsa.statespace.sarimax import SARIMAX
 import numpy as np
 import datetime
-from scipy.optimize import minimize
 from dotenv import load_dotenv
 import os
-import smtplib
-from email.mime.text import MIMEText
+from concurrent.futures import ThreadPoolExecutor
+from cache import TTLCache
+from market_data import MarketDataClient
+from history_store import HistoryStore
+from catalogue import CoinCatalogue
+from forecasting import get_forecaster
+import indicators
+from optimizer import optimize_prices, OptimizationError, REBALANCE_THRESHOLD
+from mailer import get_mailer
 
 load_dotenv()
 CRYPTOCOMPARE_API_KEY = os.getenv("CRYPTOCOMPARE_API_KEY")
 
+# Wspólny klient HTTP dla wszystkich zapytań do CryptoCompare
+market_data = MarketDataClient.from_env()
+
+# Lokalny magazyn historii cen dziennych
+history_store = HistoryStore(
+    os.getenv("HISTORY_DB_PATH", "history.sqlite3"),
+    refresh_interval=float(os.getenv("HISTORY_REFRESH_INTERVAL", 300))
+)
+
+# Katalog monet (lista z /data/all/coinlist) zapisany lokalnie i odświeżany raz na dobę
+coin_catalogue = CoinCatalogue(
+    os.getenv("COIN_CATALOGUE_PATH", "coins.json.gz"),
+    lambda: Portfolio._fetch_coin_list(CRYPTOCOMPARE_API_KEY),
+    max_age=float(os.getenv("COIN_CATALOGUE_MAX_AGE", 86400))
+)
+
+# Wspólny dla całego procesu cache cen (symbol -> cena USD)
+price_cache = TTLCache(
+    maxsize=int(os.getenv("PRICE_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("PRICE_CACHE_TTL", 30))
+)
+
+# Wspólna pula wątków do równoległego pobierania historii; jej rozmiar
+# ogranicza liczbę równoczesnych połączeń do CryptoCompare
+history_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("HISTORY_FETCH_CONCURRENCY", market_data.pool_size)),
+    thread_name_prefix="history"
+)
+
+# Limit długości parametru fsyms w endpointcie pricemulti
+PRICEMULTI_FSYMS_LIMIT = 300
+
 class Portfolio:
-    def __init__(self):
-        self.assets = []
+    def __init__(self, capacity=16):
+        # Symbol -> indeks w tablicach ilości i cen (zawsze zwarty zakres [0, n))
+        self._index = {}
+        self._symbols = []
+        self._amounts = np.zeros(capacity)
+        self._prices = np.zeros(capacity)
         self.total_value = 0
 
+    # Widok tylko do odczytu w dotychczasowym formacie listy słowników
+    @property
+    def assets(self):
+        n = len(self._symbols)
+        return [
+            {'crypto_name': symbol, 'amount': float(amount), 'price': float(price)}
+            for symbol, amount, price in zip(self._symbols, self._amounts[:n], self._prices[:n])
+        ]
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def _slot(self, crypto_name):
+        index = self._index.get(crypto_name)
+        if index is not None:
+            return index
+        index = len(self._symbols)
+        if index == len(self._amounts):
+            self._amounts = np.concatenate((self._amounts, np.zeros(len(self._amounts) or 1)))
+            self._prices = np.concatenate((self._prices, np.zeros(len(self._prices) or 1)))
+        self._index[crypto_name] = index
+        self._symbols.append(crypto_name)
+        self._amounts[index] = 0
+        self._prices[index] = 0
+        return index
+
+    # Usuwa pozycję, przesuwając kolejne o jedno miejsce - widok assets zachowuje kolejność dodania
+    def _delete(self, index):
+        n = len(self._symbols)
+        self._amounts[index:n - 1] = self._amounts[index + 1:n]
+        self._prices[index:n - 1] = self._prices[index + 1:n]
+        del self._index[self._symbols.pop(index)]
+        for i in range(index, n - 1):
+            self._index[self._symbols[i]] = i
+
     def add_asset(self, crypto_name, amount, price):
-        for asset in self.assets:
-            if asset['crypto_name'] == crypto_name:
-                total_amount = asset['amount'] + amount
-                asset['price'] = ((asset['amount'] * asset['price']) + (amount * price)) / total_amount
-                asset['amount'] = total_amount
-                self.calculate_total_value()
-                return
-        self.assets.append({
-            'crypto_name': crypto_name,
-            'amount': amount,
-            'price': price
-        })
-        self.calculate_total_value()
+        index = self._slot(crypto_name)
+        total_amount = self._amounts[index] + amount
+        if total_amount > 0:
+            self._prices[index] = ((self._amounts[index] * self._prices[index]) + (amount * price)) / total_amount
+        else:
+            self._prices[index] = price
+        self._amounts[index] = total_amount
+        self.total_value += amount * price
+
+    def add_assets(self, entries):
+        entries = list(entries)
+        if not entries:
+            return
+        names, amounts, prices = zip(*entries)
+        indices = np.fromiter((self._slot(name) for name in names), dtype=np.intp, count=len(names))
+        amounts = np.asarray(amounts, dtype=float)
+        prices = np.asarray(prices, dtype=float)
+
+        n = len(self._symbols)
+        cost = self._amounts[:n] * self._prices[:n] + np.bincount(indices, weights=amounts * prices, minlength=n)
+        self._amounts[:n] += np.bincount(indices, weights=amounts, minlength=n)
+        touched = np.unique(indices)
+        held = self._amounts[touched]
+        self._prices[touched] = np.divide(cost[touched], held, out=np.zeros_like(held), where=held != 0)
+        self.total_value += float(np.dot(amounts, prices))
 
     def remove_asset(self, crypto_name, amount=None):
-        updated_assets = []
-        for asset in self.assets:
-            if asset['crypto_name'] == crypto_name:
-                if amount is None or amount >= asset['amount']:
-                    continue
-                else:
-                    asset['amount'] -= amount
-                    updated_assets.append(asset)
-            else:
-                updated_assets.append(asset)
-        self.assets = updated_assets
-        self.calculate_total_value()
+        index = self._index.get(crypto_name)
+        if index is None:
+            return
+        if amount is None or amount >= self._amounts[index]:
+            self.total_value -= self._amounts[index] * self._prices[index]
+            self._delete(index)
+        else:
+            self._amounts[index] -= amount
+            self.total_value -= amount * self._prices[index]
+        if not self._symbols:
+            self.total_value = 0
+
+    # entries: (crypto_name, amount), amount=None usuwa całą pozycję
+    def remove_assets(self, entries):
+        known = [(self._index[name], np.inf if amount is None else amount)
+                 for name, amount in entries if name in self._index]
+        if not known:
+            return
+        n = len(self._symbols)
+        indices, amounts = (np.asarray(column) for column in zip(*known))
+        removed = np.bincount(indices.astype(np.intp), weights=amounts.astype(float), minlength=n)
+        removed = np.minimum(removed, self._amounts[:n])
+        self._amounts[:n] -= removed
+        self.total_value -= float(np.dot(removed, self._prices[:n]))
+
+        keep = self._amounts[:n] > 0
+        if not keep.all():
+            m = int(keep.sum())
+            self._amounts[:m] = self._amounts[:n][keep]
+            self._prices[:m] = self._prices[:n][keep]
+            self._symbols = [symbol for symbol, kept in zip(self._symbols, keep) if kept]
+            self._index = {symbol: i for i, symbol in enumerate(self._symbols)}
+        if not self._symbols:
+            self.total_value = 0
 
     def calculate_total_value(self):
-        self.total_value = sum(asset['amount'] * asset['price'] for asset in self.assets)
+        n = len(self._symbols)
+        self.total_value = float(np.dot(self._amounts[:n], self._prices[:n]))
 
     def update_prices(self):
-        for asset in self.assets:
-            asset['price'] = Portfolio.get_current_price(asset['crypto_name'], CRYPTOCOMPARE_API_KEY)
-
-    def predict_portfolio_value(self, days):
-        total_value = self.total_value
-        return list(map(lambda day: total_value * (1 + 0.01 * day), range(1, days + 1)))
+        prices = Portfolio.get_current_prices(self._symbols, CRYPTOCOMPARE_API_KEY)
+        n = len(self._symbols)
+        self._prices[:n] = [prices[symbol] for symbol in self._symbols]
+        self.calculate_total_value()
 
-    def optimize_portfolio(self):
-        if not self.assets:
+    def optimize_portfolio(self, objective="max_sharpe", target_return=None):
+        if not self._symbols:
             return ["Portfel jest pusty. Nie można przeprowadzić optymalizacji."]
 
         historical_data = {}
-        for asset in self.assets:
-            dates, prices = Portfolio.get_historical_data(asset['crypto_name'], CRYPTOCOMPARE_API_KEY, limit=100)
+        histories = Portfolio.get_historical_data_many(self._symbols, CRYPTOCOMPARE_API_KEY, limit=100)
+        for symbol in self._symbols:
+            dates, prices = histories[symbol]
             if not prices or len(prices) < 2:
-                return [f"Brak wystarczających danych historycznych dla {asset['crypto_name']}."]
-            historical_data[asset['crypto_name']] = prices
+                return [f"Brak wystarczających danych historycznych dla {symbol}."]
+            historical_data[symbol] = prices
 
         if not historical_data:
             return ["Brak danych do optymalizacji."]
 
         try:
-            optimized_weights = self.markowitz_optimization(historical_data)
+            optimized_weights = self.markowitz_optimization(historical_data, objective, target_return)
             if optimized_weights is not None:
                 suggestions = self.generate_markowitz_suggestions(optimized_weights)
             else:
@@ -81,43 +191,28 @@ class Portfolio:
 
         return suggestions
 
-    def markowitz_optimization(self, historical_data):
-        prices = np.array(list(historical_data.values()))
-        returns = np.diff(prices, axis=1) / prices[:, :-1]
-        mean_returns = np.array(list(map(np.mean, returns)))
-        covariance_matrix = np.cov(returns)
-
-        num_assets = len(self.assets)
-
-        def neg_portfolio_return(weights):
-            return -np.dot(weights.T, mean_returns)
-
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-        bounds = tuple((0, 1) for _ in range(num_assets))
-        initial_weights = np.array([1/num_assets] * num_assets)
-
-        optimized_result = minimize(
-            neg_portfolio_return,
-            initial_weights,
-            method='SLSQP',
-            bounds=bounds,
-            constraints=constraints
-        )
-        return optimized_result.x if optimized_result.success else None
+    def markowitz_optimization(self, historical_data, objective="max_sharpe", target_return=None):
+        prices = Portfolio.align_prices(list(historical_data.values()))
+        try:
+            return np.array(optimize_prices(prices, objective, target_return)["weights"])
+        except OptimizationError:
+            return None
 
     def generate_markowitz_suggestions(self, optimized_weights):
         suggestions = []
-        for i, asset in enumerate(self.assets):
-            current_weight = asset['amount'] * asset['price'] / self.total_value if self.total_value > 0 else 0
-            optimized_weight = optimized_weights[i]
-            difference = optimized_weight - current_weight
-            if difference > 0.02:
+        n = len(self._symbols)
+        values = self._amounts[:n] * self._prices[:n]
+        current_weights = values / self.total_value if self.total_value > 0 else np.zeros(n)
+        differences = np.asarray(optimized_weights) - current_weights
+        for i in np.flatnonzero(np.abs(differences) > REBALANCE_THRESHOLD):
+            symbol, optimized_weight, current_weight = self._symbols[i], optimized_weights[i], current_weights[i]
+            if differences[i] > 0:
                 suggestions.append(
-                    f"Zwiększ udział {asset['crypto_name']} do {optimized_weight * 100:.2f}% (z obecnych {current_weight * 100:.2f}%)."
+                    f"Zwiększ udział {symbol} do {optimized_weight * 100:.2f}% (z obecnych {current_weight * 100:.2f}%)."
                 )
-            elif difference < -0.02:
+            else:
                 suggestions.append(
-                    f"Zmniejsz udział {asset['crypto_name']} do {optimized_weight * 100:.2f}% (z obecnych {current_weight * 100:.2f}%)."
+                    f"Zmniejsz udział {symbol} do {optimized_weight * 100:.2f}% (z obecnych {current_weight * 100:.2f}%)."
                 )
         if not suggestions:
             suggestions.append("Portfel jest zoptymalizowany zgodnie z modelem Markowitza.")
@@ -125,34 +220,78 @@ class Portfolio:
 
     @staticmethod
     def get_crypto_list(api_key):
-        url = 'https://min-api.cryptocompare.com/data/all/coinlist'
-        try:
-            response = requests.get(url, params={'api_key': api_key})
-            response.raise_for_status()
-            data = response.json()
-            return sorted(coin['Symbol'] for coin in data['Data'].values())
-        except requests.exceptions.RequestException:
-            return []
+        return coin_catalogue.symbols()
+
+    @staticmethod
+    def _fetch_coin_list(api_key):
+        data = market_data.get('/data/all/coinlist', {'api_key': api_key})
+        return [(coin['Symbol'], coin.get('CoinName') or coin.get('FullName')) for coin in data['Data'].values()]
 
     @staticmethod
     def get_current_price(symbol, api_key):
-        url = 'https://min-api.cryptocompare.com/data/price'
-        params = {'fsym': symbol, 'tsyms': 'USD', 'api_key': api_key}
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json().get('USD', 0)
-        except requests.exceptions.RequestException:
+            return price_cache.get_or_load(symbol, lambda: Portfolio._fetch_current_price(symbol, api_key))
+        except (requests.exceptions.RequestException, KeyError):
             return 0
 
+    @staticmethod
+    def _fetch_current_price(symbol, api_key):
+        params = {'fsym': symbol, 'tsyms': 'USD', 'api_key': api_key}
+        # Brak ceny nie trafia do cache, żeby nie blokować ponownej próby
+        return market_data.get('/data/price', params)['USD']
+
+    # Ceny wielu symboli; brakujące w cache pobierane są porcjami pricemulti, a symbole
+    # pobierane właśnie przez inne żądanie (także get_current_price) są tylko oczekiwane
+    @staticmethod
+    def get_current_prices(symbols, api_key):
+        def load(missing):
+            fetched = {}
+            for chunk in Portfolio._chunk_symbols(missing, PRICEMULTI_FSYMS_LIMIT):
+                try:
+                    fetched.update(Portfolio._fetch_current_prices(chunk, api_key))
+                except requests.exceptions.RequestException:
+                    pass
+            return fetched
+
+        prices = price_cache.get_or_load_many(symbols, load)
+        return {symbol: prices.get(symbol, 0) for symbol in dict.fromkeys(symbols)}
+
+    # Pobiera ceny z pominięciem cache i odświeża go (dla pollera strumienia cen)
+    @staticmethod
+    def refresh_prices(symbols, api_key):
+        prices = {}
+        for chunk in Portfolio._chunk_symbols(list(dict.fromkeys(symbols)), PRICEMULTI_FSYMS_LIMIT):
+            fetched = Portfolio._fetch_current_prices(chunk, api_key)
+            for symbol, price in fetched.items():
+                price_cache.set(symbol, price)
+            prices.update(fetched)
+        return prices
+
+    @staticmethod
+    def _fetch_current_prices(symbols, api_key):
+        params = {'fsyms': ','.join(symbols), 'tsyms': 'USD', 'api_key': api_key}
+        data = market_data.get('/data/pricemulti', params)
+        return {symbol: quote['USD'] for symbol, quote in data.items()
+                if isinstance(quote, dict) and 'USD' in quote}
+
+    @staticmethod
+    def _chunk_symbols(symbols, limit):
+        chunk, length = [], 0
+        for symbol in symbols:
+            extra = len(symbol) + (1 if chunk else 0)
+            if chunk and length + extra > limit:
+                yield chunk
+                chunk, length = [], 0
+                extra = len(symbol)
+            chunk.append(symbol)
+            length += extra
+        if chunk:
+            yield chunk
+
     @staticmethod
     def get_historical_data(symbol, api_key, limit=30):
-        url = 'https://min-api.cryptocompare.com/data/v2/histoday'
-        params = {'fsym': symbol, 'tsym': 'USD', 'limit': limit, 'api_key': api_key}
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json().get('Data', {}).get('Data', [])
+            data = history_store.get_candles(symbol, limit, lambda n: Portfolio._fetch_histoday(symbol, api_key, n))
             dates = [datetime.datetime.fromtimestamp(item['time']) for item in data]
             prices = [item['close'] for item in data]
             return dates, prices
@@ -160,45 +299,35 @@ class Portfolio:
             return [], []
 
     @staticmethod
-    def forecast_prices(prices, days=7):
+    def get_historical_data_many(symbols, api_key, limit=30):
+        symbols = list(dict.fromkeys(symbols))
+        results = history_pool.map(lambda symbol: Portfolio.get_historical_data(symbol, api_key, limit=limit), symbols)
+        return dict(zip(symbols, results))
+
+    # Serie historyczne kończą się na tej samej (bieżącej) świecy, więc nowsze
+    # kryptowaluty z krótszą historią wyrównujemy do wspólnego końca
+    @staticmethod
+    def align_prices(price_series):
+        length = min(len(series) for series in price_series)
+        return np.array([list(series)[len(series) - length:] for series in price_series], dtype=float)
+
+    @staticmethod
+    def _fetch_histoday(symbol, api_key, limit):
+        params = {'fsym': symbol, 'tsym': 'USD', 'limit': limit, 'api_key': api_key}
+        return market_data.get('/data/v2/histoday', params).get('Data', {}).get('Data', [])
+
+    @staticmethod
+    def forecast_prices(prices, days=7, symbol=None, model=None):
         try:
-            model = SARIMAX(prices, order=(1, 1, 1), seasonal_order=(1, 1, 1, 7), enforce_stationarity=False,
-                            enforce_invertibility=False)
-            model_fit = model.fit(disp=False)
-            forecast = model_fit.get_forecast(steps=days)
-            predicted_mean = forecast.predicted_mean
-            conf_int = forecast.conf_int()
-            return predicted_mean, conf_int
+            return get_forecaster(model).forecast(prices, days, symbol)
         except Exception:
             return None, None
 
     @staticmethod
     def calculate_moving_average(prices, window=7):
-        if len(prices) < window:
-            return [np.nan] * len(prices)
-        moving_average = np.convolve(prices, np.ones(window), 'valid') / window
-        padding = [np.nan] * (window - 1)
-        return padding + list(moving_average)
+        return indicators.sma(prices, window).tolist()
 
     @staticmethod
     def send_email_alert(subject, body):
-        smtp_server = os.getenv("SMTP_SERVER")
-        smtp_port = int(os.getenv("SMTP_PORT", 587))
-        smtp_user = os.getenv("SMTP_USERNAME")
-        smtp_pass = os.getenv("SMTP_PASSWORD")
         recipient = os.getenv("ALERT_EMAIL")
-
-        msg = MIMEText(body)
-        msg["Subject"] = subject
-        msg["From"] = smtp_user
-        msg["To"] = recipient
-
-        try:
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                server.starttls()
-                server.login(smtp_user, smtp_pass)
-                server.sendmail(smtp_user, recipient, msg.as_string())
-            return True
-        except Exception as e:
-            print(f"Błąd SMTP: {e}")
-            return False
+        return get_mailer().send_now(recipient, subject, body)
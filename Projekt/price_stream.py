@@ -0,0 +1,111 @@
+import threading
+import time
+
+
+# Subskrypcja jednego klienta: najnowsze niedostarczone ceny (starsze nadpisywane nowszymi)
+class Subscription:
+    def __init__(self, symbols):
+        self.symbols = set(symbols)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def _push(self, prices):
+        with self._lock:
+            self._pending.update(prices)
+        self._event.set()
+
+    # Czeka na nowe ceny; zwraca {symbol: cena} lub {} po upływie timeoutu
+    def wait(self, timeout=None):
+        self._event.wait(timeout)
+        with self._lock:
+            self._event.clear()
+            prices, self._pending = self._pending, {}
+        return prices
+
+
+# Wspólny dla procesu poller cen: jedno zapytanie zbiorcze na cykl dla sumy
+# symboli wszystkich podłączonych klientów, wyniki rozsyłane do subskrypcji
+class PricePoller:
+    def __init__(self, fetch_prices, interval=10.0):
+        self._fetch_prices = fetch_prices
+        self.interval = interval
+        self._subscriptions = set()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.errors = 0
+
+    def subscribe(self, symbols):
+        subscription = Subscription(symbols)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="price-poller", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            if not self._subscriptions:
+                self._wakeup.set()
+
+    # Zmienia zbiór obserwowanych symboli (np. po dodaniu aktywa do portfela)
+    def resubscribe(self, subscription, symbols):
+        with self._lock:
+            subscription.symbols = set(symbols)
+
+    def latest(self, symbols):
+        with self._lock:
+            return {symbol: self._latest[symbol] for symbol in symbols if symbol in self._latest}
+
+    def poll_once(self):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        symbols = sorted(set().union(*(s.symbols for s in subscriptions))) if subscriptions else []
+        if not symbols:
+            return {}
+
+        try:
+            prices = self._fetch_prices(symbols)
+        except Exception as e:
+            self.errors += 1
+            print("⚠️ Błąd pobierania cen dla strumienia:", e)
+            return {}
+        self.polls += 1
+
+        with self._lock:
+            changed = {symbol: price for symbol, price in prices.items()
+                       if price and self._latest.get(symbol) != price}
+            self._latest.update(changed)
+        for subscription in subscriptions:
+            update = {symbol: price for symbol, price in changed.items() if symbol in subscription.symbols}
+            if update:
+                subscription._push(update)
+        return changed
+
+    # Pierwszą wycenę klient dostaje od razu z cache cen, więc poller zaczyna od odczekania interwału
+    def _run(self):
+        started = time.monotonic()
+        while True:
+            self._wakeup.wait(max(0.0, self.interval - (time.monotonic() - started)))
+            self._wakeup.clear()
+            with self._lock:
+                if not self._subscriptions:
+                    self._thread = None
+                    return
+            started = time.monotonic()
+            self.poll_once()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "symbols": len(set().union(*(s.symbols for s in self._subscriptions))) if self._subscriptions else 0,
+                "interval": self.interval,
+                "polls": self.polls,
+                "errors": self.errors,
+            }
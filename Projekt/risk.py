@@ -0,0 +1,102 @@
+from statistics import NormalDist
+import numpy as np
+from optimizer import returns_statistics, COVARIANCE_RIDGE
+
+HORIZONS = (1, 7, 30)
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+# Czynnik Cholesky'ego; dla macierzy osobliwej (np. identyczne serie) rozkład własny
+def _factor(covariance):
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+
+def _tail(losses, confidence):
+    var = float(np.quantile(losses, confidence))
+    tail = losses[losses >= var]
+    return {"var": var, "cvar": float(tail.mean()) if tail.size else var}
+
+
+# Monte Carlo skorelowanych logarytmicznych stóp zwrotu: kroki dzienne z N(mu, Σ)
+# przez czynnik Cholesky'ego, liczone porcjami po `chunk` ścieżek (ograniczona pamięć);
+# zwraca horyzont -> wartości portfela na końcu ścieżek
+def simulate_values(log_returns, positions, horizons=HORIZONS, paths=100_000, chunk=10_000, seed=None):
+    log_returns = np.atleast_2d(np.asarray(log_returns, dtype=float))
+    positions = np.asarray(positions, dtype=float)
+    n = len(positions)
+    mu = log_returns.mean(axis=1)
+    covariance = np.atleast_2d(np.cov(log_returns)) + COVARIANCE_RIDGE * np.eye(n)
+    factor = _factor(covariance)
+
+    rng = np.random.default_rng(seed)
+    steps_needed = max(horizons)
+    values = {h: np.empty(paths) for h in horizons}
+    for start in range(0, paths, chunk):
+        size = min(chunk, paths - start)
+        # Kolejne porcje czytają ten sam strumień liczb losowych, więc wynik
+        # dla danego ziarna nie zależy od rozmiaru porcji
+        steps = rng.standard_normal((size, steps_needed, n)) @ factor.T
+        steps += mu
+        np.cumsum(steps, axis=1, out=steps)
+        for h in horizons:
+            values[h][start:start + size] = np.exp(steps[:, h - 1, :]) @ positions
+    return values
+
+
+# Raport ryzyka portfela: VaR/CVaR historyczny, parametryczny i z Monte Carlo
+# oraz percentyle wartości portfela dla każdego horyzontu (straty w USD)
+def risk_report(prices, amounts, horizons=HORIZONS, confidence=0.95, paths=100_000, chunk=10_000, seed=None):
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    amounts = np.asarray(amounts, dtype=float)
+    positions = amounts * prices[:, -1]
+    value = float(positions.sum())
+
+    returns, _, _ = returns_statistics(prices)
+    simulated = simulate_values(np.log1p(returns), positions, horizons, paths, chunk, seed)
+
+    history = amounts @ prices
+    weights = positions / value if value > 0 else np.zeros_like(positions)
+    daily = weights @ returns
+    mu_p, sigma_p = float(daily.mean()), float(daily.std(ddof=1)) if daily.size > 1 else 0.0
+    z = NormalDist().inv_cdf(confidence)
+    density = NormalDist().pdf(z)
+
+    report = []
+    for h in horizons:
+        mc_values = simulated[h]
+        entry = {
+            "days": h,
+            "monte_carlo": {
+                **_tail(value - mc_values, confidence),
+                "percentiles": {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(mc_values, PERCENTILES))},
+            },
+            "parametric": {
+                "var": value * (z * sigma_p * np.sqrt(h) - h * mu_p),
+                "cvar": value * (sigma_p * np.sqrt(h) * density / (1 - confidence) - h * mu_p),
+            },
+            "historical": None,
+        }
+        if value > 0 and len(history) > h + 1:
+            period_returns = history[h:] / history[:-h] - 1
+            entry["historical"] = _tail(-value * period_returns, confidence)
+        report.append(entry)
+
+    return {"value": value, "confidence": confidence, "paths": paths, "horizons": report}
+
+
+# Prognoza wartości portfela z tego samego modelu Monte Carlo co raport ryzyka:
+# mediana oraz przedział 5%–95% wartości dla każdego horyzontu
+def value_forecast(prices, amounts, horizons=HORIZONS, paths=20_000, seed=None):
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    positions = np.asarray(amounts, dtype=float) * prices[:, -1]
+    returns, _, _ = returns_statistics(prices)
+    simulated = simulate_values(np.log1p(returns), positions, horizons, paths, seed=seed)
+    forecast = []
+    for h in horizons:
+        low, median, high = np.percentile(simulated[h], (5, 50, 95))
+        forecast.append({"days": h, "value": float(median), "low": float(low), "high": float(high)})
+    return forecast
@@ -0,0 +1,339 @@
+import atexit
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from dotenv import load_dotenv
+from portfolio import Portfolio
+from alert_engine import AlertEngine, AlertDelivery
+from mailer import get_mailer
+from firebase_client import db
+from lease import FirestoreLease, SqliteLease
+
+load_dotenv()
+CRYPTOCOMPARE_API_KEY = os.getenv("CRYPTOCOMPARE_API_KEY")
+EMAIL_USER = os.getenv("EMAIL_USER")
+EMAIL_PASS = os.getenv("EMAIL_PASS")
+
+# Indeks niewysłanych alertów synchronizowany z Firestore
+alert_engine = AlertEngine()
+alert_delivery = AlertDelivery(email_ttl=float(os.getenv("EMAIL_CACHE_TTL", 600)))
+
+
+# Treść e-maila z alertem; wiele alertów dla jednego odbiorcy trafia do jednej wiadomości
+def compose_alert_email(to, items):
+    if len(items) == 1:
+        subject, intro = items[0][0], "Twój alert cenowy został właśnie aktywowany."
+    else:
+        subject, intro = f"{items[0][0]} ({len(items)})", "Twoje alerty cenowe zostały właśnie aktywowane."
+    alerts = "\n".join(body for _, body in items)
+    return subject, f"""
+Cześć,
+
+{intro}
+
+{alerts}
+
+Pozdrawiamy,
+Zespół Twojej aplikacji
+""".strip()
+
+
+mailer = get_mailer(sender_name="Alerty Krypto", compose=compose_alert_email)
+
+
+# Wysyłanie e-maila SMTP (asynchronicznie, przez kolejkę)
+def send_email(to, subject, body, on_result=None):
+    return mailer.enqueue(to, subject, body, on_result)
+
+
+# Alerty w kolejce e-maili (in flight) i już dostarczone do serwera SMTP, ale jeszcze
+# nieoznaczone w Firestore; alert jest oznaczany jako wysłany dopiero po dostarczeniu
+_delivery_lock = threading.Lock()
+_in_flight = set()
+_delivered = []
+
+
+def _delivery_callback(alert_id):
+    def on_result(delivered):
+        with _delivery_lock:
+            if delivered:
+                _delivered.append(alert_id)
+            else:
+                _in_flight.discard(alert_id)
+    return on_result
+
+
+# Oznacza dostarczone alerty jako wysłane jednym WriteBatch; przy błędzie zostają na następny cykl
+def flush_delivered():
+    with _delivery_lock:
+        delivered = list(_delivered)
+        _delivered.clear()
+    if not delivered:
+        return 0
+    try:
+        alert_delivery.mark_sent(db, delivered)
+    except Exception as e:
+        print("❌ Błąd podczas oznaczania alertów jako wysłane:", e)
+        with _delivery_lock:
+            _delivered.extend(delivered)
+        return 0
+    for alert_id in delivered:
+        alert_engine.mark_sent(alert_id)
+    with _delivery_lock:
+        _in_flight.difference_update(delivered)
+    print(f"✅ Wysłano alertów: {len(delivered)}.")
+    return len(delivered)
+
+
+# Wysyłanie alertów oczekujących
+def process_pending_alerts():
+    print("🔄 Sprawdzanie oczekujących alertów...")
+
+    try:
+        alert_engine.sync(db)
+    except Exception as e:
+        print("❌ Błąd podczas pobierania alertów z Firestore:", e)
+        return
+    flush_delivered()
+
+    # Jedna cena na symbol, niezależnie od liczby alertów
+    symbols = alert_engine.symbols()
+    prices = Portfolio.get_current_prices(symbols, CRYPTOCOMPARE_API_KEY)
+    print(f"➡ Alerty: {len(alert_engine)}, symbole: {len(symbols)}")
+
+    fired = []
+    for symbol in symbols:
+        current_price = prices.get(symbol)
+        if not current_price:
+            print(f"⚠️ Brak ceny dla {symbol}, pomijam.")
+            continue
+        for alert_id, data in alert_engine.crossed(symbol, current_price):
+            with _delivery_lock:
+                if alert_id in _in_flight:
+                    continue
+            print(f"📈 Cena {symbol} przekroczyła próg: {current_price} > {data.get('target')} (UID: {data.get('uid')})")
+            fired.append((alert_id, data))
+
+    if not fired:
+        return
+    alert_delivery.record_fired(len(fired))
+
+    # Jeden odczyt get_all dla wszystkich użytkowników zamiast odczytu na alert
+    try:
+        emails = alert_delivery.resolve_emails(db, [data.get("uid") for _, data in fired])
+    except Exception as e:
+        print("❌ Błąd podczas pobierania użytkowników z Firestore:", e)
+        return
+
+    queued = 0
+    for alert_id, data in fired:
+        if _lease_lost.is_set():
+            print("⚠️ Utracono dzierżawę lidera, pozostałe alerty wyśle nowy lider")
+            break
+        try:
+            uid = data.get("uid")
+            email = emails.get(uid)
+            if not email:
+                print("⚠️ Użytkownik nie znaleziony lub nie ma przypisanego maila:", uid)
+                continue
+
+            with _delivery_lock:
+                _in_flight.add(alert_id)
+            if send_email(email, "🔔 Alert cenowy", data.get("message"), _delivery_callback(alert_id)):
+                queued += 1
+            else:
+                with _delivery_lock:
+                    _in_flight.discard(alert_id)
+        except Exception as e:
+            with _delivery_lock:
+                _in_flight.discard(alert_id)
+            print("❌ Błąd przetwarzania alertu:", e)
+
+    print(f"📨 Alerty przekazane do wysyłki: {queued}.")
+    flush_delivered()
+
+
+def make_lease():
+    kind = os.getenv("SCHEDULER_LEASE", "firestore")
+    ttl = float(os.getenv("SCHEDULER_LEASE_TTL", 150))
+    if kind == "firestore":
+        return FirestoreLease(db, "alerts", ttl=ttl)
+    if kind == "sqlite":
+        return SqliteLease(os.getenv("SCHEDULER_LEASE_PATH", "scheduler.sqlite3"), "alerts", ttl=ttl)
+    if kind == "none":
+        return None
+    raise ValueError(f"Nieznana wartość SCHEDULER_LEASE: {kind} (dozwolone: firestore, sqlite, none)")
+
+
+# Odnawia dzierżawę w tle co 1/3 jej ważności, dopóki trwa cykl; gdy odnowienie się
+# nie powiedzie, ustawia lease_lost, a cykl przerywa wysyłkę, zanim dzierżawa wygaśnie
+# i przejmie ją inny węzeł
+class LeaseHeartbeat:
+    def __init__(self, lease, lost):
+        self.lease = lease
+        self.lost = lost
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.lease.ttl / 3):
+            try:
+                renewed = self.lease.acquire()
+            except Exception as e:
+                print("❌ Błąd odnawiania dzierżawy schedulera:", e)
+                renewed = False
+            if not renewed:
+                print("⚠️ Nie udało się odnowić dzierżawy w trakcie cyklu, przerywam wysyłkę")
+                self.lost.set()
+                return
+
+
+# Lider wyłoniony przez dzierżawę; None oznacza pracę bez koordynacji (jedna instancja)
+leader_lease = None
+is_leader = False
+_tick_lock = threading.Lock()
+_lease_lost = threading.Event()
+tick_stats = {
+    "ticks": 0,
+    "skipped_overlap": 0,
+    "skipped_follower": 0,
+    "lease_errors": 0,
+    "last_duration": 0.0,
+    "max_duration": 0.0,
+    "total_duration": 0.0,
+}
+
+
+# Jeden cykl schedulera: pomija się, gdy poprzedni jeszcze trwa lub gdy
+# liderem jest inny węzeł, dzięki czemu każdy alert jest sprawdzany raz
+def run_tick():
+    global is_leader
+    if not _tick_lock.acquire(blocking=False):
+        tick_stats["skipped_overlap"] += 1
+        print("⏭️ Poprzedni cykl alertów wciąż trwa, pomijam")
+        return False
+
+    try:
+        if leader_lease is not None:
+            try:
+                leader = leader_lease.acquire()
+            except Exception as e:
+                tick_stats["lease_errors"] += 1
+                print("❌ Błąd odnawiania dzierżawy schedulera:", e)
+                leader = False
+            if not leader:
+                if is_leader:
+                    print("ℹ️ Utracono rolę lidera schedulera alertów")
+                    alert_engine.stop()
+                is_leader = False
+                tick_stats["skipped_follower"] += 1
+                return False
+            if not is_leader:
+                print(f"👑 Przejęto rolę lidera schedulera alertów ({leader_lease.holder})")
+            is_leader = True
+
+        start = time.perf_counter()
+        _lease_lost.clear()
+        with LeaseHeartbeat(leader_lease, _lease_lost) if leader_lease is not None else nullcontext():
+            process_pending_alerts()
+        duration = time.perf_counter() - start
+        tick_stats["ticks"] += 1
+        tick_stats["last_duration"] = duration
+        tick_stats["max_duration"] = max(tick_stats["max_duration"], duration)
+        tick_stats["total_duration"] += duration
+        print(f"⏱️ Cykl alertów: {duration * 1000:.0f} ms, oczekujące alerty: {len(alert_engine)}, "
+              f"kolejka e-maili: {mailer.stats()['queued']}")
+        return True
+    finally:
+        _tick_lock.release()
+
+
+def scheduler_stats():
+    ticks = tick_stats["ticks"]
+    return {
+        **tick_stats,
+        "avg_duration": tick_stats["total_duration"] / ticks if ticks else 0.0,
+        "leader": is_leader,
+        "holder": leader_lease.holder if leader_lease is not None else None,
+        "pending_alerts": len(alert_engine),
+        "in_flight_alerts": len(_in_flight),
+        "email_queue": mailer.stats()["queued"],
+    }
+
+
+# scheduler.py może być importowany przez kilka punktów startowych (app.py, fabryka,
+# python scheduler.py); w jednym procesie działa najwyżej jeden scheduler
+_scheduler = None
+_start_lock = threading.Lock()
+
+
+# Uruchamia cykliczne sprawdzanie alertów; może działać na wielu węzłach naraz,
+# cykle wykonuje tylko aktualny posiadacz dzierżawy. blocking=False uruchamia
+# scheduler w tle (np. razem z serwerem deweloperskim); kolejne wywołania
+# w tym samym procesie zwracają już działający scheduler
+def start_scheduler(blocking=True):
+    global leader_lease, _scheduler
+    with _start_lock:
+        if _scheduler is not None:
+            return _scheduler
+        if not EMAIL_USER or not EMAIL_PASS:
+            raise RuntimeError("Brakuje EMAIL_USER lub EMAIL_PASS w pliku .env")
+
+        leader_lease = make_lease()
+
+        if blocking:
+            from apscheduler.schedulers.blocking import BlockingScheduler as Scheduler
+        else:
+            from apscheduler.schedulers.background import BackgroundScheduler as Scheduler
+        scheduler = Scheduler()
+        scheduler.add_job(run_tick, "interval", seconds=float(os.getenv("SCHEDULER_INTERVAL", 60)),
+                          max_instances=1, coalesce=True)
+        _scheduler = scheduler
+        atexit.register(stop_scheduler)
+    print("⏰ Scheduler alertów uruchomiony")
+    if blocking:
+        try:
+            scheduler.start()
+        finally:
+            stop_scheduler()
+    else:
+        scheduler.start()
+    return scheduler
+
+
+# Zatrzymanie schedulera: dosyła kolejkę e-maili, oznacza dostarczone alerty
+# i zwalnia dzierżawę lidera (także przy SIGTERM i wyjściu z procesu)
+def stop_scheduler():
+    global _scheduler, is_leader
+    with _start_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is None:
+        return
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    mailer.stop(flush=True)
+    flush_delivered()
+    if is_leader and leader_lease is not None:
+        leader_lease.release()
+        is_leader = False
+    print("⏹️ Scheduler alertów zatrzymany")
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        start_scheduler()
+    except (KeyboardInterrupt, SystemExit):
+        pass
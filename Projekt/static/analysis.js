@@ -26,21 +26,13 @@ onAuthStateChanged(auth, async user => {
     const symbol = document.getElementById("symbol").value.trim().toUpperCase();
     if (!symbol) return;
 
-    try {
-      const res = await fetch(`/chart/${symbol}`);
-      const data = await res.json();
-
-      if (data.image_base64) {
-        chartImg.src = `data:image/png;base64,${data.image_base64}`;
-        chartImg.classList.remove("hidden");
-      } else {
-        alert("Brak danych do wykresu.");
-        chartImg.classList.add("hidden");
-      }
-    } catch (err) {
-      console.error("❌ Błąd ładowania wykresu:", err);
+    // Surowy obraz zamiast PNG w base64: mniejszy transfer i cache przeglądarki (ETag)
+    chartImg.onload = () => chartImg.classList.remove("hidden");
+    chartImg.onerror = () => {
+      alert("Brak danych do wykresu.");
       chartImg.classList.add("hidden");
-    }
+    };
+    chartImg.src = `/chart/${encodeURIComponent(symbol)}?format=webp`;
   });
 
   // 📅 Prognoza
@@ -50,7 +42,7 @@ onAuthStateChanged(auth, async user => {
     });
     const data = await res.json();
 
-    if (!data.forecast) throw new Error("Brak danych forecast");
+    if (!data.forecast) throw new Error(data.error || "Brak danych forecast");
 
     const forecastTable = document.getElementById("forecast-table");
     document.getElementById("forecast-loading").remove();
@@ -60,6 +52,7 @@ onAuthStateChanged(auth, async user => {
       tr.innerHTML = `
         <td class="px-4 py-2">${row.days}</td>
         <td class="px-4 py-2">${row.value.toFixed(2)} USD</td>
+        <td class="px-4 py-2">${row.low.toFixed(2)} – ${row.high.toFixed(2)}</td>
       `;
       forecastTable.appendChild(tr);
     });
@@ -68,6 +61,33 @@ onAuthStateChanged(auth, async user => {
     document.getElementById("forecast-loading").textContent = "❌ Błąd ładowania prognozy.";
   }
 
+  // ⚠️ Ryzyko
+  try {
+    const res = await fetch("/api/risk", {
+      headers: { Authorization: "Bearer " + token }
+    });
+    const data = await res.json();
+    if (!data.horizons) throw new Error(data.error || "Brak danych ryzyka");
+
+    const riskTable = document.getElementById("risk-table");
+    document.getElementById("risk-loading").remove();
+
+    data.horizons.forEach(row => {
+      const mc = row.monte_carlo;
+      const tr = document.createElement("tr");
+      tr.innerHTML = `
+        <td class="px-4 py-2">${row.days}</td>
+        <td class="px-4 py-2">${mc.var.toFixed(2)}</td>
+        <td class="px-4 py-2">${mc.cvar.toFixed(2)}</td>
+        <td class="px-4 py-2">${mc.percentiles.p5.toFixed(2)} – ${mc.percentiles.p95.toFixed(2)}</td>
+      `;
+      riskTable.appendChild(tr);
+    });
+  } catch (err) {
+    console.error("Risk error:", err);
+    document.getElementById("risk-loading").textContent = "❌ Błąd ładowania analizy ryzyka.";
+  }
+
   // ⚙️ Optymalizacja
   try {
     const res = await fetch("/api/optimize", {
@@ -20,6 +20,32 @@ onAuthStateChanged(auth, async user => {
   }
 
   const token = await user.getIdToken();
+  let priceStream = null;
+
+  // Podpowiedzi symboli z katalogu monet
+  const cryptoInput = document.getElementById("crypto");
+  const cryptoList = document.getElementById("crypto-list");
+  let suggestTimer = null;
+  cryptoInput.addEventListener("input", () => {
+    clearTimeout(suggestTimer);
+    const query = cryptoInput.value.trim();
+    if (!query) return;
+    suggestTimer = setTimeout(async () => {
+      try {
+        const res = await fetch(`/api/coins?q=${encodeURIComponent(query)}&limit=10`);
+        const data = await res.json();
+        cryptoList.innerHTML = "";
+        data.coins.forEach(coin => {
+          const option = document.createElement("option");
+          option.value = coin.symbol;
+          option.label = coin.name;
+          cryptoList.appendChild(option);
+        });
+      } catch (err) {
+        console.error("❌ Błąd podpowiedzi symboli:", err);
+      }
+    }, 200);
+  });
 
   document.getElementById("add-form").addEventListener("submit", async (e) => {
     e.preventDefault();
@@ -63,13 +89,14 @@ onAuthStateChanged(auth, async user => {
 
       data.assets.forEach(asset => {
         const row = document.createElement("tr");
+        row.dataset.symbol = asset.crypto_name;
         fadeInRow(row);
 
         row.innerHTML = `
           <td class="px-4 py-2">${asset.crypto_name}</td>
           <td class="px-4 py-2">${asset.amount}</td>
           <td class="px-4 py-2">${asset.price.toFixed(2)} USD</td>
-          <td class="px-4 py-2">${asset.value.toFixed(2)} USD</td>
+          <td class="px-4 py-2 asset-value">${asset.value.toFixed(2)} USD</td>
           <td class="px-4 py-2 flex gap-2">
             <input type="number" min="0" step="any" placeholder="Ilość"
                    class="delete-amount bg-gray-800 border border-gray-600 rounded px-2 py-1 text-white w-24 text-sm">
@@ -121,5 +148,53 @@ onAuthStateChanged(auth, async user => {
     }
   };
 
-  loadPortfolio();
+  // Na żywo aktualizuje wartości pozycji cenami ze strumienia SSE serwera
+  function applyValuation(data) {
+    (data.assets || []).forEach(asset => {
+      const cell = document.querySelector(`#portfolio-table tr[data-symbol="${asset.crypto_name}"] .asset-value`);
+      if (cell) {
+        cell.textContent = `${asset.value.toFixed(2)} USD`;
+        cell.title = `Cena bieżąca: ${asset.current_price.toFixed(2)} USD`;
+      } else {
+        loadPortfolio();
+      }
+    });
+    (data.removed || []).forEach(symbol => {
+      const row = document.querySelector(`#portfolio-table tr[data-symbol="${symbol}"]`);
+      if (row) row.remove();
+    });
+    document.getElementById("total-value").textContent = `${data.total_value.toFixed(2)} USD`;
+  }
+
+  async function connectPriceStream() {
+    if (priceStream) priceStream.close();
+    priceStream = null;
+    try {
+      // Jednorazowy bilet zamiast tokenu w URL; token idzie tylko w nagłówku
+      const freshToken = await user.getIdToken();
+      const res = await fetch("/api/portfolio/stream-ticket", {
+        method: "POST",
+        headers: { Authorization: "Bearer " + freshToken }
+      });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const { ticket } = await res.json();
+      priceStream = new EventSource(`/api/portfolio/stream?ticket=${encodeURIComponent(ticket)}`);
+    } catch (err) {
+      console.error("❌ Błąd połączenia ze strumieniem cen:", err);
+      setTimeout(connectPriceStream, 5000);
+      return;
+    }
+    priceStream.addEventListener("snapshot", e => applyValuation(JSON.parse(e.data)));
+    priceStream.addEventListener("delta", e => applyValuation(JSON.parse(e.data)));
+    // Serwer kończy strumień po PRICE_STREAM_MAX_AGE - od razu łączymy się z nowym biletem
+    priceStream.addEventListener("reconnect", () => connectPriceStream());
+    priceStream.onerror = () => {
+      // Bilet jest jednorazowy, więc automatyczne wznowienie EventSource nie zadziała
+      priceStream.close();
+      setTimeout(connectPriceStream, 5000);
+    };
+  }
+
+  await loadPortfolio();
+  connectPriceStream();
 });
@@ -81,7 +81,19 @@ function login() {
 }
 
 // 🚪 Wylogowanie
-function logout() {
+async function logout() {
+  const user = auth.currentUser;
+  if (user) {
+    try {
+      const token = await user.getIdToken();
+      await fetch("/api/logout", {
+        method: "POST",
+        headers: { Authorization: "Bearer " + token }
+      });
+    } catch (err) {
+      console.error("Błąd wylogowania po stronie serwera:", err);
+    }
+  }
   signOut(auth).then(() => {
     window.location.href = "/login";
   });
@@ -0,0 +1,115 @@
+import random
+import time
+import unittest
+from unittest.mock import MagicMock
+from alert_engine import AlertIndex, AlertEngine, AlertDelivery
+
+
+def alert(symbol, target, **extra):
+    return {"symbol": symbol, "target": target, "uid": "u1", "sent": False, **extra}
+
+
+class TestAlertIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = AlertIndex()
+        self.index.upsert("a1", alert("BTC", 100))
+        self.index.upsert("a2", alert("BTC", 200))
+        self.index.upsert("a3", alert("BTC", 200))
+        self.index.upsert("a4", alert("ETH", 10))
+
+    def test_crossed_is_strictly_above_target(self):
+        self.assertEqual([a for a, _ in self.index.crossed("BTC", 200)], ["a1"])
+        self.assertEqual(sorted(a for a, _ in self.index.crossed("BTC", 200.01)), ["a1", "a2", "a3"])
+        self.assertEqual(self.index.crossed("SOL", 1000), [])
+
+    def test_upsert_moves_alert(self):
+        self.index.upsert("a2", alert("BTC", 50))
+        self.assertEqual(sorted(a for a, _ in self.index.crossed("BTC", 150)), ["a1", "a2"])
+        self.assertEqual(len(self.index), 4)
+
+    def test_remove_and_sent(self):
+        self.index.remove("a3")
+        self.index.upsert("a4", alert("ETH", 10, sent=True))
+        self.assertEqual([a for a, _ in self.index.crossed("BTC", 1000)], ["a1", "a2"])
+        self.assertEqual(self.index.symbols(), ["BTC"])
+
+    def test_large_index_scan(self):
+        index = AlertIndex()
+        rng = random.Random(0)
+        for i in range(100_000):
+            index.upsert(f"id{i}", alert(f"S{i % 50}", rng.uniform(0, 1000)))
+        start = time.perf_counter()
+        fired = sum(len(index.crossed(symbol, 500)) for symbol in index.symbols())
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertTrue(45_000 < fired < 55_000)
+
+
+class TestAlertEngine(unittest.TestCase):
+
+    def _change(self, kind, alert_id, data=None):
+        change = MagicMock()
+        change.type.name = kind
+        change.document.id = alert_id
+        change.document.to_dict.return_value = data
+        return change
+
+    def test_sync_loads_and_applies_changes(self):
+        doc = MagicMock()
+        doc.id = "a1"
+        doc.to_dict.return_value = alert("BTC", 100)
+        db = MagicMock()
+        db.collection.return_value.where.return_value.stream.return_value = [doc]
+
+        engine = AlertEngine()
+        engine.sync(db)
+        engine.sync(db)
+        self.assertEqual(len(engine), 1)
+        db.collection.return_value.where.return_value.on_snapshot.assert_called_once()
+
+        engine._on_snapshot([], [self._change("ADDED", "a2", alert("ETH", 5)),
+                                 self._change("REMOVED", "a1")], None)
+        self.assertEqual(engine.symbols(), ["ETH"])
+
+    def test_sync_reloads_without_listener(self):
+        db = MagicMock()
+        db.collection.return_value.where.return_value.stream.return_value = []
+        db.collection.return_value.where.return_value.on_snapshot.side_effect = RuntimeError("no watch")
+        engine = AlertEngine()
+        engine.sync(db)
+        engine.sync(db)
+        self.assertEqual(db.collection.return_value.where.return_value.stream.call_count, 2)
+
+class TestAlertDelivery(unittest.TestCase):
+
+    def _user(self, uid, email):
+        doc = MagicMock()
+        doc.id = uid
+        doc.exists = email is not None
+        doc.to_dict.return_value = {"email": email}
+        return doc
+
+    def test_resolve_emails_uses_get_all_and_cache(self):
+        db = MagicMock()
+        db.get_all.return_value = [self._user("u1", "a@x.pl"), self._user("u2", None)]
+        delivery = AlertDelivery()
+
+        emails = delivery.resolve_emails(db, ["u1", "u2", "u1"])
+        self.assertEqual(emails, {"u1": "a@x.pl"})
+        self.assertEqual(len(db.get_all.call_args.args[0]), 2)
+
+        db.get_all.return_value = [self._user("u2", None)]
+        self.assertEqual(delivery.resolve_emails(db, ["u1", "u2"]), {"u1": "a@x.pl"})
+        self.assertEqual(len(db.get_all.call_args.args[0]), 1)
+        self.assertEqual(delivery.stats()["email_cache"]["hits"], 1)
+
+    def test_mark_sent_commits_in_batches(self):
+        db = MagicMock()
+        delivery = AlertDelivery()
+        delivery.mark_sent(db, [f"a{i}" for i in range(1200)])
+        self.assertEqual(db.batch.return_value.commit.call_count, 3)
+        self.assertEqual(db.batch.return_value.update.call_count, 1200)
+        self.assertEqual(delivery.stats()["round_trips"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
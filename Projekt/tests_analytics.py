@@ -0,0 +1,39 @@
+import threading
+import time
+import unittest
+from analytics import AnalyticsExecutor, AnalyticsBusy, AnalyticsTimeout
+
+
+class TestAnalyticsExecutor(unittest.TestCase):
+
+    def test_inline_mode(self):
+        executor = AnalyticsExecutor(max_workers=0)
+        self.assertEqual(executor.run(lambda x: x * 2, 21), 42)
+
+    def test_runs_in_process_pool(self):
+        executor = AnalyticsExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        self.assertEqual(executor.run(pow, 2, 10), 1024)
+        self.assertEqual(executor.stats()["completed"], 1)
+
+    def test_timeout(self):
+        executor = AnalyticsExecutor(max_workers=1, timeout=0.2)
+        self.addCleanup(executor.shutdown, False)
+        with self.assertRaises(AnalyticsTimeout):
+            executor.run(time.sleep, 2)
+        self.assertEqual(executor.stats()["timeouts"], 1)
+
+    def test_rejects_when_queue_is_full(self):
+        executor = AnalyticsExecutor(max_workers=1, max_queue=0)
+        self.addCleanup(executor.shutdown, False)
+        worker = threading.Thread(target=executor.run, args=(time.sleep, 1))
+        worker.start()
+        while executor.stats()["submitted"] == 0:
+            time.sleep(0.01)
+        with self.assertRaises(AnalyticsBusy):
+            executor.run(pow, 2, 2)
+        worker.join()
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
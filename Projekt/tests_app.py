@@ -1,6 +1,13 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from app import app as flask_app
+from app import app as flask_app, chart_cache, token_cache, stream_tickets
+from asset_cache import AssetSnapshotCache
+from analytics import AnalyticsExecutor
+from price_stream import PricePoller
+from catalogue import CoinCatalogue
+import os
+import runpy
+import tempfile
 import numpy as np
 
 class TestAPI(unittest.TestCase):
@@ -18,15 +25,39 @@ class TestAPI(unittest.TestCase):
         patcher_db.start()
         self.addCleanup(patcher_db.stop)
 
-    def test_add_crypto_mocked(self):
-        mock_assets = (
-            self.mock_db
-            .collection.return_value
-            .document.return_value
-            .collection.return_value
-            .document.return_value
-        )
-        mock_assets.get.return_value.exists = False
+        chart_cache.clear()
+        token_cache.clear()
+        stream_tickets.clear()
+
+        patcher_analytics = patch("app.analytics", AnalyticsExecutor(max_workers=0))
+        patcher_analytics.start()
+        self.addCleanup(patcher_analytics.stop)
+
+        patcher_assets = patch("app.asset_cache", AssetSnapshotCache())
+        patcher_assets.start()
+        self.addCleanup(patcher_assets.stop)
+
+        catalogue = CoinCatalogue(os.path.join(tempfile.mkdtemp(), "coins.json.gz"), lambda: [
+            ("BTC", "Bitcoin"), ("BCH", "Bitcoin Cash"), ("ETH", "Ethereum"), ("SOL", "Solana")])
+        patcher_catalogue = patch("app.coin_catalogue", catalogue)
+        patcher_catalogue.start()
+        self.addCleanup(patcher_catalogue.stop)
+
+    def _mock_transaction_assets(self, **assets):
+        snapshots = []
+        for symbol, data in assets.items():
+            snapshot = MagicMock()
+            snapshot.id = symbol
+            snapshot.exists = True
+            snapshot.to_dict.return_value = data
+            snapshots.append(snapshot)
+        transaction = self.mock_db.transaction.return_value
+        transaction.get_all.return_value = snapshots
+        return transaction
+
+    @patch("app.Portfolio.get_current_prices", return_value={"BTC": 30000.0})
+    def test_add_crypto_mocked(self, mock_prices):
+        transaction = self._mock_transaction_assets()
 
         response = self.client.post(
             "/api/add",
@@ -36,6 +67,37 @@ class TestAPI(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.get_json()["status"], "added")
+        transaction.set.assert_called_once()
+        self.assertEqual(transaction.set.call_args[0][1], {"amount": 0.01, "price": 30000.0})
+
+    @patch("app.Portfolio.get_current_prices", return_value={"BTC": 30000.0, "ETH": 0.0})
+    def test_trades_bulk_applied_in_one_transaction(self, mock_prices):
+        transaction = self._mock_transaction_assets(BTC={"amount": 1.0, "price": 10000.0},
+                                                    SOL={"amount": 2.0, "price": 100.0})
+
+        response = self.client.post(
+            "/api/trades",
+            headers={"Authorization": "Bearer test"},
+            json={"trades": [
+                {"symbol": "btc", "side": "buy", "amount": 1.0},
+                {"symbol": "SOL", "side": "sell", "amount": 5},
+            ]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        assets = response.get_json()["assets"]
+        self.assertEqual(assets["BTC"], {"amount": 2.0, "price": 20000.0})
+        self.assertIsNone(assets["SOL"])
+        self.assertEqual(self.mock_db.transaction.call_count, 1)
+        self.assertEqual(mock_prices.call_count, 1)
+        transaction.delete.assert_called_once()
+
+        response = self.client.post(
+            "/api/trades",
+            headers={"Authorization": "Bearer test"},
+            json={"trades": [{"symbol": "ETH", "side": "buy", "amount": 1.0}]}
+        )
+        self.assertEqual(response.status_code, 400)
 
     def test_alert_creation_mocked(self):
         alerts_collection = self.mock_db.collection.return_value
@@ -50,17 +112,29 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.get_json()["status"], "added")
 
-    def test_forecast_mocked(self):
+    @patch("portfolio.Portfolio.get_historical_data_many")
+    def test_forecast_from_risk_simulation(self, mock_history):
         asset_mock = MagicMock()
+        asset_mock.id = "BTC"
         asset_mock.to_dict.return_value = {"amount": 1, "price": 1000}
-
         self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = [asset_mock]
+        rng = np.random.default_rng(5)
+        mock_history.return_value = {"BTC": (list(range(60)), (100 * np.exp(np.cumsum(rng.normal(0, 0.02, 60)))).tolist())}
 
-        response = self.client.get("/api/forecast", headers={"Authorization": "Bearer test"})
+        headers = {"Authorization": "Bearer test"}
+        response = self.client.get("/api/forecast?seed=7", headers=headers)
         self.assertEqual(response.status_code, 200)
-        data = response.get_json()
-        self.assertIn("forecast", data)
-        self.assertEqual(len(data["forecast"]), 3)
+        forecast = response.get_json()["forecast"]
+        self.assertEqual([row["days"] for row in forecast], [1, 7, 30])
+        for row in forecast:
+            self.assertLess(row["low"], row["value"])
+            self.assertLess(row["value"], row["high"])
+
+        # Mediana prognozy to ten sam percentyl co w raporcie ryzyka dla tych samych ścieżek
+        risk = self.client.get("/api/risk?paths=20000&seed=7", headers=headers).get_json()
+        for row, horizon in zip(forecast, risk["horizons"]):
+            self.assertAlmostEqual(row["value"], horizon["monte_carlo"]["percentiles"]["p50"])
+            self.assertAlmostEqual(row["high"], horizon["monte_carlo"]["percentiles"]["p95"])
 
     def test_optimize_empty_mocked(self):
         self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = []
@@ -70,25 +144,69 @@ class TestAPI(unittest.TestCase):
         data = response.get_json()
         self.assertIn("suggestions", data)
 
+    @patch("portfolio.Portfolio.get_historical_data")
+    def test_optimize_frontier_mocked(self, mock_hist):
+        rng = np.random.default_rng(1)
+        series = {s: (100 * np.cumprod(1 + rng.normal(0.001, 0.02, 101))).tolist() for s in ("BTC", "ETH")}
+        mock_hist.side_effect = lambda symbol, api_key, limit=30: ([1] * 101, series[symbol])
+
+        docs = []
+        for symbol in ("BTC", "ETH"):
+            doc = MagicMock()
+            doc.id = symbol
+            doc.to_dict.return_value = {"amount": 1, "price": 100}
+            docs.append(doc)
+        self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = docs
+
+        response = self.client.post("/api/optimize", headers={"Authorization": "Bearer test"},
+                                    json={"objective": "min_variance", "frontier": 20})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertAlmostEqual(sum(data["weights"].values()), 1)
+        self.assertEqual(len(data["frontier"]), 20)
+        self.assertIn("suggestions", data)
+
+        for body in ({"frontier": "many"}, {"target_return": "high"}, {"objective": "target_return"},
+                     {"target_return": float("nan")}, {"risk_free_rate": float("inf")}, {"frontier": float("inf")},
+                     ["min_variance"]):
+            response = self.client.post("/api/optimize", headers={"Authorization": "Bearer test"}, json=body)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.get_json())
+        response = self.client.post("/api/optimize", headers={"Authorization": "Bearer test"}, json={"frontier": -5})
+        self.assertNotIn("frontier", response.get_json())
+
     def test_delete_crypto_partial(self):
-        symbol = "BTC"
-        mock_doc = (
-            self.mock_db
-            .collection.return_value
-            .document.return_value
-            .collection.return_value
-            .document.return_value
-        )
-        mock_doc.get.return_value.exists = True
-        mock_doc.get.return_value.to_dict.return_value = {"amount": 1.0, "price": 10000}
+        transaction = self._mock_transaction_assets(BTC={"amount": 1.0, "price": 10000})
 
         response = self.client.delete(
-            f"/api/delete/{symbol}",
+            "/api/delete/BTC",
             headers={"Authorization": "Bearer test"},
             json={"amount": 0.5}
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.get_json()["status"], "updated")
+        self.assertEqual(transaction.set.call_args[0][1], {"amount": 0.5, "price": 10000})
+
+        transaction = self._mock_transaction_assets(BTC={"amount": 0.5, "price": 10000})
+        response = self.client.delete("/api/delete/btc", headers={"Authorization": "Bearer test"}, json={"amount": 0.2})
+        self.assertEqual(response.status_code, 200)
+        assets = self.mock_db.collection.return_value.document.return_value.collection.return_value
+        assets.document.assert_called_with("BTC")
+
+        for body in ({"amount": -1}, {"amount": "abc"}, {}, [0.5]):
+            transaction.set.reset_mock()
+            response = self.client.delete("/api/delete/BTC", headers={"Authorization": "Bearer test"}, json=body)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.get_json())
+            transaction.set.assert_not_called()
+
+        self._mock_transaction_assets()
+        response = self.client.delete(
+            "/api/delete/BTC",
+            headers={"Authorization": "Bearer test"},
+            json={"amount": 0.5}
+        )
+        self.assertEqual(response.status_code, 404)
 
     def test_get_alerts_list(self):
         mock_alert = MagicMock()
@@ -107,6 +225,75 @@ class TestAPI(unittest.TestCase):
         self.assertIn("alerts", data)
         self.assertEqual(data["alerts"][0]["id"], "alert123")
 
+    def test_token_verified_once_per_token(self):
+        self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = []
+        for _ in range(3):
+            response = self.client.get("/api/portfolio", headers={"Authorization": "Bearer same-token"})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.mock_verify_token.call_count, 1)
+
+    @patch("portfolio.Portfolio.get_historical_data_many", return_value={"BTC": ([], [])})
+    def test_portfolio_snapshot_cached_and_written_through(self, _):
+        mock_asset = MagicMock()
+        mock_asset.id = "BTC"
+        mock_asset.to_dict.return_value = {"amount": 1.0, "price": 30000}
+        assets = self.mock_db.collection.return_value.document.return_value.collection.return_value
+        assets.stream.return_value = [mock_asset]
+        self._mock_transaction_assets(BTC={"amount": 1.0, "price": 30000})
+
+        headers = {"Authorization": "Bearer test"}
+        self.client.get("/api/portfolio", headers=headers)
+        self.client.get("/api/forecast", headers=headers)
+        self.client.delete("/api/delete/BTC", headers=headers, json={"amount": 0.5})
+        data = self.client.get("/api/portfolio", headers=headers).get_json()
+
+        self.assertEqual(assets.stream.call_count, 1)
+        self.assertEqual(data["assets"][0]["amount"], 0.5)
+
+    @patch("app.Portfolio.get_current_prices", return_value={"BTC": 30000.0})
+    def test_portfolio_stream_sends_snapshot_then_deltas(self, mock_prices):
+        mock_asset = MagicMock()
+        mock_asset.id = "BTC"
+        mock_asset.to_dict.return_value = {"amount": 2.0, "price": 10000.0}
+        self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = [
+            mock_asset]
+        poller = PricePoller(lambda symbols: {"BTC": 31000.0}, interval=3600)
+
+        with patch("app.price_poller", poller):
+            self.assertEqual(self.client.get("/api/portfolio/stream?token=test").status_code, 401)
+            self.assertEqual(self.client.post("/api/portfolio/stream-ticket").status_code, 401)
+
+            ticket = self.client.post("/api/portfolio/stream-ticket",
+                                      headers={"Authorization": "Bearer test"}).get_json()["ticket"]
+            response = self.client.get(f"/api/portfolio/stream?ticket={ticket}")
+            self.assertEqual(response.mimetype, "text/event-stream")
+            events = iter(response.response)
+
+            snapshot = next(events).decode()
+            self.assertTrue(snapshot.startswith("event: snapshot"))
+            self.assertIn('"total_value": 60000.0', snapshot)
+
+            poller.poll_once()
+            delta = next(events).decode()
+            self.assertTrue(delta.startswith("event: delta"))
+            self.assertIn('"current_price": 31000.0', delta)
+            self.assertIn('"total_value": 62000.0', delta)
+
+            response.close()
+            self.assertEqual(poller.stats()["subscribers"], 0)
+            self.assertEqual(self.client.get(f"/api/portfolio/stream?ticket={ticket}").status_code, 401)
+
+    def test_portfolio_stream_ends_after_max_age(self):
+        self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = []
+        with patch("app.price_poller", PricePoller(lambda symbols: {}, interval=3600)), \
+                patch("app.PRICE_STREAM_MAX_AGE", 0):
+            ticket = self.client.post("/api/portfolio/stream-ticket",
+                                      headers={"Authorization": "Bearer test"}).get_json()["ticket"]
+            events = [chunk.decode() for chunk in self.client.get(f"/api/portfolio/stream?ticket={ticket}").response]
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[0].startswith("event: snapshot"))
+        self.assertTrue(events[1].startswith("event: reconnect"))
+
     def test_delete_alert(self):
         alert_id = "mock_alert"
         alert_doc = MagicMock()
@@ -133,10 +320,25 @@ class TestAPI(unittest.TestCase):
         self.assertIn("assets", data)
         self.assertEqual(data["assets"][0]["crypto_name"], "BTC")
 
+    @patch("portfolio.Portfolio.get_current_prices", return_value={"BTC": 40000})
+    def test_get_portfolio_refresh(self, mock_prices):
+        mock_asset = MagicMock()
+        mock_asset.id = "BTC"
+        mock_asset.to_dict.return_value = {"amount": 1.5, "price": 30000}
+
+        self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = [
+            mock_asset]
+
+        response = self.client.get("/api/portfolio?refresh=1", headers={"Authorization": "Bearer test"})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        mock_prices.assert_called_once()
+        self.assertEqual(data["assets"][0]["current_price"], 40000)
+        self.assertEqual(data["total_value"], 60000)
+
     @patch("portfolio.Portfolio.get_historical_data")
-    @patch("portfolio.Portfolio.calculate_moving_average", return_value=[1] * 30)
     @patch("portfolio.Portfolio.forecast_prices", return_value=([10] * 7, np.array([[8, 12]] * 7)))
-    def test_chart_symbol_view(self, mock_forecast, mock_sma, mock_hist):
+    def test_chart_symbol_view(self, mock_forecast, mock_hist):
         mock_hist.return_value = ([1] * 30, [100 + i for i in range(30)])
 
         response = self.client.get("/chart/BTC", headers={"Authorization": "Bearer test"})
@@ -145,5 +347,153 @@ class TestAPI(unittest.TestCase):
         self.assertIn("image_base64", data)
         self.assertEqual(data["symbol"], "BTC")
 
+    @patch("portfolio.Portfolio.get_historical_data")
+    @patch("app.render_chart", side_effect=[b"png-v1", b"png-v2"])
+    def test_chart_cached_with_etag(self, mock_render, mock_hist):
+        mock_hist.return_value = ([1] * 30, [100 + i for i in range(30)])
+
+        first = self.client.get("/chart/BTC")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+
+        second = self.client.get("/chart/BTC", headers={"If-None-Match": etag})
+        self.assertEqual(second.status_code, 304)
+
+        mock_hist.return_value = ([1] * 30 + [2], [100 + i for i in range(31)])
+        third = self.client.get("/chart/BTC", headers={"If-None-Match": etag})
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(mock_render.call_count, 2)
+
+        # ETag jednej reprezentacji nie pasuje do innej (base64 JSON vs surowy PNG)
+        etag = third.headers["ETag"]
+        raw = self.client.get("/chart/BTC?format=png", headers={"If-None-Match": etag})
+        self.assertEqual(raw.status_code, 200)
+        self.assertNotEqual(raw.headers["ETag"], etag)
+        self.assertEqual(mock_render.call_count, 2)
+
+    @patch("portfolio.Portfolio.get_historical_data", return_value=([], []))
+    def test_chart_without_history_is_not_found(self, mock_hist):
+        response = self.client.get("/chart/SOL")
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("error", response.get_json())
+
+    @patch("portfolio.Portfolio.get_historical_data")
+    @patch("app.render_chart", return_value=b"png")
+    def test_chart_symbol_normalised_and_validated(self, mock_render, mock_hist):
+        mock_hist.return_value = ([1] * 30, [100 + i for i in range(30)])
+
+        response = self.client.get("/chart/nope")
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("NOPE", response.get_json()["error"])
+        mock_hist.assert_not_called()
+
+        response = self.client.get("/chart/btc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["symbol"], "BTC")
+        self.assertEqual(mock_hist.call_args.args[0], "BTC")
+
+    @patch("portfolio.Portfolio.get_historical_data")
+    @patch("app.render_chart", return_value=b"\x89PNG-bytes")
+    def test_chart_raw_image_negotiated(self, mock_render, mock_hist):
+        mock_hist.return_value = ([1] * 30, [100 + i for i in range(30)])
+
+        response = self.client.get("/chart/BTC", headers={"Accept": "image/png"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/png")
+        self.assertEqual(response.data, b"\x89PNG-bytes")
+        self.assertIn("max-age", response.headers["Cache-Control"])
+        self.assertIn("Accept", response.headers["Vary"])
+        self.assertEqual(mock_render.call_args[0][-1], "png")
+
+        response = self.client.get("/chart/BTC?format=svg")
+        self.assertEqual(response.mimetype, "image/svg+xml")
+        self.assertEqual(self.client.get("/chart/BTC?format=gif").status_code, 400)
+
+    @patch("portfolio.Portfolio.get_historical_data")
+    @patch("portfolio.Portfolio.forecast_prices", return_value=([10.0] * 3, np.array([[8.0, 12.0]] * 3)))
+    @patch("app.render_chart")
+    def test_chart_data_mode_skips_rendering(self, mock_render, mock_forecast, mock_hist):
+        mock_hist.return_value = (list(range(10)), [100.0 + i for i in range(10)])
+
+        response = self.client.get("/chart/BTC?format=data&window=3&days=3")
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        mock_render.assert_not_called()
+        self.assertEqual(data["prices"][-1], 109.0)
+        self.assertEqual(data["sma"][:3], [None, None, 101.0])
+        self.assertEqual(data["forecast"]["dates"], [10, 11, 12])
+        self.assertEqual(data["forecast"]["upper"], [12.0] * 3)
+
+    def test_unknown_symbols_rejected(self):
+        headers = {"Authorization": "Bearer test"}
+        response = self.client.post("/api/add", headers=headers, json={"crypto": "BTCC", "amount": 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("BTCC", response.get_json()["error"])
+
+        response = self.client.post("/api/alerts", headers=headers, json={"symbol": "ETHH", "threshold": 1})
+        self.assertEqual(response.status_code, 400)
+        self.mock_db.collection.return_value.add.assert_not_called()
+
+    def test_coins_autocomplete(self):
+        coins = self.client.get("/api/coins?q=b").get_json()["coins"]
+        self.assertEqual([coin["symbol"] for coin in coins], ["BCH", "BTC"])
+
+        coins = self.client.get("/api/coins?q=sol").get_json()["coins"]
+        self.assertEqual(coins, [{"symbol": "SOL", "name": "Solana"}])
+
+    @patch("portfolio.Portfolio.get_historical_data_many")
+    def test_indicators_for_many_symbols(self, mock_history):
+        mock_history.return_value = {
+            "BTC": (list(range(40)), [100.0 + i for i in range(40)]),
+            "ETH": (list(range(10, 40)), [50.0 - i % 3 for i in range(30)]),
+            "SOL": ([], []),
+        }
+
+        response = self.client.get("/api/indicators?symbols=btc,ETH,SOL&window=5")
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["missing"], ["SOL"])
+        self.assertEqual(data["dates"], list(range(10, 40)))
+        btc = data["indicators"]["BTC"]
+        self.assertEqual(len(btc["sma"]), 30)
+        self.assertIsNone(btc["sma"][3])
+        self.assertEqual(btc["sma"][4], 112.0)
+        self.assertEqual(btc["rsi"][-1], 100.0)
+        self.assertEqual(self.client.get("/api/indicators").status_code, 400)
+
+        response = self.client.get("/api/indicators?symbols=BTC,XYZ")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["unknown"], ["XYZ"])
+        self.assertEqual(mock_history.call_count, 1)
+
+    @patch("portfolio.Portfolio.get_historical_data_many")
+    def test_risk_report_reproducible(self, mock_history):
+        mock_asset = MagicMock()
+        mock_asset.id = "BTC"
+        mock_asset.to_dict.return_value = {"amount": 2.0, "price": 100.0}
+        self.mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = [
+            mock_asset]
+        rng = np.random.default_rng(3)
+        mock_history.return_value = {"BTC": (list(range(60)), (100 * np.exp(np.cumsum(rng.normal(0, 0.02, 60)))).tolist())}
+
+        headers = {"Authorization": "Bearer test"}
+        first = self.client.get("/api/risk?paths=5000&seed=11", headers=headers).get_json()
+        second = self.client.get("/api/risk?paths=5000&seed=11", headers=headers).get_json()
+
+        self.assertEqual(first, second)
+        self.assertEqual([h["days"] for h in first["horizons"]], [1, 7, 30])
+        month = first["horizons"][2]
+        self.assertGreater(month["monte_carlo"]["cvar"], month["monte_carlo"]["var"])
+        self.assertGreater(month["monte_carlo"]["var"], first["horizons"][0]["monte_carlo"]["var"])
+        self.assertIsNotNone(month["historical"])
+
+    def test_import_as_mp_main_does_not_start_scheduler(self):
+        with patch.dict(os.environ, {"SCHEDULER_IN_PROCESS": "1"}), \
+                patch("scheduler.start_scheduler") as mock_start:
+            namespace = runpy.run_path(os.path.join(os.path.dirname(__file__), "app.py"), run_name="__mp_main__")
+            mock_start.assert_not_called()
+            namespace["create_app"]()
+            mock_start.assert_called_once_with(blocking=False)
+
 if __name__ == "__main__":
     unittest.main()
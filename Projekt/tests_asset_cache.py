@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import MagicMock
+from asset_cache import AssetSnapshotCache
+
+
+def asset_doc(symbol, amount, price):
+    doc = MagicMock()
+    doc.id = symbol
+    doc.to_dict.return_value = {"amount": amount, "price": price}
+    return doc
+
+
+class TestAssetSnapshotCache(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.assets = self.db.collection.return_value.document.return_value.collection.return_value
+        self.assets.stream.return_value = [asset_doc("BTC", 1, 100)]
+
+    def test_snapshot_loaded_once_and_copied(self):
+        cache = AssetSnapshotCache()
+        snapshot = cache.get(self.db, "u1")
+        snapshot["BTC"]["amount"] = 99
+        self.assertEqual(cache.get(self.db, "u1")["BTC"]["amount"], 1)
+        self.assertEqual(self.assets.stream.call_count, 1)
+
+    def test_write_through_and_invalidate(self):
+        cache = AssetSnapshotCache()
+        cache.put("u1", "ETH", {"amount": 2, "price": 10})
+        cache.get(self.db, "u1")
+        cache.put("u1", "ETH", {"amount": 2, "price": 10})
+        cache.remove("u1", "BTC")
+        self.assertEqual(cache.get(self.db, "u1"), {"ETH": {"amount": 2, "price": 10}})
+        cache.invalidate("u1")
+        self.assertIn("BTC", cache.get(self.db, "u1"))
+        self.assertEqual(self.assets.stream.call_count, 2)
+
+    def test_listener_replaces_snapshot(self):
+        cache = AssetSnapshotCache(listen=True)
+        cache.get(self.db, "u1")
+        callback = self.assets.on_snapshot.call_args.args[0]
+        callback([asset_doc("SOL", 5, 20)], [], None)
+        self.assertEqual(cache.get(self.db, "u1"), {"SOL": {"amount": 5, "price": 20}})
+        self.assertEqual(cache.stats()["listeners"], 1)
+
+    def test_evicted_snapshot_stops_listener_and_frees_slot(self):
+        cache = AssetSnapshotCache(maxsize=1, listen=True, max_listeners=1)
+        cache.get(self.db, "u1")
+        watch = self.assets.on_snapshot.return_value
+        callback = self.assets.on_snapshot.call_args.args[0]
+        callback([asset_doc("SOL", 5, 20)], [], None)
+        cache.get(self.db, "u2")
+        watch.unsubscribe.assert_called_once()
+        self.assertEqual(cache.stats()["listeners"], 0)
+        callback([asset_doc("SOL", 6, 20)], [], None)
+        self.assertIsNone(cache._cache.peek("u1"))
+        cache.get(self.db, "u3")
+        self.assertEqual(self.assets.on_snapshot.call_count, 2)
+        self.assertEqual(cache.stats()["listeners"], 1)
+
+    def test_watched_snapshot_does_not_expire(self):
+        cache = AssetSnapshotCache(ttl=0, listen=True)
+        cache.get(self.db, "u1")
+        callback = self.assets.on_snapshot.call_args.args[0]
+        callback([asset_doc("BTC", 1, 100)], [], None)
+        cache.get(self.db, "u1")
+        self.assertEqual(self.assets.stream.call_count, 1)
+
+    def test_write_during_load_is_not_lost(self):
+        cache = AssetSnapshotCache()
+
+        def stream():
+            cache.put("u1", "ETH", {"amount": 2, "price": 10})
+            return [asset_doc("BTC", 1, 100)]
+
+        self.assets.stream.side_effect = stream
+        cache.get(self.db, "u1")
+        self.assets.stream.side_effect = None
+        self.assets.stream.return_value = [asset_doc("BTC", 1, 100), asset_doc("ETH", 2, 10)]
+        self.assertIn("ETH", cache.get(self.db, "u1"))
+
+if __name__ == "__main__":
+    unittest.main()
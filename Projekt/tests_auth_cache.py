@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import MagicMock
+from auth_cache import TokenCache
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_000_000.0
+        self.verify = MagicMock(side_effect=lambda token: {"uid": token.split(":")[0], "exp": self.now + 3600})
+        self.cache = TokenCache(self.verify, max_ttl=300, clock=lambda: self.now)
+
+    def test_repeated_token_verified_once(self):
+        for _ in range(3):
+            self.assertEqual(self.cache.verify("u1:token")["uid"], "u1")
+        self.assertEqual(self.verify.call_count, 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["verifications"], 1)
+
+    def test_expired_token_is_reverified(self):
+        self.verify.side_effect = lambda token: {"uid": "u1", "exp": self.now + 10}
+        self.cache.verify("u1:token")
+        self.now += 20
+        self.cache.verify("u1:token")
+        self.assertEqual(self.verify.call_count, 2)
+
+    def test_invalid_token_not_cached(self):
+        self.verify.side_effect = ValueError("bad signature")
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.cache.verify("bad")
+        self.assertEqual(self.verify.call_count, 2)
+        self.assertEqual(self.cache.stats()["rejected"], 2)
+
+    def test_revoke_user(self):
+        self.cache.verify("u1:a")
+        self.cache.verify("u1:b")
+        self.cache.verify("u2:a")
+        self.assertEqual(self.cache.revoke_user("u1"), 2)
+        self.cache.verify("u1:a")
+        self.cache.verify("u2:a")
+        self.assertEqual(self.verify.call_count, 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from backtest import backtest, param_grid, sweep, REBALANCE_THRESHOLD
+
+
+# Pętla dzień po dniu jako punkt odniesienia dla wersji wektorowej
+def naive_backtest(prices, weights, threshold, fee):
+    weights = np.asarray(weights) / np.sum(weights)
+    holdings = weights / prices[:, 0]
+    equity, rebalances = [], 0
+    for t in range(prices.shape[1]):
+        value = holdings @ prices[:, t]
+        if t > 0 and np.abs(holdings * prices[:, t] / value - weights).max() > threshold:
+            traded = np.abs(value * weights - holdings * prices[:, t]).sum()
+            value -= fee * traded
+            holdings = value * weights / prices[:, t]
+            rebalances += 1
+        equity.append(value)
+    return np.array(equity), rebalances
+
+
+class TestBacktest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.prices = 100 * np.exp(np.cumsum(rng.normal(0.0, 0.04, size=(3, 250)), axis=1))
+        self.weights = [0.5, 0.3, 0.2]
+
+    def test_threshold_matches_daily_loop(self):
+        result = backtest(self.prices, self.weights, "threshold", threshold=0.03, fee=0.002)
+        equity, rebalances = naive_backtest(self.prices, self.weights, 0.03, 0.002)
+        np.testing.assert_allclose(result["equity"], equity)
+        self.assertEqual(result["rebalances"], rebalances)
+        self.assertGreater(result["fees"], 0)
+
+    def test_periodic_and_buy_and_hold(self):
+        periodic = backtest(self.prices, self.weights, "periodic", period=30, fee=0.0)
+        self.assertEqual(periodic["rebalance_days"], list(range(30, 250, 30)))
+        hold = backtest(self.prices, self.weights, "none")
+        expected = (np.asarray(self.weights) / self.prices[:, 0]) @ self.prices
+        np.testing.assert_allclose(hold["equity"], expected)
+        self.assertEqual((hold["rebalances"], hold["turnover"]), (0, 0.0))
+        self.assertLessEqual(hold["max_drawdown"], 0.0)
+        with self.assertRaises(ValueError):
+            backtest(self.prices, self.weights, "monthly")
+
+    def test_sweep_in_process_pool(self):
+        grid = param_grid(strategy=["threshold"], threshold=[0.01, REBALANCE_THRESHOLD, 0.1])
+        pooled = sweep(self.prices, self.weights, grid, max_workers=2)
+        self.assertEqual(pooled, sweep(self.prices, self.weights, grid, max_workers=0))
+        self.assertEqual([r["threshold"] for r in pooled], [0.01, REBALANCE_THRESHOLD, 0.1])
+        counts = [r["rebalances"] for r in pooled]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
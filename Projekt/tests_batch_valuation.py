@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+import batch_valuation
+from batch_valuation import run_batch_valuation
+
+
+def asset_doc(uid, symbol, amount, price, root="portfolios"):
+    doc = MagicMock()
+    doc.id = symbol
+    doc.reference.parent.parent.id = uid
+    doc.reference.parent.parent.parent.id = root
+    doc.to_dict.return_value = {"amount": amount, "price": price}
+    return doc
+
+
+class TestBatchValuation(unittest.TestCase):
+
+    def setUp(self):
+        self.docs = [
+            asset_doc("alice", "BTC", 1.0, 100.0),
+            asset_doc("alice", "ETH", 2.0, 10.0),
+            asset_doc("bob", "ETH", 3.0, 10.0),
+            asset_doc("bob", "OLD", 4.0, 5.0),
+            asset_doc("other", "BTC", 9.0, 1.0, root="watchlists"),
+            asset_doc("carol", "BTC", 0.5, 100.0),
+        ]
+        self.db = MagicMock()
+        self.query = self.db.collection_group.return_value.order_by.return_value.select.return_value.limit.return_value
+        pages = {None: self.docs[:3], self.docs[2]: self.docs[3:6], self.docs[5]: []}
+        self.query.stream.side_effect = lambda: iter(pages[None])
+        self.query.start_after.side_effect = lambda last: MagicMock(stream=lambda: iter(pages[last]))
+
+    @patch("batch_valuation.Portfolio.get_current_prices")
+    def test_values_all_portfolios_across_pages(self, mock_prices):
+        mock_prices.return_value = {"BTC": 200.0, "ETH": 20.0, "OLD": 0}
+        stats = run_batch_valuation(self.db, page_size=3)
+
+        mock_prices.assert_called_once_with(["BTC", "ETH", "OLD"], batch_valuation.CRYPTOCOMPARE_API_KEY)
+        self.db.collection_group.assert_called_once_with("assets")
+        self.assertEqual((stats["users"], stats["assets"], stats["pages"]), (3, 5, 3))
+        self.assertEqual(stats["unpriced_symbols"], ["OLD"])
+
+        writer = self.db.bulk_writer.return_value
+        collection = self.db.collection.return_value
+        self.db.collection.assert_called_with("portfolio_valuations")
+        self.assertEqual([c.args[0] for c in collection.document.call_args_list], ["alice", "bob", "carol"])
+        written = [c.args[1] for c in writer.set.call_args_list]
+        self.assertEqual([w["total_value"] for w in written], [240.0, 80.0, 100.0])
+        self.assertEqual([w["assets"] for w in written], [2, 2, 1])
+        self.assertEqual([w["stale_assets"] for w in written], [0, 1, 0])
+        writer.close.assert_called_once()
+        self.assertAlmostEqual(stats["total_value"], 420.0)
+
+    @patch("batch_valuation.Portfolio.get_current_prices", return_value={"BTC": 200.0, "ETH": 20.0, "OLD": 0})
+    def test_failed_writes_are_retried_then_reported(self, _):
+        writer = self.db.bulk_writer.return_value
+
+        def close():
+            on_error = writer.on_write_error.call_args.args[0]
+            failure = MagicMock()
+            failure.operation.reference.id = "bob"
+            failure.attempts = 1
+            self.assertTrue(on_error(failure, writer))
+            failure.attempts = batch_valuation.MAX_WRITE_ATTEMPTS
+            self.assertFalse(on_error(failure, writer))
+
+        writer.close.side_effect = close
+        stats = run_batch_valuation(self.db, page_size=10)
+        self.assertEqual(stats["failed_writes"], ["bob"])
+
+    @patch("batch_valuation.Portfolio.get_current_prices", return_value={"BTC": 200.0, "ETH": 20.0, "OLD": 0})
+    def test_dry_run_does_not_write(self, _):
+        stats = run_batch_valuation(self.db, page_size=10, dry_run=True)
+        self.assertEqual(stats["pages"], 1)
+        self.db.bulk_writer.assert_not_called()
+
+    def test_group_by_matches_per_user_sum(self):
+        rng = np.random.default_rng(3)
+        columns = batch_valuation.AssetColumns()
+        expected = {}
+        for u in range(200):
+            for s in rng.choice(50, size=rng.integers(1, 6), replace=False):
+                amount = float(rng.random())
+                columns.add(f"u{u}", f"S{s}", amount, 1.0)
+                expected[f"u{u}"] = expected.get(f"u{u}", 0.0) + amount * (int(s) + 1)
+        prices = {f"S{s}": float(s + 1) for s in range(50)}
+        totals, counts, _ = batch_valuation.value_portfolios(columns, prices)
+        np.testing.assert_allclose(totals, [expected[uid] for uid in columns.uids])
+        self.assertEqual(int(counts.sum()), len(columns))
+
+
+if __name__ == "__main__":
+    unittest.main()
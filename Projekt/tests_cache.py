@@ -0,0 +1,134 @@
+import threading
+import time
+import unittest
+from cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_get_or_load_hit_and_miss(self):
+        calls = []
+        loader = lambda: calls.append(1) or 42
+        self.assertEqual(self.cache.get_or_load("BTC", loader), 42)
+        self.assertEqual(self.cache.get_or_load("BTC", loader), 42)
+        self.assertEqual(len(calls), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_entry_expires_after_ttl(self):
+        self.cache.set("BTC", 1)
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get("BTC"))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_lru_eviction(self):
+        self.cache.set("BTC", 1)
+        self.cache.set("ETH", 2)
+        self.cache.get("BTC")
+        self.cache.set("SOL", 3)
+        self.assertIn("BTC", self.cache)
+        self.assertNotIn("ETH", self.cache)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_evict_hook_called_for_lru_and_expiry(self):
+        evicted = []
+        cache = TTLCache(maxsize=1, ttl=10, clock=self.clock, on_evict=lambda key, value: evicted.append(key))
+        cache.set("BTC", 1)
+        cache.set("ETH", 2)
+        self.clock.now = 10
+        self.assertIsNone(cache.get("ETH"))
+        cache.set("SOL", 3)
+        cache.delete("SOL")
+        self.assertEqual(evicted, ["BTC", "ETH"])
+
+    def test_write_during_load_discards_loaded_value(self):
+        def loader():
+            self.cache.delete("BTC")
+            return "old"
+        self.assertEqual(self.cache.get_or_load("BTC", loader), "old")
+        self.assertNotIn("BTC", self.cache)
+
+    def test_loader_error_is_not_cached(self):
+        def failing():
+            raise ValueError("upstream")
+        with self.assertRaises(ValueError):
+            self.cache.get_or_load("BTC", failing)
+        self.assertEqual(self.cache.get_or_load("BTC", lambda: 5), 5)
+
+    def test_concurrent_misses_are_coalesced(self):
+        cache = TTLCache(maxsize=10, ttl=10)
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        # Ładowanie kończy się dopiero, gdy wszyscy pozostali czekają już na jego wynik
+        def slow_loader():
+            calls.append(1)
+            started.set()
+            self.assertTrue(release.wait(5))
+            return 100
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("BTC", slow_loader)))
+                   for _ in range(8)]
+        threads[0].start()
+        self.assertTrue(started.wait(5))
+        for t in threads[1:]:
+            t.start()
+        deadline = time.monotonic() + 5
+        while cache.stats()["coalesced"] < 7 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [100] * 8)
+        self.assertEqual(cache.stats()["coalesced"], 7)
+
+    def test_load_many_joins_inflight_loads(self):
+        cache = TTLCache(maxsize=10, ttl=10)
+        cache.set("BTC", 1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_loader():
+            started.set()
+            self.assertTrue(release.wait(5))
+            return 2
+
+        single = threading.Thread(target=lambda: cache.get_or_load("ETH", slow_loader))
+        single.start()
+        self.assertTrue(started.wait(5))
+
+        requested = []
+
+        def batch_loader(keys):
+            requested.extend(keys)
+            release.set()
+            return {"SOL": 3}
+
+        results = cache.get_or_load_many(["BTC", "ETH", "SOL", "XYZ", "SOL"], batch_loader)
+        single.join()
+
+        self.assertEqual(requested, ["SOL", "XYZ"])
+        self.assertEqual(results, {"BTC": 1, "ETH": 2, "SOL": 3})
+        self.assertEqual(cache.stats()["coalesced"], 1)
+        self.assertNotIn("XYZ", cache)
+        self.assertEqual(cache.get_or_load_many(["ETH", "SOL"], batch_loader), {"ETH": 2, "SOL": 3})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from catalogue import CoinCatalogue
+
+COINS = [("BTC", "Bitcoin"), ("BCH", "Bitcoin Cash"), ("ETH", "Ethereum"), ("WBTC", "Wrapped Bitcoin")]
+
+
+class FakeCoinList:
+    def __init__(self, coins=COINS):
+        self.coins = coins
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if isinstance(self.coins, Exception):
+            raise self.coins
+        return list(self.coins)
+
+
+class TestCoinCatalogue(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "coins.json.gz")
+        self.now = 1000.0
+
+    def catalogue(self, fetch, max_age=100):
+        return CoinCatalogue(self.path, fetch, max_age=max_age, clock=lambda: self.now)
+
+    def test_loaded_once_and_persisted_on_disk(self):
+        fetch = FakeCoinList()
+        catalogue = self.catalogue(fetch)
+        self.assertIn("btc", catalogue)
+        self.assertNotIn("BTCC", catalogue)
+        self.assertEqual(catalogue.symbols(), ["BCH", "BTC", "ETH", "WBTC"])
+        self.assertEqual(fetch.calls, 1)
+
+        reloaded_fetch = FakeCoinList()
+        reloaded = self.catalogue(reloaded_fetch)
+        self.assertTrue(reloaded.is_valid("ETH"))
+        self.assertEqual(reloaded_fetch.calls, 0)
+
+    def test_stale_catalogue_refreshed_in_background(self):
+        self.catalogue(FakeCoinList()).symbols()
+        self.now += 200
+        release = threading.Event()
+        fetch = FakeCoinList(COINS + [("SOL", "Solana")])
+        catalogue = self.catalogue(lambda: release.wait(5) and fetch())
+
+        self.assertNotIn("SOL", catalogue)
+        self.assertIn("BTC", catalogue)
+        release.set()
+        for _ in range(500):
+            if catalogue.stats()["refreshes"]:
+                break
+            time.sleep(0.01)
+        self.assertIn("SOL", catalogue)
+        self.assertEqual(fetch.calls, 1)
+
+    def test_fails_open_without_data(self):
+        catalogue = self.catalogue(FakeCoinList(OSError("offline")))
+        self.assertTrue(catalogue.is_valid("ANYTHING"))
+        self.assertNotIn("BTC", catalogue)
+        self.assertEqual(catalogue.search("b"), [])
+        self.assertEqual(catalogue.stats()["refresh_errors"], 1)
+
+    def test_prefix_search_on_symbols_and_names(self):
+        catalogue = self.catalogue(FakeCoinList())
+        self.assertEqual([c["symbol"] for c in catalogue.search("b")], ["BCH", "BTC"])
+        self.assertEqual([c["symbol"] for c in catalogue.search("bitcoin")], ["BTC", "BCH"])
+        self.assertEqual([c["symbol"] for c in catalogue.search("w", limit=1)], ["WBTC"])
+        self.assertEqual(catalogue.search("  "), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from history_store import HistoryStore, DAY
+
+TODAY = 1_700_000_000 // DAY * DAY
+
+
+class FakeApi:
+    def __init__(self):
+        self.now = TODAY + 3600
+        self.calls = []
+        self.fail = False
+
+    def clock(self):
+        return self.now
+
+    def fetch(self, limit):
+        self.calls.append(limit)
+        if self.fail:
+            raise ConnectionError("offline")
+        today = int(self.now) // DAY * DAY
+        return [{"time": today - i * DAY, "close": float(today - i * DAY) / DAY}
+                for i in range(limit, -1, -1)]
+
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeApi()
+        self.store = HistoryStore(":memory:", refresh_interval=300, clock=self.api.clock)
+
+    def test_first_load_fetches_full_window(self):
+        candles = self.store.get_candles("BTC", 30, self.api.fetch)
+        self.assertEqual(self.api.calls, [30])
+        self.assertEqual(len(candles), 31)
+        self.assertEqual(candles[-1]["time"], TODAY)
+
+    def test_repeat_load_is_served_locally(self):
+        self.store.get_candles("BTC", 30, self.api.fetch)
+        candles = self.store.get_candles("BTC", 10, self.api.fetch)
+        self.assertEqual(self.api.calls, [30])
+        self.assertEqual(len(candles), 11)
+        self.assertEqual(self.store.stats()["local_reads"], 1)
+
+    def test_only_new_candles_are_fetched(self):
+        self.store.get_candles("BTC", 30, self.api.fetch)
+        self.api.now += 2 * DAY
+        candles = self.store.get_candles("BTC", 30, self.api.fetch)
+        self.assertEqual(self.api.calls, [30, 2])
+        self.assertEqual(len(candles), 31)
+        self.assertEqual(candles[-1]["time"], TODAY + 2 * DAY)
+
+    def test_current_candle_is_refreshed_after_interval(self):
+        self.store.get_candles("BTC", 30, self.api.fetch)
+        self.api.now += 600
+        self.store.get_candles("BTC", 30, self.api.fetch)
+        self.assertEqual(self.api.calls, [30, 1])
+
+    def test_longer_window_triggers_full_fetch(self):
+        self.store.get_candles("BTC", 30, self.api.fetch)
+        candles = self.store.get_candles("BTC", 100, self.api.fetch)
+        self.assertEqual(self.api.calls, [30, 100])
+        self.assertEqual(len(candles), 101)
+
+    def test_stale_data_served_when_offline(self):
+        self.store.get_candles("BTC", 30, self.api.fetch)
+        self.api.now += DAY
+        self.api.fail = True
+        candles = self.store.get_candles("BTC", 30, self.api.fetch)
+        self.assertEqual(len(candles), 30)
+        with self.assertRaises(ConnectionError):
+            self.store.get_candles("ETH", 30, self.api.fetch)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+import indicators
+from indicators import IndicatorState
+
+
+class TestIndicators(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, size=(3, 60)), axis=1))
+
+    def test_sma_and_ema_match_reference(self):
+        prices = self.prices[0]
+        sma = indicators.sma(prices, 5)
+        self.assertTrue(np.all(np.isnan(sma[:4])))
+        np.testing.assert_allclose(sma[4:], np.convolve(prices, np.ones(5), "valid") / 5)
+
+        ema = indicators.ema(prices, span=5)
+        expected = [prices[0]]
+        for price in prices[1:]:
+            expected.append(expected[-1] + (price - expected[-1]) / 3)
+        np.testing.assert_allclose(ema, expected)
+
+    def test_matrix_rows_match_single_series(self):
+        batch = indicators.compute(self.prices, window=10, rsi_period=14)
+        for row, prices in enumerate(self.prices):
+            single = indicators.compute(prices, window=10, rsi_period=14)
+            for name in indicators.INDICATORS:
+                np.testing.assert_allclose(batch[name][row], single[name], equal_nan=True)
+
+    def test_rsi_and_drawdown_edge_cases(self):
+        rising = np.arange(1.0, 31.0)
+        self.assertTrue(np.all(indicators.rsi(rising, 14)[14:] == 100))
+        self.assertTrue(np.isnan(indicators.rsi(rising, 14)[13]))
+        np.testing.assert_allclose(indicators.drawdown([100, 120, 90, 130]), [0, 0, -0.25, 0])
+
+    def test_incremental_state_matches_batch(self):
+        prices = self.prices[1]
+        batch = indicators.compute(prices, window=10, rsi_period=14, vol_window=7)
+        state = IndicatorState.from_history(prices[:40], window=10, rsi_period=14, vol_window=7)
+        for t in range(40, len(prices)):
+            latest = state.update(prices[t])
+            for name in indicators.INDICATORS:
+                self.assertAlmostEqual(latest[name], batch[name][t], places=8, msg=name)
+
+    def test_short_series_and_json_conversion(self):
+        self.assertTrue(np.all(np.isnan(indicators.sma([1.0, 2.0], 5))))
+        self.assertEqual(indicators.to_list([1.0, np.nan]), [1.0, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
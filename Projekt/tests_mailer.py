@@ -0,0 +1,168 @@
+import socketserver
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from mailer import Mailer, get_mailer
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(" ")[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250-stub")
+                self.reply("250 AUTH PLAIN")
+            elif command == "AUTH":
+                server.logins += 1
+                self.reply("235 2.7.0 Authentication successful")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline().decode()
+                    if data.rstrip("\r\n") == ".":
+                        break
+                    lines.append(data)
+                reply = server.data_replies.pop(0) if server.data_replies else "250 OK"
+                if reply.startswith("250"):
+                    server.messages.append("".join(lines))
+                self.reply(reply)
+                if server.drop_after and len(server.messages) == server.drop_after:
+                    return
+            elif command == "RCPT":
+                server.recipients += 1
+                self.reply(server.rcpt_reply)
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class TestMailer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StubSMTPHandler)
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.logins = 0
+        self.server.messages = []
+        self.server.drop_after = 0
+        self.server.data_replies = []
+        self.server.rcpt_reply = "250 OK"
+        self.server.recipients = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def mailer(self, **kwargs):
+        options = dict(host="127.0.0.1", port=self.server.server_address[1], username="bot@example.com",
+                       password="secret", security="none", backoff=0, digest_window=0.05)
+        options.update(kwargs)
+        mailer = Mailer(**options)
+        self.addCleanup(mailer.stop, 5)
+        return mailer
+
+    def wait_for(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.server.messages) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_connection_reused_for_many_messages(self):
+        mailer = self.mailer()
+        for i in range(10):
+            self.assertTrue(mailer.send_now(f"user{i}@example.com", "Alert", f"body {i}"))
+        self.assertEqual(len(self.server.messages), 10)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.logins, 1)
+
+    def test_queue_sends_digest_per_recipient(self):
+        mailer = self.mailer()
+        for i in range(5):
+            mailer.enqueue("a@example.com", "Alert", f"BTC > {i}")
+        mailer.enqueue("b@example.com", "Alert", "ETH > 1")
+        self.wait_for(2)
+        time.sleep(0.1)
+        self.assertEqual(len(self.server.messages), 2)
+        digest = next(m for m in self.server.messages if "To: a@example.com" in m)
+        self.assertIn("BTC > 4", digest)
+        self.assertIn("Subject: Alert (5)", digest)
+        self.assertEqual(mailer.stats()["digests"], 1)
+
+    def test_reconnects_after_disconnect(self):
+        self.server.drop_after = 1
+        mailer = self.mailer()
+        self.assertTrue(mailer.send_now("a@example.com", "Alert", "first"))
+        self.assertTrue(mailer.send_now("a@example.com", "Alert", "second"))
+        self.assertEqual(len(self.server.messages), 2)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(mailer.stats()["retries"], 1)
+
+    def test_temporary_rejection_is_retried(self):
+        self.server.data_replies = ["451 4.3.0 Try again later"]
+        mailer = self.mailer()
+        self.assertTrue(mailer.send_now("a@example.com", "Alert", "body"))
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(mailer.stats()["retries"], 1)
+
+    def test_permanent_rejection_is_not_retried(self):
+        self.server.data_replies = ["554 5.7.1 Message rejected"]
+        mailer = self.mailer()
+        self.assertFalse(mailer.send_now("a@example.com", "Alert", "spam"))
+        self.assertEqual((mailer.stats()["retries"], mailer.stats()["failed"]), (0, 1))
+
+        self.server.rcpt_reply = "550 5.1.1 No such user"
+        self.assertFalse(mailer.send_now("nobody@example.com", "Alert", "body"))
+        self.assertEqual(self.server.recipients, 2)
+        self.assertEqual(mailer.stats()["retries"], 0)
+
+        self.server.rcpt_reply = "250 OK"
+        self.assertTrue(mailer.send_now("a@example.com", "Alert", "body"))
+        self.assertEqual(self.server.connections, 1)
+
+    def test_full_queue_drops_message(self):
+        mailer = self.mailer(queue_size=1)
+        with patch.object(mailer, "start", return_value=mailer):
+            self.assertTrue(mailer.enqueue("a@example.com", "Alert", "1"))
+            self.assertFalse(mailer.enqueue("a@example.com", "Alert", "2"))
+        self.assertEqual(mailer.stats()["dropped"], 1)
+
+    def test_stop_flushes_queue_and_reports_results(self):
+        mailer = self.mailer(digest_window=0)
+        results = []
+        for i in range(3):
+            mailer.enqueue(f"user{i}@example.com", "Alert", f"body {i}", results.append)
+        mailer.stop(5)
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(results, [True, True, True])
+
+    def test_stop_without_flush_discards_pending(self):
+        mailer = self.mailer()
+        results = []
+        with patch.object(mailer, "start", return_value=mailer):
+            mailer.enqueue("a@example.com", "Alert", "1", results.append)
+        mailer._thread = MagicMock()
+        mailer.stop(flush=False)
+        self.assertEqual(results, [False])
+        self.assertEqual(mailer.stats()["dropped"], 1)
+
+    def test_get_mailer_keyed_by_configuration(self):
+        with patch("mailer._mailers", {}):
+            alerts = get_mailer(sender_name="Alerty")
+            self.assertIs(get_mailer(sender_name="Alerty"), alerts)
+            self.assertIsNot(get_mailer(), alerts)
+            self.assertEqual(alerts.sender_name, "Alerty")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from market_data import MarketDataClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self._reply(503, {"Response": "Error"})
+            return
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self._reply(200, {"USD": 100.0})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# Klient zrywający połączenie po timeoucie to oczekiwany przypadek, nie błąd do wypisania
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass
+
+
+class TestMarketDataClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.server.connections = 0
+        self.server.requests = 0
+        self.server.failures = 0
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def test_connection_is_reused(self):
+        client = MarketDataClient(base_url=self.base_url)
+        self.addCleanup(client.close)
+        for _ in range(10):
+            self.assertEqual(client.get("/data/price", {"fsym": "BTC"}), {"USD": 100.0})
+        self.assertEqual(self.server.requests, 10)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_retries_on_server_error(self):
+        self.server.failures = 2
+        client = MarketDataClient(base_url=self.base_url, retries=3, backoff_factor=0)
+        self.addCleanup(client.close)
+        self.assertEqual(client.get("/data/price"), {"USD": 100.0})
+        self.assertEqual(self.server.requests, 3)
+
+    def test_gives_up_after_retries(self):
+        self.server.failures = 5
+        client = MarketDataClient(base_url=self.base_url, retries=1, backoff_factor=0)
+        self.addCleanup(client.close)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.get("/data/price")
+        self.assertEqual(self.server.requests, 2)
+
+    def test_read_timeout(self):
+        self.server.delay = 0.5
+        client = MarketDataClient(base_url=self.base_url, read_timeout=0.1, retries=0)
+        self.addCleanup(client.close)
+        with self.assertRaises(requests.exceptions.RequestException):
+            client.get("/data/price")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from scipy.optimize import check_grad
+from optimizer import (optimize, efficient_frontier, optimize_prices, returns_statistics,
+                       OptimizationError, _neg_sharpe, _variance)
+
+
+class TestOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        self.mean = np.array([0.01, 0.02, 0.015])
+        self.cov = np.diag([0.01, 0.04, 0.02])
+
+    def test_gradients(self):
+        w = np.array([0.2, 0.5, 0.3])
+        self.assertLess(check_grad(lambda x: _variance(x, self.cov)[0], lambda x: _variance(x, self.cov)[1], w), 1e-6)
+        sharpe = lambda x: _neg_sharpe(x, self.mean, self.cov, 0.0)
+        self.assertLess(check_grad(lambda x: sharpe(x)[0], lambda x: sharpe(x)[1], w), 1e-6)
+
+    def test_min_variance_uncorrelated(self):
+        weights = optimize(self.mean, self.cov, "min_variance")
+        expected = (1 / np.diag(self.cov)) / np.sum(1 / np.diag(self.cov))
+        np.testing.assert_allclose(weights, expected, atol=1e-4)
+
+    def test_max_sharpe_uncorrelated(self):
+        weights = optimize(self.mean, self.cov, "max_sharpe")
+        expected = (self.mean / np.diag(self.cov)) / np.sum(self.mean / np.diag(self.cov))
+        np.testing.assert_allclose(weights, expected, atol=1e-4)
+
+    def test_target_return(self):
+        weights = optimize(self.mean, self.cov, "target_return", target_return=0.018)
+        self.assertAlmostEqual(weights @ self.mean, 0.018, places=6)
+        with self.assertRaises(OptimizationError):
+            optimize(self.mean, self.cov, "target_return", target_return=0.5)
+
+    def test_efficient_frontier(self):
+        frontier = efficient_frontier(self.mean, self.cov, points=50)
+        self.assertEqual(len(frontier), 50)
+        returns = [p["expected_return"] for p in frontier]
+        volatility = [p["volatility"] for p in frontier]
+        self.assertTrue(np.all(np.diff(returns) > 0))
+        self.assertTrue(np.all(np.diff(volatility) >= -1e-9))
+        self.assertAlmostEqual(returns[-1], 0.02, places=6)
+
+    def test_optimize_prices(self):
+        rng = np.random.default_rng(0)
+        prices = 100 * np.cumprod(1 + rng.normal(0.001, 0.02, size=(3, 101)), axis=1)
+        result = optimize_prices(prices, "min_variance", frontier_points=10)
+        self.assertAlmostEqual(sum(result["weights"]), 1)
+        self.assertEqual(len(result["frontier"]), 10)
+        _, _, cov = returns_statistics(prices)
+        self.assertEqual(cov.shape, (3, 3))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from portfolio import Portfolio
+from portfolio import Portfolio, price_cache
 import numpy as np
+import time
 
 class TestPortfolio(unittest.TestCase):
 
@@ -25,16 +26,94 @@ class TestPortfolio(unittest.TestCase):
         self.portfolio.remove_asset("ETH")
         self.assertFalse(any(asset["crypto_name"] == "ETH" for asset in self.portfolio.assets))
 
-    @patch("portfolio.Portfolio.get_current_price", return_value=60000)
-    def test_update_prices(self, mock_price):
+    def test_total_value_maintained(self):
+        self.assertAlmostEqual(self.portfolio.total_value, 56000)
+        self.portfolio.add_asset("BTC", 1, 60000)
+        self.portfolio.remove_asset("ETH", 1)
+        self.assertAlmostEqual(self.portfolio.total_value, 113000)
+        self.portfolio.calculate_total_value()
+        self.assertAlmostEqual(self.portfolio.total_value, 113000)
+
+    def test_remove_asset_keeps_index_consistent(self):
+        self.portfolio.add_asset("SOL", 10, 100)
+        self.portfolio.remove_asset("BTC")
+        self.portfolio.add_asset("SOL", 10, 200)
+        sol = next(asset for asset in self.portfolio.assets if asset["crypto_name"] == "SOL")
+        self.assertEqual(sol["amount"], 20)
+        self.assertAlmostEqual(sol["price"], 150)
+        self.assertEqual(len(self.portfolio), 2)
+
+    def test_remove_asset_keeps_insertion_order(self):
+        self.portfolio.add_asset("SOL", 10, 100)
+        self.portfolio.add_asset("XRP", 5, 1)
+        self.portfolio.remove_asset("ETH")
+        self.assertEqual([asset["crypto_name"] for asset in self.portfolio.assets], ["BTC", "SOL", "XRP"])
+        self.portfolio.add_asset("XRP", 5, 3)
+        xrp = self.portfolio.assets[-1]
+        self.assertEqual((xrp["amount"], xrp["price"]), (10, 2))
+
+    def test_zero_amount_does_not_divide_by_zero(self):
+        empty = Portfolio()
+        empty.add_asset("BTC", 0, 50000)
+        self.assertEqual(empty.assets[0]["price"], 50000)
+        self.assertEqual(empty.total_value, 0)
+        suggestions = empty.generate_markowitz_suggestions([1.0])
+        self.assertIn("Zwiększ udział BTC", suggestions[0])
+        self.assertIn("z obecnych 0.00%", suggestions[0])
+
+    def test_add_assets_bulk(self):
+        self.portfolio.add_assets([("BTC", 1, 60000), ("SOL", 5, 100), ("SOL", 5, 200)] +
+                                  [(f"C{i}", 1, 1) for i in range(100)])
+        assets = {asset["crypto_name"]: asset for asset in self.portfolio.assets}
+        self.assertEqual(len(assets), 103)
+        self.assertAlmostEqual(assets["BTC"]["price"], 55000)
+        self.assertAlmostEqual(assets["SOL"]["amount"], 10)
+        self.assertAlmostEqual(assets["SOL"]["price"], 150)
+        self.assertAlmostEqual(self.portfolio.total_value, 56000 + 60000 + 1500 + 100)
+
+    def test_remove_assets_bulk(self):
+        self.portfolio.add_asset("SOL", 10, 100)
+        self.portfolio.remove_assets([("BTC", None), ("SOL", 4), ("SOL", 1), ("XYZ", 1)])
+        assets = {asset["crypto_name"]: asset for asset in self.portfolio.assets}
+        self.assertNotIn("BTC", assets)
+        self.assertAlmostEqual(assets["SOL"]["amount"], 5)
+        self.assertAlmostEqual(self.portfolio.total_value, 6000 + 500)
+
+    @patch("portfolio.Portfolio.get_current_prices", return_value={"BTC": 60000, "ETH": 60000})
+    def test_update_prices(self, mock_prices):
         self.portfolio.update_prices()
+        mock_prices.assert_called_once()
         for asset in self.portfolio.assets:
             self.assertEqual(asset["price"], 60000)
 
-    def test_predict_portfolio_value(self):
-        predicted = self.portfolio.predict_portfolio_value(3)
-        self.assertEqual(len(predicted), 3)
-        self.assertGreater(predicted[1], predicted[0])
+    @patch("portfolio.market_data.get")
+    def test_get_current_prices_batched(self, mock_get):
+        price_cache.clear()
+        price_cache.set("BTC", 50000)
+        mock_get.return_value = {"ETH": {"USD": 3000}, "SOL": {"USD": 150}}
+
+        prices = Portfolio.get_current_prices(["BTC", "ETH", "SOL", "XYZ"], "key")
+
+        self.assertEqual(prices, {"BTC": 50000, "ETH": 3000, "SOL": 150, "XYZ": 0})
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.args[1]["fsyms"], "ETH,SOL,XYZ")
+        price_cache.clear()
+
+    def test_chunk_symbols_respects_limit(self):
+        symbols = [f"S{i:03d}" for i in range(150)]
+        chunks = list(Portfolio._chunk_symbols(symbols, 300))
+        self.assertEqual(sum(len(c) for c in chunks), 150)
+        self.assertTrue(all(len(",".join(c)) <= 300 for c in chunks))
+        self.assertEqual(len(chunks), 3)
+
+    @patch("portfolio.market_data.get")
+    def test_get_current_price_cached(self, mock_get):
+        price_cache.clear()
+        mock_get.return_value = {"USD": 123.0}
+        self.assertEqual(Portfolio.get_current_price("BTC", "key"), 123.0)
+        self.assertEqual(Portfolio.get_current_price("BTC", "key"), 123.0)
+        self.assertEqual(mock_get.call_count, 1)
+        price_cache.clear()
 
     @patch("portfolio.Portfolio.get_historical_data")
     def test_optimize_portfolio(self, mock_hist):
@@ -46,6 +125,33 @@ class TestPortfolio(unittest.TestCase):
         self.assertIsInstance(result, list)
         self.assertTrue(any("Zwiększ" in r or "Zmniejsz" in r for r in result) or "zoptymalizowany" in result[0])
 
+    @patch("portfolio.Portfolio.get_historical_data")
+    def test_get_historical_data_many_concurrent(self, mock_hist):
+        def slow_history(symbol, api_key, limit=30):
+            time.sleep(0.2)
+            return [1, 2], [symbol, symbol]
+        mock_hist.side_effect = slow_history
+
+        start = time.perf_counter()
+        histories = Portfolio.get_historical_data_many(["BTC", "ETH", "SOL", "ADA", "BTC"], "key", limit=100)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(set(histories), {"BTC", "ETH", "SOL", "ADA"})
+        self.assertEqual(histories["SOL"][1], ["SOL", "SOL"])
+        self.assertLess(elapsed, 0.6)
+
+    def test_align_prices(self):
+        aligned = Portfolio.align_prices([[1, 2, 3, 4], [5, 6]])
+        self.assertEqual(aligned.shape, (2, 2))
+        self.assertEqual(aligned[0].tolist(), [3, 4])
+
+    @patch("portfolio.Portfolio.get_historical_data")
+    def test_optimize_portfolio_ragged_history(self, mock_hist):
+        mock_hist.side_effect = lambda symbol, api_key, limit=30: (
+            [1] * 101, np.linspace(100, 200, 101 if symbol == "BTC" else 40).tolist())
+        result = self.portfolio.optimize_portfolio()
+        self.assertFalse(any("Błąd" in r for r in result))
+
     def test_calculate_moving_average(self):
         prices = list(range(10))
         ma = self.portfolio.calculate_moving_average(prices, window=3)
@@ -53,7 +159,18 @@ class TestPortfolio(unittest.TestCase):
         self.assertAlmostEqual(ma[2], 1.0)
         self.assertTrue(np.isnan(ma[0]))
 
-    @patch("portfolio.SARIMAX")
+    def test_forecast_prices_holt(self):
+        prices = [100 + 2 * i for i in range(30)]
+        pred, conf = self.portfolio.forecast_prices(prices, days=7, symbol="TEST")
+        self.assertEqual(len(pred), 7)
+        self.assertEqual(conf.shape, (7, 2))
+        self.assertAlmostEqual(pred[0], 160, delta=1)
+        self.assertTrue(np.all(conf[:, 0] <= pred) and np.all(pred <= conf[:, 1]))
+
+    def test_forecast_prices_unknown_model(self):
+        self.assertEqual(self.portfolio.forecast_prices([1, 2, 3, 4], model="nope"), (None, None))
+
+    @patch("statsmodels.tsa.statespace.sarimax.SARIMAX")
     def test_forecast_prices(self, mock_model):
         instance = MagicMock()
         forecast = MagicMock()
@@ -62,12 +179,12 @@ class TestPortfolio(unittest.TestCase):
         instance.fit.return_value.get_forecast.return_value = forecast
         mock_model.return_value = instance
 
-        pred, conf = self.portfolio.forecast_prices([1, 2, 3, 4, 5])
+        pred, conf = self.portfolio.forecast_prices([1, 2, 3, 4, 5], model="sarimax")
         self.assertEqual(list(pred), [1, 2, 3])
 
-    @patch("portfolio.smtplib.SMTP")
-    def test_send_email_alert(self, mock_smtp):
-        mock_smtp.return_value.__enter__.return_value.sendmail.return_value = True
+    @patch("mailer.smtplib.SMTP")
+    @patch("mailer.smtplib.SMTP_SSL")
+    def test_send_email_alert(self, mock_smtp_ssl, mock_smtp):
         result = self.portfolio.send_email_alert("Test", "Body")
         self.assertTrue(result)
 
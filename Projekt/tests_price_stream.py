@@ -0,0 +1,55 @@
+import unittest
+from price_stream import PricePoller
+
+
+class TestPricePoller(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.prices = {"BTC": 30000.0, "ETH": 2000.0, "SOL": 100.0}
+
+        def fetch(symbols):
+            self.calls.append(symbols)
+            return {symbol: self.prices[symbol] for symbol in symbols}
+
+        self.poller = PricePoller(fetch, interval=3600)
+
+    def tearDown(self):
+        self.poller._subscriptions.clear()
+        self.poller._wakeup.set()
+
+    def test_one_fetch_fans_out_to_all_subscribers(self):
+        first = self.poller.subscribe(["BTC", "ETH"])
+        second = self.poller.subscribe(["ETH", "SOL"])
+
+        self.poller.poll_once()
+
+        self.assertEqual(self.calls, [["BTC", "ETH", "SOL"]])
+        self.assertEqual(first.wait(0), {"BTC": 30000.0, "ETH": 2000.0})
+        self.assertEqual(second.wait(0), {"ETH": 2000.0, "SOL": 100.0})
+        self.assertEqual(self.poller.stats()["subscribers"], 2)
+
+    def test_only_changed_prices_are_pushed_and_coalesced(self):
+        subscription = self.poller.subscribe(["BTC", "ETH"])
+        self.poller.poll_once()
+        subscription.wait(0)
+
+        self.poller.poll_once()
+        self.assertEqual(subscription.wait(0), {})
+
+        self.prices["BTC"] = 31000.0
+        self.poller.poll_once()
+        self.prices["BTC"] = 32000.0
+        self.poller.poll_once()
+        self.assertEqual(subscription.wait(0), {"BTC": 32000.0})
+
+    def test_unsubscribed_symbols_are_not_polled(self):
+        subscription = self.poller.subscribe(["BTC"])
+        self.poller.unsubscribe(subscription)
+
+        self.assertEqual(self.poller.poll_once(), {})
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from risk import risk_report, simulate_values
+
+
+class TestRisk(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.prices = 100 * np.exp(np.cumsum(rng.normal(0.0, 0.02, size=(3, 200)), axis=1))
+        self.amounts = [1.0, 2.0, 3.0]
+
+    def test_seeded_simulation_independent_of_chunk_size(self):
+        log_returns = np.diff(np.log(self.prices), axis=1)
+        positions = self.prices[:, -1]
+        first = simulate_values(log_returns, positions, paths=2000, chunk=2000, seed=1)
+        second = simulate_values(log_returns, positions, paths=2000, chunk=333, seed=1)
+        for h in first:
+            np.testing.assert_allclose(first[h], second[h])
+
+    def test_monte_carlo_agrees_with_parametric_var(self):
+        report = risk_report(self.prices, self.amounts, paths=50000, seed=2)
+        self.assertAlmostEqual(report["value"], float(np.dot(self.amounts, self.prices[:, -1])))
+        for horizon in report["horizons"]:
+            mc, parametric = horizon["monte_carlo"], horizon["parametric"]
+            self.assertAlmostEqual(mc["var"], parametric["var"], delta=0.25 * parametric["var"])
+            self.assertGreaterEqual(mc["cvar"], mc["var"])
+            percentiles = list(mc["percentiles"].values())
+            self.assertEqual(percentiles, sorted(percentiles))
+
+    def test_singular_covariance_is_handled(self):
+        prices = np.vstack([self.prices[0], self.prices[0]])
+        report = risk_report(prices, [1.0, 1.0], horizons=(1,), paths=1000, seed=3)
+        self.assertGreater(report["horizons"][0]["monte_carlo"]["var"], 0)
+
+    def test_zero_value_portfolio(self):
+        report = risk_report(self.prices, np.zeros(len(self.prices)), horizons=(1,), paths=1000, seed=4)
+        self.assertEqual(report["value"], 0)
+        self.assertEqual(report["horizons"][0]["parametric"], {"var": 0.0, "cvar": 0.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
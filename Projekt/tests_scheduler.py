@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from alert_engine import AlertEngine, AlertDelivery
+from lease import FirestoreLease, SqliteLease
+import scheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_sqlite_lease_elects_single_leader_and_fails_over(self):
+        path = os.path.join(tempfile.mkdtemp(), "lease.sqlite3")
+        now = [1000.0]
+        first = SqliteLease(path, "alerts", holder="a", ttl=30, clock=lambda: now[0])
+        second = SqliteLease(path, "alerts", holder="b", ttl=30, clock=lambda: now[0])
+
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        now[0] += 20
+        self.assertTrue(first.acquire())
+        now[0] += 20
+        self.assertFalse(second.acquire())
+
+        now[0] += 31
+        self.assertTrue(second.acquire())
+        self.assertFalse(first.acquire())
+        second.release()
+        self.assertTrue(first.acquire())
+
+    def test_firestore_lease_respects_foreign_holder(self):
+        db = MagicMock()
+        snapshot = db.collection.return_value.document.return_value.get.return_value
+        snapshot.exists = True
+        snapshot.to_dict.return_value = {"holder": "other", "expires_at": 1100.0}
+        lease = FirestoreLease(db, "alerts", holder="me", ttl=60, clock=lambda: 1000.0)
+
+        self.assertFalse(lease.acquire())
+        db.transaction.return_value.set.assert_not_called()
+
+        snapshot.to_dict.return_value = {"holder": "other", "expires_at": 900.0}
+        self.assertTrue(lease.acquire())
+        db.transaction.return_value.set.assert_called_once_with(
+            db.collection.return_value.document.return_value, {"holder": "me", "expires_at": 1060.0})
+
+    @patch("scheduler.process_pending_alerts")
+    def test_run_tick_skips_followers_and_overlapping_ticks(self, mock_process):
+        lease = MagicMock(ttl=60)
+        lease.acquire.return_value = False
+        with patch("scheduler.leader_lease", lease), patch("scheduler.is_leader", False), \
+                patch.dict(scheduler.tick_stats, {"ticks": 0}):
+            self.assertFalse(scheduler.run_tick())
+            mock_process.assert_not_called()
+
+            lease.acquire.return_value = True
+            self.assertTrue(scheduler.run_tick())
+            self.assertEqual(scheduler.tick_stats["ticks"], 1)
+
+            with scheduler._tick_lock:
+                self.assertFalse(scheduler.run_tick())
+            self.assertEqual(mock_process.call_count, 1)
+            self.assertTrue(scheduler.scheduler_stats()["leader"])
+
+    def test_unknown_lease_kind_is_rejected(self):
+        with patch.dict(os.environ, {"SCHEDULER_LEASE": "firestroe"}):
+            with self.assertRaises(ValueError):
+                scheduler.make_lease()
+        with patch.dict(os.environ, {"SCHEDULER_LEASE": "none"}):
+            self.assertIsNone(scheduler.make_lease())
+
+    @patch("scheduler.process_pending_alerts")
+    def test_lease_renewed_during_long_tick(self, mock_process):
+        lease = MagicMock(ttl=0.03, holder="me")
+        lease.acquire.side_effect = [True, True, False]
+        mock_process.side_effect = lambda: self.assertTrue(scheduler._lease_lost.wait(2))
+        with patch("scheduler.leader_lease", lease), patch("scheduler.is_leader", True):
+            self.assertTrue(scheduler.run_tick())
+        self.assertEqual(lease.acquire.call_count, 3)
+
+    @patch("scheduler.db")
+    @patch("scheduler.send_email")
+    @patch("portfolio.Portfolio.get_current_prices", return_value={"BTC": 150, "ETH": 10})
+    def test_process_pending_alerts(self, mock_prices, mock_send, mock_db):
+        alerts = []
+        for alert_id, symbol, target in (("a1", "BTC", 100), ("a2", "BTC", 200), ("a3", "ETH", 5)):
+            doc = MagicMock()
+            doc.id = alert_id
+            doc.to_dict.return_value = {"uid": "u1", "symbol": symbol, "target": target, "sent": False,
+                                        "message": f"{symbol} > {target}"}
+            alerts.append(doc)
+        mock_db.collection.return_value.where.return_value.stream.return_value = alerts
+        user_doc = MagicMock()
+        user_doc.id = "u1"
+        user_doc.exists = True
+        user_doc.to_dict.return_value = {"email": "user@example.com"}
+        mock_db.get_all.return_value = [user_doc]
+
+        callbacks = {}
+        mock_send.side_effect = lambda to, subject, body, on_result: callbacks.setdefault(body, on_result) or True
+
+        with patch("scheduler.alert_engine", AlertEngine()) as engine, \
+                patch("scheduler.alert_delivery", AlertDelivery()) as delivery, \
+                patch("scheduler._in_flight", set()), patch("scheduler._delivered", []):
+            scheduler._lease_lost.set()
+            try:
+                scheduler.process_pending_alerts()
+            finally:
+                scheduler._lease_lost.clear()
+            mock_send.assert_not_called()
+
+            scheduler.process_pending_alerts()
+            self.assertEqual(mock_send.call_count, 2)
+            self.assertEqual(mock_prices.call_count, 2)
+            mock_db.get_all.assert_called_once()
+            # Nic nie jest oznaczane, dopóki serwer SMTP nie przyjmie wiadomości
+            mock_db.batch.return_value.commit.assert_not_called()
+            self.assertEqual(len(engine), 3)
+
+            scheduler.process_pending_alerts()
+            self.assertEqual(mock_send.call_count, 2)
+
+            callbacks["BTC > 100"](True)
+            callbacks["ETH > 5"](False)
+            scheduler.process_pending_alerts()
+            mock_db.batch.return_value.commit.assert_called_once()
+            mock_db.batch.return_value.update.assert_called_once_with(
+                mock_db.collection.return_value.document.return_value, {"sent": True})
+            mock_db.collection.return_value.document.assert_any_call("a1")
+            self.assertEqual(len(engine), 2)
+            self.assertEqual(mock_send.call_args.args[2], "ETH > 5")
+            self.assertEqual(mock_send.call_count, 3)
+            self.assertGreater(delivery.stats()["round_trips_saved"], 0)
+
+    def test_scheduler_started_once_per_process(self):
+        with patch("scheduler.EMAIL_USER", "a"), patch("scheduler.EMAIL_PASS", "b"), \
+                patch("scheduler._scheduler", None), patch.dict(os.environ, {"SCHEDULER_LEASE": "none"}):
+            first = scheduler.start_scheduler(blocking=False)
+            try:
+                self.assertIs(scheduler.start_scheduler(blocking=False), first)
+                self.assertEqual(len(first.get_jobs()), 1)
+            finally:
+                first.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
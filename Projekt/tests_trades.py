@@ -0,0 +1,27 @@
+import unittest
+from trades import parse_trades, apply_operations, TradeError
+
+
+class TestTrades(unittest.TestCase):
+
+    def test_parse_trades_normalizes_and_validates(self):
+        trades = parse_trades([{"symbol": " btc ", "amount": "0.5"}, {"symbol": "ETH", "side": "SELL", "amount": 1}])
+        self.assertEqual(trades, [("BTC", "buy", 0.5), ("ETH", "sell", 1.0)])
+
+        for raw in (None, [], [{"symbol": "BTC"}], [{"symbol": "BTC", "amount": -1}],
+                    [{"symbol": "BTC", "side": "hold", "amount": 1}]):
+            with self.assertRaises(TradeError):
+                parse_trades(raw)
+
+    def test_apply_operations_averages_price_and_removes_position(self):
+        state = apply_operations({"amount": 1.0, "price": 100.0}, [("buy", 1.0)], 200.0)
+        self.assertEqual(state, {"amount": 2.0, "price": 150.0})
+
+        self.assertEqual(apply_operations(state, [("sell", 0.5)], None), {"amount": 1.5, "price": 150.0})
+        self.assertIsNone(apply_operations(state, [("sell", 2.0)], None))
+        self.assertIsNone(apply_operations(None, [("sell", 1.0)], None))
+        self.assertEqual(apply_operations(None, [("sell", 1.0), ("buy", 2.0)], 10.0), {"amount": 2.0, "price": 10.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
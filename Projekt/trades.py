@@ -0,0 +1,76 @@
+# Limit zapisów w jednej transakcji Firestore
+FIRESTORE_TRANSACTION_LIMIT = 500
+SIDES = ("buy", "sell")
+
+
+class TradeError(ValueError):
+    pass
+
+
+# Zamienia listę operacji z żądania na krotki (symbol, strona, ilość)
+def parse_trades(raw_trades):
+    if not isinstance(raw_trades, list) or not raw_trades:
+        raise TradeError("Brak listy operacji")
+    trades = []
+    for i, trade in enumerate(raw_trades):
+        try:
+            symbol = str(trade["symbol"]).strip().upper()
+            side = str(trade.get("side", "buy")).lower()
+            amount = float(trade["amount"])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise TradeError(f"Niepoprawna operacja nr {i + 1}")
+        if not symbol or side not in SIDES or not amount > 0:
+            raise TradeError(f"Niepoprawna operacja nr {i + 1}")
+        trades.append((symbol, side, amount))
+    return trades
+
+
+# Stosuje kolejne operacje do pozycji; zwraca nowy stan lub None, gdy pozycja znika
+def apply_operations(current, operations, price):
+    state = dict(current) if current else None
+    for side, amount in operations:
+        if side == "buy":
+            if state is None:
+                state = {"amount": amount, "price": price}
+            else:
+                total_amount = state["amount"] + amount
+                state["price"] = ((state["amount"] * state["price"]) + (amount * price)) / total_amount
+                state["amount"] = total_amount
+        elif state is not None:
+            if amount >= state["amount"]:
+                state = None
+            else:
+                state["amount"] -= amount
+    return state
+
+
+def _apply_chunk(transaction, collection, symbols, grouped, prices):
+    refs = [collection.document(symbol) for symbol in symbols]
+    existing = {snapshot.id: snapshot.to_dict() for snapshot in transaction.get_all(refs) if snapshot.exists}
+    results = {}
+    for symbol, ref in zip(symbols, refs):
+        previous = existing.get(symbol)
+        state = apply_operations(previous, grouped[symbol], prices.get(symbol))
+        if state is not None:
+            transaction.set(ref, state)
+        elif previous is not None:
+            transaction.delete(ref)
+        results[symbol] = (previous, state)
+    return results
+
+
+# Stosuje operacje w transakcjach (do 500 symboli na transakcję), bez wyścigu
+# odczyt-modyfikacja-zapis; zwraca symbol -> (stan poprzedni, stan nowy)
+def apply_trades(db, uid, trades, prices):
+    grouped = {}
+    for symbol, side, amount in trades:
+        grouped.setdefault(symbol, []).append((side, amount))
+
+    from firebase_admin.firestore import transactional
+    collection = db.collection("portfolios").document(uid).collection("assets")
+    symbols = list(grouped)
+    results = {}
+    for start in range(0, len(symbols), FIRESTORE_TRANSACTION_LIMIT):
+        chunk = symbols[start:start + FIRESTORE_TRANSACTION_LIMIT]
+        results.update(transactional(_apply_chunk)(db.transaction(), collection, chunk, grouped, prices))
+    return results